@@ -1,29 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException
+import time
+_inicio_importacao = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from sqlalchemy import create_engine, Column, Integer, String, Date, ForeignKey
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, ForeignKey, Index, and_, or_, exists, event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.orm import sessionmaker, relationship, Session, attributes
 from pydantic import BaseModel, validator
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import json
 import os
-from config import UNIDADES_DISPONIVEIS
+import platform
+import threading
+import config
+from config import UNIDADES_DISPONIVEIS, MAX_PAGE_SIZE, ITENS_POR_ESPECIE, API_VERSION, BOOTSTRAP_VERSION
+from config import medir_inicializacao, relatorio_inicializacao, TEMPOS_INICIALIZACAO
+from services.fast_json import FastJSONResponse, linhas_como_dicts
+from services.export_stream import TIPOS_MIME, iniciar_exportacao
+from services.export_jobs import LimiteJobsExcedido, encerrar_gerenciador, obter_gerenciador, validar_parametros
+from services.export_cache import CacheExportacoes, obter_cache, periodo_relatorio
+from services.manutencao import encerrar_manutencao, iniciar_manutencao, obter_agendador
+from services.replica import encerrar_replica, iniciar_replica, obter_replica
+from services.diario_escritas import CHAVES_ESTRANGEIRAS, encerrar_diario, obter_diario
+from models.sync_models import Base as SyncBase, RegistroSincronizado
 
-# Configuração do banco de dados (usando config.py)
-from config import DATABASE_URL, SHARED_MODE, SQLITE_CONFIG
+# Versão do schema gravada em PRAGMA user_version; incrementar ao alterar tabelas ou índices
+SCHEMA_VERSION = 3
 
-# Criar engine com configurações apropriadas
-if SHARED_MODE:
-    engine = create_engine(DATABASE_URL, echo=True, **SQLITE_CONFIG)
-    print(f"[CHECK] Usando banco compartilhado: {DATABASE_URL}")
-else:
-    engine = create_engine(DATABASE_URL, echo=True)
-    print(f"[INFO] Usando banco local: {DATABASE_URL}")
+# Engine criado no primeiro uso (ver obter_engine), sem tocar no banco ao importar
+engine = None
+_engine_lock = threading.Lock()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+# Tabelas cujas escritas incrementam a versão de dados
+TABELAS_VERSIONADAS = {'policial', 'proprietario', 'ocorrencia', 'item_apreendido', 'sync_log'}
+
 # === MODELOS SQLALCHEMY ===
 class Policial(Base):
     __tablename__ = 'policial'
@@ -57,6 +77,15 @@ class Ocorrencia(Base):
     policial_condutor = relationship('Policial', back_populates='ocorrencias_condutor')
     itens_apreendidos = relationship('ItemApreendido', back_populates='ocorrencia')
 
+    # Índices para os filtros de listagem (ordenados por data e id para paginação por cursor)
+    __table_args__ = (
+        Index('ix_ocorrencia_data', 'data_apreensao', 'id'),
+        Index('ix_ocorrencia_unidade_data', 'unidade_fato', 'data_apreensao', 'id'),
+        Index('ix_ocorrencia_lei_data', 'lei_infringida', 'data_apreensao', 'id'),
+        Index('ix_ocorrencia_condutor_data', 'policial_condutor_id', 'data_apreensao', 'id'),
+        Index('ix_ocorrencia_unidade_lei_data', 'unidade_fato', 'lei_infringida', 'data_apreensao', 'id'),
+    )
+
 class ItemApreendido(Base):
     __tablename__ = 'item_apreendido'
     id = Column(Integer, primary_key=True)
@@ -72,8 +101,239 @@ class ItemApreendido(Base):
     proprietario = relationship('Proprietario', back_populates='itens_apreendidos')
     policial = relationship('Policial', back_populates='itens_apreendidos')
 
-# Criar tabelas
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        Index('ix_item_apreendido_ocorrencia_especie', 'ocorrencia_id', 'especie'),
+    )
+
+class TabelaVersao(Base):
+    """Versão dos dados de cada tabela, incrementada a cada escrita (usada em ETag/Last-Modified)"""
+    __tablename__ = 'tabela_versao'
+    tabela = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, nullable=False)
+
+class PeriodoVersao(Base):
+    """Versão dos dados de ocorrências/itens por mês da apreensão (cache de exportações)"""
+    __tablename__ = 'periodo_versao'
+    periodo = Column(String, primary_key=True)  # AAAA-MM
+    versao = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, nullable=False)
+
+def criar_indices(bind):
+    """Cria os índices declarados que ainda não existem (bancos criados antes dos índices)"""
+    for table in Base.metadata.sorted_tables + SyncBase.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def preparar_schema(bind):
+    """
+    Cria tabelas e índices somente quando o PRAGMA user_version do banco é
+    menor que SCHEMA_VERSION. Retorna True se o schema foi (re)criado.
+    """
+    with bind.connect() as conn:
+        versao_atual = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if versao_atual >= SCHEMA_VERSION:
+            return False
+        if conn.exec_driver_sql("SELECT COUNT(*) FROM sqlite_master").scalar() == 0:
+            # Banco novo: auto_vacuum só pode ser definido antes da primeira tabela
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+
+    Base.metadata.create_all(bind=bind)
+    SyncBase.metadata.create_all(bind=bind)
+    criar_indices(bind)
+    with bind.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
+
+def obter_engine():
+    """Cria o engine e prepara o schema no primeiro uso"""
+    global engine
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                with medir_inicializacao("criacao_engine"):
+                    novo_engine = create_engine(
+                        config.DATABASE_URL, echo=config.DATABASE_ECHO, **config.SQLITE_CONFIG
+                    )
+                if config.SHARED_MODE:
+                    print(f"[CHECK] Usando banco compartilhado: {config.DATABASE_URL}")
+                else:
+                    print(f"[INFO] Usando banco local: {config.DATABASE_URL}")
+
+                SessionLocal.configure(bind=novo_engine)
+                engine = novo_engine
+                with medir_inicializacao("verificacao_schema"):
+                    if armazenamento_disponivel():
+                        garantir_schema()
+                    else:
+                        print("[WARNING] Pasta compartilhada fora do ar: schema verificado quando ela voltar")
+    return engine
+
+_schema_verificado = False
+
+def garantir_schema():
+    """Verifica/cria o schema uma vez por processo (adiado se a pasta compartilhada estava fora do ar)"""
+    global _schema_verificado
+    if not _schema_verificado:
+        if preparar_schema(engine):
+            print(f"[CHECK] Schema criado/atualizado (versão {SCHEMA_VERSION})")
+        _schema_verificado = True
+
+def armazenamento_disponivel() -> bool:
+    """Banco principal acessível: modo local ou pasta compartilhada em modo normal"""
+    monitor = config.MONITOR_CONECTIVIDADE
+    return monitor is None or monitor.conectado
+
+# === RÉPLICA LOCAL ===
+@event.listens_for(SessionLocal, "after_flush")
+def registrar_escrita(session, flush_context):
+    session.info["escreveu"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def desatualizar_replica(session):
+    """Escrita confirmada no banco principal: a próxima leitura atualiza a réplica antes"""
+    if session.info.pop("escreveu", False):
+        replica = obter_replica()
+        if replica is not None:
+            replica.marcar_desatualizada()
+
+# === VERSÃO DOS DADOS ===
+@event.listens_for(SessionLocal, "after_flush")
+def incrementar_versoes(session, flush_context):
+    """Incrementa a versão das tabelas alteradas no flush (API e sincronização)"""
+    alterados = list(session.new) + list(session.dirty) + list(session.deleted)
+    tabelas = {
+        obj.__table__.name
+        for obj in alterados
+        if getattr(obj, "__table__", None) is not None and obj.__table__.name in TABELAS_VERSIONADAS
+    }
+    if not tabelas:
+        return
+
+    agora = datetime.utcnow().replace(microsecond=0)
+    for tabela in sorted(tabelas):
+        stmt = sqlite_insert(TabelaVersao.__table__).values(tabela=tabela, versao=1, atualizado_em=agora)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tabela"],
+            set_={"versao": TabelaVersao.__table__.c.versao + 1, "atualizado_em": agora}
+        )
+        session.execute(stmt)
+
+    for periodo in sorted(periodos_alterados(session, alterados)):
+        stmt = sqlite_insert(PeriodoVersao.__table__).values(periodo=periodo, versao=1, atualizado_em=agora)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["periodo"],
+            set_={"versao": PeriodoVersao.__table__.c.versao + 1, "atualizado_em": agora}
+        )
+        session.execute(stmt)
+
+def periodo_mes(data: date) -> str:
+    return f"{data.year:04d}-{data.month:02d}"
+
+def valores_atuais_e_anteriores(obj, atributo: str) -> set:
+    """Valor atual do atributo e, para objetos alterados, o valor anterior"""
+    historico = attributes.get_history(obj, atributo)
+    valores = set(historico.added or ()) | set(historico.deleted or ()) | set(historico.unchanged or ())
+    return {valor for valor in valores if valor is not None}
+
+def periodos_alterados(session, alterados) -> set:
+    """Meses (AAAA-MM) cujas ocorrências ou itens foram inseridos, alterados ou removidos no flush"""
+    periodos = set()
+    ocorrencias_ids = set()
+    for obj in alterados:
+        if isinstance(obj, Ocorrencia):
+            periodos.update(periodo_mes(d) for d in valores_atuais_e_anteriores(obj, "data_apreensao"))
+        elif isinstance(obj, ItemApreendido):
+            ocorrencias_ids.update(valores_atuais_e_anteriores(obj, "ocorrencia_id"))
+
+    if ocorrencias_ids:
+        datas = session.connection().execute(
+            select(Ocorrencia.data_apreensao).where(Ocorrencia.id.in_(ocorrencias_ids)).distinct()
+        ).scalars()
+        periodos.update(periodo_mes(d) for d in datas)
+    return periodos
+
+def versao_dados_periodo(db: Session, data_inicio: date, data_fim: date) -> str:
+    """
+    Versão dos dados de um período: versões dos meses entre data_inicio e data_fim
+    e dos cadastros que aparecem nos relatórios (policiais e proprietários)
+    """
+    meses = []
+    ano, mes = data_inicio.year, data_inicio.month
+    while (ano, mes) <= (data_fim.year, data_fim.month):
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    versoes = dict(db.execute(
+        select(PeriodoVersao.periodo, PeriodoVersao.versao).where(PeriodoVersao.periodo.in_(meses))
+    ).all())
+    cadastros = dict(db.execute(
+        select(TabelaVersao.tabela, TabelaVersao.versao).where(TabelaVersao.tabela.in_(["policial", "proprietario"]))
+    ).all())
+    partes = [f"{periodo}:{versoes.get(periodo, 0)}" for periodo in meses]
+    partes += [f"{tabela}:{cadastros.get(tabela, 0)}" for tabela in ("policial", "proprietario")]
+    return "|".join(partes)
+
+def obter_versoes(db: Session, *tabelas: str, extra: str = ""):
+    """
+    Retorna (etag, last_modified) combinando as versões das tabelas informadas.
+    `extra` entra no ETag para conteúdo que não vem do banco (ex.: catálogos fixos).
+    """
+    registros = {
+        r.tabela: r for r in db.query(TabelaVersao).filter(TabelaVersao.tabela.in_(tabelas))
+    }
+    partes = []
+    ultima_alteracao = None
+    for tabela in tabelas:
+        registro = registros.get(tabela)
+        if registro:
+            partes.append(f"{tabela}:{registro.versao}:{registro.atualizado_em.isoformat()}")
+            if ultima_alteracao is None or registro.atualizado_em > ultima_alteracao:
+                ultima_alteracao = registro.atualizado_em
+        else:
+            partes.append(f"{tabela}:0")
+
+    partes.append(extra)
+    etag = '"' + hashlib.md5("|".join(partes).encode()).hexdigest()[:16] + '"'
+    return etag, ultima_alteracao
+
+def resposta_condicional(response: Response, etag: str, ultima_alteracao: Optional[datetime],
+                         if_none_match: Optional[str], if_modified_since: Optional[str]) -> Optional[Response]:
+    """
+    Define ETag/Last-Modified na resposta e retorna um 304 quando o cliente já
+    possui a versão atual. Com If-None-Match presente, If-Modified-Since é
+    ignorado (RFC 9110, 13.1.3).
+
+    atualizado_em tem resolução de 1 segundo: uma escrita no mesmo segundo não
+    muda o Last-Modified. Por isso ele só é enviado, e If-Modified-Since só
+    gera 304, quando a última alteração é anterior ao segundo atual.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    estavel = ultima_alteracao is not None and \
+        ultima_alteracao.replace(microsecond=0) < datetime.utcnow().replace(microsecond=0)
+    if estavel:
+        headers["Last-Modified"] = format_datetime(ultima_alteracao.replace(tzinfo=timezone.utc), usegmt=True)
+    response.headers.update(headers)
+
+    if if_none_match is not None:
+        etags_cliente = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in etags_cliente or etag in etags_cliente or f"W/{etag}" in etags_cliente:
+            return Response(status_code=304, headers=headers)
+        return None
+    if if_modified_since and estavel:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if ultima_alteracao.replace(microsecond=0, tzinfo=timezone.utc) <= desde:
+            return Response(status_code=304, headers=headers)
+    return None
+
+def resposta_rapida(db: Session, stmt, response: Response) -> FastJSONResponse:
+    """Executa um SELECT do Core e serializa as linhas direto em JSON (sem ORM/Pydantic)"""
+    linhas = linhas_como_dicts(db.execute(stmt))
+    return FastJSONResponse(linhas, headers=dict(response.headers))
 
 # === SCHEMAS PYDANTIC ===
 class PolicialBase(BaseModel):
@@ -135,11 +395,133 @@ class ItemApreendidoResponse(ItemApreendidoBase):
     class Config:
         from_attributes = True
 
+# === DIÁRIO DE ESCRITAS (pasta compartilhada fora do ar) ===
+MODELOS_DIARIO = {
+    "policial": (Policial, PolicialCreate),
+    "proprietario": (Proprietario, ProprietarioCreate),
+    "ocorrencia": (Ocorrencia, OcorrenciaCreate),
+    "item_apreendido": (ItemApreendido, ItemApreendidoCreate),
+}
+# Modelo referenciado por cada chave estrangeira (mesmas verificações dos POST online)
+REFERENCIAS_DIARIO = {
+    "policial_condutor_id": (Policial, "Policial condutor não encontrado"),
+    "ocorrencia_id": (Ocorrencia, "Ocorrência não encontrada"),
+    "proprietario_id": (Proprietario, "Proprietário não encontrado"),
+    "policial_id": (Policial, "Policial não encontrado"),
+}
+# Usuário das escritas do diário em registro_sincronizado (deduplicação da reprodução)
+USUARIO_DIARIO = f"diario:{platform.node()}"
+
+def escrita_no_diario() -> bool:
+    """
+    Escritas vão para o diário com a pasta compartilhada fora do modo normal e
+    enquanto houver escritas pendentes (mantém a ordem até a reprodução terminar)
+    """
+    diario = obter_diario() if config.SHARED_MODE else None
+    return diario is not None and (not armazenamento_disponivel() or diario.tem_pendentes())
+
+def resolver_provisorios(tipo: str, dados: dict) -> dict:
+    """Troca ids provisórios (negativos) já reproduzidos pelos definitivos"""
+    diario = obter_diario() if config.SHARED_MODE else None
+    return diario.resolver(tipo, dados) if diario is not None else dados
+
+def registrar_no_diario(tipo: str, dados: dict):
+    """Grava a escrita no diário e responde 202 com o id provisório"""
+    diario = obter_diario()
+    for campo in CHAVES_ESTRANGEIRAS[tipo]:
+        valor = dados.get(campo)
+        if isinstance(valor, int) and valor < 0 and not diario.existe(valor):
+            raise HTTPException(status_code=400, detail=f"Registro provisório não encontrado: {campo}={valor}")
+    id_provisorio = diario.registrar(tipo, dados)
+    return FastJSONResponse({**dados, "id": id_provisorio}, status_code=202, headers={"X-Escrita-Pendente": "true"})
+
+def aplicar_escrita_diario(db: Session, tipo: str, dados: dict, chave: str) -> int:
+    """Grava uma escrita do diário no banco principal (ou reaproveita o registro existente)"""
+    registrado = db.query(RegistroSincronizado.id_central).filter(
+        RegistroSincronizado.usuario == USUARIO_DIARIO,
+        RegistroSincronizado.tipo_registro == tipo,
+        RegistroSincronizado.uuid_local == chave
+    ).first()
+    if registrado:
+        return registrado.id_central
+
+    modelo, esquema = MODELOS_DIARIO[tipo]
+    valores = esquema(**dados).dict()
+    for campo in CHAVES_ESTRANGEIRAS[tipo]:
+        # Sem foreign_keys no SQLite: referência inexistente viraria registro órfão
+        referenciado, mensagem = REFERENCIAS_DIARIO[campo]
+        if db.get(referenciado, valores[campo]) is None:
+            raise ValueError(f"{mensagem}: {campo}={valores[campo]}")
+    existente = None
+    if tipo == "policial":
+        existente = db.query(Policial).filter(Policial.matricula == valores["matricula"]).first()
+    elif tipo == "proprietario":
+        existente = db.query(Proprietario).filter(
+            Proprietario.nome == valores["nome"], Proprietario.documento == valores["documento"]
+        ).first()
+    if existente is None:
+        existente = modelo(**valores)
+        db.add(existente)
+        db.flush()
+
+    db.add(RegistroSincronizado(usuario=USUARIO_DIARIO, tipo_registro=tipo, uuid_local=chave,
+                                id_central=existente.id))
+    return existente.id
+
+def reproduzir_diario() -> dict:
+    """Envia ao banco compartilhado as escritas feitas com a pasta fora do ar"""
+    diario = obter_diario()
+    if diario is None or not diario.tem_pendentes():
+        return {"reproduzidas": 0, "lotes": 0, "erros": 0}
+    garantir_schema()
+    resultado = diario.reproduzir(SessionLocal, aplicar_escrita_diario)
+    print(f"[CHECK] Diário de escritas reproduzido: {resultado}")
+    return resultado
+
+def iniciar_diario():
+    """Reproduz o diário agora (se possível) e sempre que a pasta compartilhada voltar ao modo normal"""
+    monitor = config.MONITOR_CONECTIVIDADE
+
+    def ao_mudar_modo(anterior, novo):
+        if novo == "normal":
+            threading.Thread(target=reproduzir_diario_com_aviso, name="reproducao-diario", daemon=True).start()
+
+    if monitor is not None:
+        monitor.ao_mudar_modo(ao_mudar_modo)
+    if armazenamento_disponivel():
+        reproduzir_diario_com_aviso()
+
+def reproduzir_diario_com_aviso():
+    try:
+        reproduzir_diario()
+    except Exception as e:
+        print(f"[WARNING] Reprodução do diário interrompida (tentará de novo): {e}")
+
 # === APLICAÇÃO FASTAPI ===
+@asynccontextmanager
+async def lifespan(app):
+    # Prepara armazenamento e banco antes da primeira requisição
+    obter_engine()
+    if config.MANUTENCAO_ATIVA:
+        iniciar_manutencao(engine, monitor=config.MONITOR_CONECTIVIDADE)
+    if config.SHARED_MODE and config.REPLICA_ATIVA:
+        iniciar_replica(config.STORAGE_MANAGER.get_database_path(), monitor=config.MONITOR_CONECTIVIDADE)
+    if config.SHARED_MODE and obter_diario() is not None:
+        iniciar_diario()
+    print(relatorio_inicializacao())
+    yield
+    encerrar_diario()
+    encerrar_replica()
+    encerrar_manutencao()
+    encerrar_gerenciador()
+    if config.MONITOR_CONECTIVIDADE:
+        config.MONITOR_CONECTIVIDADE.encerrar()
+
 app = FastAPI(
     title="SECRIMPO API",
     description="API para sistema de registro de ocorrências policiais",
-    version="1.0.0"
+    version=API_VERSION,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -148,24 +530,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Content-Disposition",
+                    "X-Export-Id", "X-Export-Linhas-Estimadas", "X-Export-Cache", "X-Armazenamento-Modo",
+                    "X-Escrita-Pendente"],
 )
 
+@app.middleware("http")
+async def registrar_atividade(request, call_next):
+    """Informa ao agendador de manutenção quando há requisições em andamento"""
+    agendador = obter_agendador()
+    if agendador is None:
+        return await call_next(request)
+    agendador.inicio_requisicao()
+    try:
+        return await call_next(request)
+    finally:
+        agendador.fim_requisicao()
+
+@app.middleware("http")
+async def informar_modo_armazenamento(request, call_next):
+    """X-Armazenamento-Modo: normal, degradado ou offline (estado em cache do monitor)"""
+    response = await call_next(request)
+    monitor = config.MONITOR_CONECTIVIDADE
+    if monitor is not None and monitor.modo:
+        response.headers["X-Armazenamento-Modo"] = monitor.modo
+    return response
+
 # Dependency
 def get_db():
+    obter_engine()
+    if not _schema_verificado and armazenamento_disponivel():
+        garantir_schema()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def get_db_leitura():
+    """Sessão somente leitura: réplica local quando disponível, senão o banco principal"""
+    db = get_fabrica_sessao()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_fabrica_sessao():
+    """
+    Fábrica de sessões de leitura para trabalhos fora da requisição (ex.:
+    exportações em streaming): réplica local quando disponível
+    """
+    obter_engine()
+    replica = obter_replica()
+    if replica is not None and replica.garantir_atualizada():
+        return replica.fabrica_sessao
+    if not armazenamento_disponivel():
+        # Pasta fora do ar e sem réplica pronta: erro explícito em vez de travar no SMB
+        raise HTTPException(status_code=503, detail="Pasta compartilhada fora do ar e réplica local indisponível")
+    return SessionLocal
+
 # === ENDPOINTS ===
 @app.get("/")
 async def root():
-    return {"message": "SECRIMPO API está funcionando!", "version": "1.0.0"}
+    return {"message": "SECRIMPO API está funcionando!", "version": API_VERSION}
 
 # POLICIAIS
 @app.post("/policiais/", response_model=PolicialResponse)
 async def criar_policial(policial: PolicialCreate, db: Session = Depends(get_db)):
+    if escrita_no_diario():
+        return registrar_no_diario("policial", policial.dict())
     # Verifica se matrícula já existe
     existing = db.query(Policial).filter(Policial.matricula == policial.matricula).first()
     if existing:
@@ -178,11 +611,25 @@ async def criar_policial(policial: PolicialCreate, db: Session = Depends(get_db)
     return db_policial
 
 @app.get("/policiais/", response_model=List[PolicialResponse])
-async def listar_policiais(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def listar_policiais(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    rapido: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db_leitura)
+):
+    etag, ultima_alteracao = obter_versoes(db, "policial")
+    nao_modificado = resposta_condicional(response, etag, ultima_alteracao, if_none_match, if_modified_since)
+    if nao_modificado:
+        return nao_modificado
+    if rapido:
+        return resposta_rapida(db, select(*Policial.__table__.c).offset(skip).limit(limit), response)
     return db.query(Policial).offset(skip).limit(limit).all()
 
 @app.get("/policiais/{policial_id}", response_model=PolicialResponse)
-async def obter_policial(policial_id: int, db: Session = Depends(get_db)):
+async def obter_policial(policial_id: int, db: Session = Depends(get_db_leitura)):
     policial = db.query(Policial).filter(Policial.id == policial_id).first()
     if not policial:
         raise HTTPException(status_code=404, detail="Policial não encontrado")
@@ -191,6 +638,8 @@ async def obter_policial(policial_id: int, db: Session = Depends(get_db)):
 # PROPRIETÁRIOS
 @app.post("/proprietarios/", response_model=ProprietarioResponse)
 async def criar_proprietario(proprietario: ProprietarioCreate, db: Session = Depends(get_db)):
+    if escrita_no_diario():
+        return registrar_no_diario("proprietario", proprietario.dict())
     db_proprietario = Proprietario(**proprietario.dict())
     db.add(db_proprietario)
     db.commit()
@@ -198,12 +647,29 @@ async def criar_proprietario(proprietario: ProprietarioCreate, db: Session = Dep
     return db_proprietario
 
 @app.get("/proprietarios/", response_model=List[ProprietarioResponse])
-async def listar_proprietarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def listar_proprietarios(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    rapido: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db_leitura)
+):
+    etag, ultima_alteracao = obter_versoes(db, "proprietario")
+    nao_modificado = resposta_condicional(response, etag, ultima_alteracao, if_none_match, if_modified_since)
+    if nao_modificado:
+        return nao_modificado
+    if rapido:
+        return resposta_rapida(db, select(*Proprietario.__table__.c).offset(skip).limit(limit), response)
     return db.query(Proprietario).offset(skip).limit(limit).all()
 
 # OCORRÊNCIAS
 @app.post("/ocorrencias/", response_model=OcorrenciaResponse)
 async def criar_ocorrencia(ocorrencia: OcorrenciaCreate, db: Session = Depends(get_db)):
+    ocorrencia = OcorrenciaCreate(**resolver_provisorios("ocorrencia", ocorrencia.dict()))
+    if escrita_no_diario():
+        return registrar_no_diario("ocorrencia", ocorrencia.dict())
     # Verifica se policial existe
     policial = db.query(Policial).filter(Policial.id == ocorrencia.policial_condutor_id).first()
     if not policial:
@@ -215,13 +681,110 @@ async def criar_ocorrencia(ocorrencia: OcorrenciaCreate, db: Session = Depends(g
     db.refresh(db_ocorrencia)
     return db_ocorrencia
 
+def filtrar_ocorrencias(query, data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                        unidade_fato: Optional[str] = None, lei_infringida: Optional[str] = None,
+                        policial_condutor_id: Optional[int] = None, especie: Optional[str] = None):
+    """Aplica os filtros de listagem de ocorrências a uma query"""
+    if data_inicio:
+        query = query.filter(Ocorrencia.data_apreensao >= data_inicio)
+    if data_fim:
+        query = query.filter(Ocorrencia.data_apreensao <= data_fim)
+    if unidade_fato:
+        query = query.filter(Ocorrencia.unidade_fato == unidade_fato)
+    if lei_infringida:
+        query = query.filter(Ocorrencia.lei_infringida == lei_infringida)
+    if policial_condutor_id:
+        query = query.filter(Ocorrencia.policial_condutor_id == policial_condutor_id)
+    if especie:
+        # EXISTS correlacionado mantém a ordem do índice da ocorrência
+        query = query.filter(
+            exists().where(
+                ItemApreendido.ocorrencia_id == Ocorrencia.id,
+                ItemApreendido.especie == especie
+            )
+        )
+    return query
+
+def codificar_cursor(data_apreensao: date, ocorrencia_id: int) -> str:
+    """Cursor de paginação no formato 'AAAA-MM-DD:id'"""
+    return f"{data_apreensao.isoformat()}:{ocorrencia_id}"
+
+def decodificar_cursor(cursor: str):
+    try:
+        data_str, id_str = cursor.split(":", 1)
+        return date.fromisoformat(data_str), int(id_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
 @app.get("/ocorrencias/", response_model=List[OcorrenciaResponse])
-async def listar_ocorrencias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Ocorrencia).offset(skip).limit(limit).all()
+async def listar_ocorrencias(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    unidade_fato: Optional[str] = None,
+    lei_infringida: Optional[str] = None,
+    policial_condutor_id: Optional[int] = None,
+    especie: Optional[str] = None,
+    cursor: Optional[str] = None,
+    rapido: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Lista ocorrências filtradas, das mais recentes para as mais antigas.
+
+    Paginação por cursor: envie em `cursor` o valor do header `X-Next-Cursor`
+    da página anterior. `skip` continua aceito quando não há cursor.
+    Com `rapido=true` as linhas são lidas pelo Core e serializadas direto em JSON.
+    """
+    etag, ultima_alteracao = obter_versoes(db, "ocorrencia", "item_apreendido")
+    nao_modificado = resposta_condicional(response, etag, ultima_alteracao, if_none_match, if_modified_since)
+    if nao_modificado:
+        return nao_modificado
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = filtrar_ocorrencias(
+        select(*Ocorrencia.__table__.c) if rapido else db.query(Ocorrencia),
+        data_inicio, data_fim, unidade_fato,
+        lei_infringida, policial_condutor_id, especie
+    )
+
+    if cursor:
+        cursor_data, cursor_id = decodificar_cursor(cursor)
+        query = query.filter(
+            or_(
+                Ocorrencia.data_apreensao < cursor_data,
+                and_(Ocorrencia.data_apreensao == cursor_data, Ocorrencia.id < cursor_id)
+            )
+        )
+    elif skip:
+        query = query.offset(skip)
+
+    query = query.order_by(
+        Ocorrencia.data_apreensao.desc(), Ocorrencia.id.desc()
+    ).limit(limit)
+
+    if rapido:
+        linhas = linhas_como_dicts(db.execute(query))
+        if len(linhas) == limit:
+            response.headers["X-Next-Cursor"] = codificar_cursor(linhas[-1]["data_apreensao"], linhas[-1]["id"])
+        return FastJSONResponse(linhas, headers=dict(response.headers))
+
+    ocorrencias = query.all()
+    if len(ocorrencias) == limit:
+        response.headers["X-Next-Cursor"] = codificar_cursor(ocorrencias[-1].data_apreensao, ocorrencias[-1].id)
+
+    return ocorrencias
 
 # ITENS APREENDIDOS
 @app.post("/itens/", response_model=ItemApreendidoResponse)
 async def criar_item(item: ItemApreendidoCreate, db: Session = Depends(get_db)):
+    item = ItemApreendidoCreate(**resolver_provisorios("item_apreendido", item.dict()))
+    if escrita_no_diario():
+        return registrar_no_diario("item_apreendido", item.dict())
     # Verifica se todas as referências existem
     ocorrencia = db.query(Ocorrencia).filter(Ocorrencia.id == item.ocorrencia_id).first()
     if not ocorrencia:
@@ -242,21 +805,41 @@ async def criar_item(item: ItemApreendidoCreate, db: Session = Depends(get_db)):
     return db_item
 
 @app.get("/itens/", response_model=List[ItemApreendidoResponse])
-async def listar_itens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def listar_itens(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    rapido: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db_leitura)
+):
+    etag, ultima_alteracao = obter_versoes(db, "item_apreendido")
+    nao_modificado = resposta_condicional(response, etag, ultima_alteracao, if_none_match, if_modified_since)
+    if nao_modificado:
+        return nao_modificado
+    if rapido:
+        return resposta_rapida(db, select(*ItemApreendido.__table__.c).offset(skip).limit(limit), response)
     return db.query(ItemApreendido).offset(skip).limit(limit).all()
 
 @app.get("/itens/ocorrencia/{ocorrencia_id}", response_model=List[ItemApreendidoResponse])
-async def listar_itens_por_ocorrencia(ocorrencia_id: int, db: Session = Depends(get_db)):
+async def listar_itens_por_ocorrencia(ocorrencia_id: int, db: Session = Depends(get_db_leitura)):
     return db.query(ItemApreendido).filter(ItemApreendido.ocorrencia_id == ocorrencia_id).all()
 
 # UNIDADES DISPONÍVEIS
+# Lista fixa: ETag calculado uma única vez a partir do conteúdo
+ETAG_UNIDADES = '"' + hashlib.md5("|".join(UNIDADES_DISPONIVEIS).encode()).hexdigest()[:16] + '"'
+
 @app.get("/unidades/")
-async def obter_unidades():
+async def obter_unidades(response: Response, if_none_match: Optional[str] = Header(None)):
+    nao_modificado = resposta_condicional(response, ETAG_UNIDADES, None, if_none_match, None)
+    if nao_modificado:
+        return nao_modificado
     return {"unidades": UNIDADES_DISPONIVEIS}
 
 # ESTATÍSTICAS
 @app.get("/estatisticas/")
-async def obter_estatisticas(db: Session = Depends(get_db)):
+async def obter_estatisticas(db: Session = Depends(get_db_leitura)):
     total_ocorrencias = db.query(Ocorrencia).count()
     total_policiais = db.query(Policial).count()
     total_proprietarios = db.query(Proprietario).count()
@@ -269,6 +852,251 @@ async def obter_estatisticas(db: Session = Depends(get_db)):
         "total_itens": total_itens
     }
 
+# === ARMAZENAMENTO ===
+@app.get("/armazenamento/status")
+async def obter_status_armazenamento():
+    """Modo e latências da pasta compartilhada, do cache do monitor (não toca na pasta)"""
+    storage = config.STORAGE_MANAGER
+    if storage is None:
+        return {"modo": "local", "database_url": config.DATABASE_URL}
+    replica = obter_replica()
+    return {**storage.get_status(), "replica": replica.estado() if replica else None}
+
+@app.get("/diario")
+async def obter_estado_diario():
+    """Escritas feitas com a pasta compartilhada fora do ar: pendentes, reproduzidas e com erro"""
+    diario = obter_diario() if config.SHARED_MODE else None
+    if diario is None:
+        raise HTTPException(status_code=404, detail="Diário de escritas disponível só em modo compartilhado")
+    return diario.estado()
+
+@app.post("/diario/reproduzir")
+async def reproduzir_diario_agora():
+    """Reproduz as escritas pendentes agora (a pasta compartilhada precisa estar acessível)"""
+    if obter_diario() is None or not config.SHARED_MODE:
+        raise HTTPException(status_code=404, detail="Diário de escritas disponível só em modo compartilhado")
+    if not armazenamento_disponivel():
+        raise HTTPException(status_code=503, detail="Pasta compartilhada fora do ar")
+    return await run_in_threadpool(reproduzir_diario)
+
+# === MANUTENÇÃO DO BANCO ===
+def agendador_ativo():
+    agendador = obter_agendador()
+    if agendador is None:
+        raise HTTPException(status_code=503, detail="Manutenção em segundo plano desativada (MANUTENCAO_ATIVA=0)")
+    return agendador
+
+@app.get("/manutencao")
+async def obter_metricas_manutencao():
+    """Tamanho do WAL, duração dos checkpoints e contadores da manutenção em segundo plano"""
+    return agendador_ativo().metricas()
+
+@app.post("/manutencao/executar")
+async def executar_manutencao():
+    """Executa um ciclo de manutenção agora, sem esperar a API ficar ociosa"""
+    return await run_in_threadpool(agendador_ativo().executar_ciclo, True)
+
+# === EXPORTAÇÕES ===
+from services.export_engine import formatos_disponiveis
+
+# Exportações em andamento, para consulta de progresso por id
+EXPORTACOES_ATIVAS = {}
+
+def validar_formato(formato: str):
+    if formato not in config.EXPORT_FORMATS or formato not in formatos_disponiveis():
+        raise HTTPException(status_code=400, detail=f"Formato não suportado: {formato}")
+
+def validar_periodo(data_inicio: date, data_fim: date):
+    if data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim deve ser posterior a data_inicio")
+
+def get_cache_exportacoes():
+    return obter_cache()
+
+def chave_exportacao(fabrica_sessao, relatorio: str, parametros: dict, formato: str) -> str:
+    """Chave do relatório no cache: parâmetros + versão dos dados do período"""
+    with fabrica_sessao() as db:
+        versao = versao_dados_periodo(db, *periodo_relatorio(relatorio, parametros))
+    return CacheExportacoes.chave(relatorio, parametros, formato, versao)
+
+async def resposta_exportacao(fabrica_sessao, cache, relatorio: str, parametros: dict, formato: str):
+    """
+    Entrega o arquivo do cache quando os dados do período não mudaram; senão gera
+    o relatório em uma thread e o transmite enquanto é produzido, guardando uma
+    cópia no cache para os próximos pedidos.
+    """
+    chave = await run_in_threadpool(chave_exportacao, fabrica_sessao, relatorio, parametros, formato)
+    em_cache = cache.obter(chave)
+    if em_cache is not None:
+        nome_arquivo = os.path.basename(em_cache)
+        return FileResponse(em_cache, media_type=TIPOS_MIME[nome_arquivo.rsplit(".", 1)[-1]],
+                            filename=nome_arquivo, headers={"X-Export-Cache": "HIT"})
+
+    # Importado aqui: excel_export importa os modelos deste módulo
+    from services.excel_export import ExcelExportService
+
+    canal = iniciar_exportacao(
+        fabrica_sessao,
+        lambda db, canal: ExcelExportService(db, destino=canal).exportar_relatorio(relatorio, parametros, formato),
+        copia=cache.gravar(chave)
+    )
+    try:
+        nome_arquivo = await run_in_threadpool(canal.aguardar_inicio)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    EXPORTACOES_ATIVAS[canal.id] = canal
+
+    def blocos():
+        try:
+            yield from canal.blocos()
+        finally:
+            EXPORTACOES_ATIVAS.pop(canal.id, None)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{nome_arquivo}"',
+        "X-Export-Id": canal.id,
+        "X-Export-Cache": "MISS",
+    }
+    if canal.linhas_estimadas is not None:
+        headers["X-Export-Linhas-Estimadas"] = str(canal.linhas_estimadas)
+    extensao = nome_arquivo.rsplit(".", 1)[-1]
+    return StreamingResponse(blocos(), media_type=TIPOS_MIME[extensao], headers=headers)
+
+@app.get("/exportar/formatos")
+async def listar_formatos_exportacao():
+    return {"formatos": [f for f in config.EXPORT_FORMATS if f in formatos_disponiveis()]}
+
+@app.get("/exportar/completo")
+async def exportar_completo(data_inicio: date, data_fim: date, formato: str = "xlsx",
+                            fabrica_sessao=Depends(get_fabrica_sessao), cache=Depends(get_cache_exportacoes)):
+    """Relatório completo (uma linha por item apreendido) transmitido em streaming"""
+    validar_formato(formato)
+    validar_periodo(data_inicio, data_fim)
+    return await resposta_exportacao(
+        fabrica_sessao, cache, "completo", {"data_inicio": data_inicio, "data_fim": data_fim}, formato
+    )
+
+@app.get("/exportar/resumo-mensal")
+async def exportar_resumo_mensal(ano: int, mes: int, formato: str = "xlsx",
+                                 fabrica_sessao=Depends(get_fabrica_sessao), cache=Depends(get_cache_exportacoes)):
+    """Resumo mensal (uma linha por ocorrência) transmitido em streaming"""
+    validar_formato(formato)
+    if not 1 <= mes <= 12:
+        raise HTTPException(status_code=400, detail="Mês inválido")
+    return await resposta_exportacao(fabrica_sessao, cache, "resumo_mensal", {"ano": ano, "mes": mes}, formato)
+
+@app.get("/exportar/resumos-mensais")
+async def exportar_resumos_mensais(data_inicio: date, data_fim: date, formato: str = "xlsx",
+                                   fabrica_sessao=Depends(get_fabrica_sessao), cache=Depends(get_cache_exportacoes)):
+    """Resumos de todos os meses do período (uma aba por mês) lidos em uma única consulta"""
+    validar_formato(formato)
+    validar_periodo(data_inicio, data_fim)
+    return await resposta_exportacao(
+        fabrica_sessao, cache, "resumos_mensais", {"data_inicio": data_inicio, "data_fim": data_fim}, formato
+    )
+
+@app.get("/exportar/policial/{policial_id}")
+async def exportar_por_policial(policial_id: int, data_inicio: date, data_fim: date, formato: str = "xlsx",
+                                fabrica_sessao=Depends(get_fabrica_sessao), cache=Depends(get_cache_exportacoes)):
+    """Itens das ocorrências conduzidas por um policial, transmitidos em streaming"""
+    validar_formato(formato)
+    validar_periodo(data_inicio, data_fim)
+    parametros = {"policial_id": policial_id, "data_inicio": data_inicio, "data_fim": data_fim}
+    return await resposta_exportacao(fabrica_sessao, cache, "policial", parametros, formato)
+
+@app.get("/exportar/estatisticas")
+async def exportar_estatisticas(data_inicio: date, data_fim: date, formato: str = "xlsx",
+                                fabrica_sessao=Depends(get_fabrica_sessao), cache=Depends(get_cache_exportacoes)):
+    """Estatísticas do período (por lei, policial e unidade) transmitidas em streaming"""
+    validar_formato(formato)
+    validar_periodo(data_inicio, data_fim)
+    return await resposta_exportacao(
+        fabrica_sessao, cache, "estatisticas", {"data_inicio": data_inicio, "data_fim": data_fim}, formato
+    )
+
+@app.get("/exportar/cache")
+async def obter_cache_exportacoes(cache=Depends(get_cache_exportacoes)):
+    return cache.estatisticas()
+
+@app.delete("/exportar/cache")
+async def limpar_cache_exportacoes(cache=Depends(get_cache_exportacoes)):
+    cache.limpar()
+    return {"message": "Cache de exportações limpo"}
+
+# Exportações em segundo plano (processos separados): enfileirar, acompanhar e baixar
+class JobExportacaoCreate(BaseModel):
+    relatorio: str  # completo, resumo_mensal, resumos_mensais, policial ou estatisticas
+    formato: str = "xlsx"
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    ano: Optional[int] = None
+    mes: Optional[int] = None
+    policial_id: Optional[int] = None
+
+def get_gerenciador_exportacoes():
+    return obter_gerenciador()
+
+@app.post("/exportar/jobs", status_code=202)
+async def criar_job_exportacao(pedido: JobExportacaoCreate, gerenciador=Depends(get_gerenciador_exportacoes),
+                               fabrica_sessao=Depends(get_fabrica_sessao)):
+    validar_formato(pedido.formato)
+    if pedido.data_inicio and pedido.data_fim:
+        validar_periodo(pedido.data_inicio, pedido.data_fim)
+    if pedido.mes is not None and not 1 <= pedido.mes <= 12:
+        raise HTTPException(status_code=400, detail="Mês inválido")
+    try:
+        parametros = validar_parametros(pedido.relatorio, pedido.model_dump(exclude={"relatorio", "formato"}))
+        chave = await run_in_threadpool(chave_exportacao, fabrica_sessao, pedido.relatorio, parametros, pedido.formato)
+        job = gerenciador.submeter(pedido.relatorio, parametros, pedido.formato, chave_cache=chave)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LimiteJobsExcedido as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.como_dict()
+
+@app.get("/exportar/jobs")
+async def listar_jobs_exportacao(gerenciador=Depends(get_gerenciador_exportacoes)):
+    return [job.como_dict() for job in gerenciador.listar()]
+
+@app.get("/exportar/jobs/{job_id}")
+async def obter_job_exportacao(job_id: str, gerenciador=Depends(get_gerenciador_exportacoes)):
+    job = gerenciador.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.como_dict()
+
+@app.get("/exportar/jobs/{job_id}/arquivo")
+async def baixar_job_exportacao(job_id: str, gerenciador=Depends(get_gerenciador_exportacoes)):
+    job = gerenciador.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status != "concluido":
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status: {job.status})")
+    if not os.path.exists(job.arquivo):
+        # Cache de exportações limpo (DELETE /exportar/cache) depois da conclusão do job
+        raise HTTPException(status_code=410, detail="Arquivo da exportação não está mais disponível; "
+                                                    "solicite a exportação novamente")
+    extensao = job.nome_arquivo.rsplit(".", 1)[-1]
+    return FileResponse(job.arquivo, media_type=TIPOS_MIME[extensao], filename=job.nome_arquivo)
+
+@app.delete("/exportar/jobs/{job_id}")
+async def cancelar_job_exportacao(job_id: str, gerenciador=Depends(get_gerenciador_exportacoes)):
+    """Cancela um job na fila ou remove um job finalizado e seu arquivo"""
+    if gerenciador.obter(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if not gerenciador.cancelar(job_id):
+        raise HTTPException(status_code=409, detail="Job em execução não pode ser cancelado")
+    return {"message": "Job removido"}
+
+@app.get("/exportar/progresso/{export_id}")
+async def obter_progresso_exportacao(export_id: str):
+    """Progresso de uma exportação em andamento (id do cabeçalho X-Export-Id)"""
+    canal = EXPORTACOES_ATIVAS.get(export_id)
+    if canal is None:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada ou já concluída")
+    return canal.progresso()
+
 # === ENDPOINTS DE SINCRONIZAÇÃO ===
 import sys
 import os
@@ -276,13 +1104,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from services.sync_service import SyncService
 from models.sync_models import SincronizacaoRequest, SincronizacaoResponse, StatusSincronizacao, SyncLog, RegistroSincronizado
-from datetime import datetime
 from typing import Dict, Any
 
-# Adicionar tabelas de sincronização ao metadata
-from models.sync_models import Base as SyncBase
-SyncBase.metadata.create_all(bind=engine)
-
 @app.post("/sincronizar", response_model=Dict[str, Any])
 async def sincronizar_dados(request: Dict[str, Any], db: Session = Depends(get_db)):
     """
@@ -331,7 +1154,7 @@ async def sincronizar_dados(request: Dict[str, Any], db: Session = Depends(get_d
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
 
 @app.get("/sincronizar/status/{usuario}")
-async def obter_status_sincronizacao(usuario: str, db: Session = Depends(get_db)):
+async def obter_status_sincronizacao(usuario: str, db: Session = Depends(get_db_leitura)):
     """Obtém status de sincronização de um usuário específico"""
     try:
         sync_service = SyncService(db)
@@ -341,7 +1164,7 @@ async def obter_status_sincronizacao(usuario: str, db: Session = Depends(get_db)
         raise HTTPException(status_code=500, detail=f"Erro ao obter status: {str(e)}")
 
 @app.get("/sincronizar/historico/{usuario}")
-async def obter_historico_sincronizacao(usuario: str, limit: int = 10, db: Session = Depends(get_db)):
+async def obter_historico_sincronizacao(usuario: str, limit: int = 10, db: Session = Depends(get_db_leitura)):
     """Obtém histórico de sincronizações de um usuário"""
     try:
         historico = db.query(SyncLog).filter(
@@ -364,7 +1187,7 @@ async def obter_historico_sincronizacao(usuario: str, limit: int = 10, db: Sessi
         raise HTTPException(status_code=500, detail=f"Erro ao obter histórico: {str(e)}")
 
 @app.get("/sincronizar/usuarios")
-async def listar_usuarios_sincronizados(db: Session = Depends(get_db)):
+async def listar_usuarios_sincronizados(db: Session = Depends(get_db_leitura)):
     """Lista todos os usuários que já sincronizaram dados"""
     try:
         usuarios = db.query(SyncLog.usuario).distinct().all()
@@ -379,9 +1202,52 @@ async def testar_sincronizacao():
         "status": "ok",
         "message": "Servidor de sincronização funcionando",
         "timestamp": datetime.utcnow(),
-        "version": "1.0.0"
+        "version": API_VERSION
+    }
+
+# === BOOTSTRAP DO CLIENTE ===
+# Conteúdo fixo do pacote: entra no ETag junto com as versões das tabelas
+CONTEUDO_FIXO_BOOTSTRAP = json.dumps(
+    [BOOTSTRAP_VERSION, API_VERSION, UNIDADES_DISPONIVEIS, ITENS_POR_ESPECIE], sort_keys=True
+)
+
+@app.get("/bootstrap")
+async def obter_bootstrap(
+    response: Response,
+    usuario: Optional[str] = None,
+    limit: int = 100,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Pacote inicial do cliente em uma única requisição: unidades, catálogo de
+    itens, policiais e proprietários mais recentes, status de sincronização do
+    usuário e versão do servidor. Suporta ETag/If-None-Match.
+    """
+    etag, ultima_alteracao = obter_versoes(
+        db, "policial", "proprietario", "sync_log", extra=CONTEUDO_FIXO_BOOTSTRAP
+    )
+    nao_modificado = resposta_condicional(response, etag, ultima_alteracao, if_none_match, if_modified_since)
+    if nao_modificado:
+        return nao_modificado
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    policiais = db.query(Policial).order_by(Policial.id.desc()).limit(limit).all()
+    proprietarios = db.query(Proprietario).order_by(Proprietario.id.desc()).limit(limit).all()
+
+    return {
+        "versao_bootstrap": BOOTSTRAP_VERSION,
+        "versao_servidor": API_VERSION,
+        "unidades": UNIDADES_DISPONIVEIS,
+        "itens_por_especie": ITENS_POR_ESPECIE,
+        "policiais": [PolicialResponse.model_validate(p) for p in policiais],
+        "proprietarios": [ProprietarioResponse.model_validate(p) for p in proprietarios],
+        "sincronizacao": SyncService(db).obter_status_sincronizacao(usuario) if usuario else None
     }
 
+TEMPOS_INICIALIZACAO["importacao_app"] = time.perf_counter() - _inicio_importacao
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
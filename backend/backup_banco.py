@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+SECRIMPO - Backup e restauração do banco compartilhado
+
+Backups completos e incrementais (só as páginas alteradas desde o último
+backup), comprimidos, na pasta backups/ do armazenamento compartilhado, e
+restauração de qualquer backup reaplicando a cadeia de incrementais sobre o
+completo. Os backups ficam listados no catálogo (backups/catalogo.json) e os
+antigos são removidos pela política de retenção (BACKUP_RETENCAO).
+
+Uso:
+  python backup_banco.py completo
+  python backup_banco.py incremental
+  python backup_banco.py listar
+  python backup_banco.py podar
+  python backup_banco.py restaurar <arquivo_de_backup> <banco_destino>
+
+--pasta define a pasta compartilhada (padrão: configuração salva ou detecção automática).
+"""
+import argparse
+import os
+import sys
+
+import config
+from shared_storage import SharedStorageManager
+
+def obter_storage(pasta):
+    if pasta:
+        return SharedStorageManager(pasta, setup_dirs=False)
+    # Pasta de shared_config.json (se acessível) ou detecção automática
+    return config.STORAGE_MANAGER or SharedStorageManager(setup_dirs=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup e restauração do banco SECRIMPO")
+    parser.add_argument("--pasta", help="Pasta compartilhada")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("completo", help="Backup completo")
+    comandos.add_parser("incremental", help="Backup só das páginas alteradas desde o último backup")
+    comandos.add_parser("listar", help="Lista os backups do catálogo")
+    comandos.add_parser("podar", help="Remove os backups fora da política de retenção")
+    restaurar = comandos.add_parser("restaurar", help="Restaura um backup (completo ou incremental)")
+    restaurar.add_argument("arquivo", help="Arquivo de backup (.db ou .inc)")
+    restaurar.add_argument("destino", help="Banco a ser criado com o conteúdo do backup")
+    args = parser.parse_args()
+
+    storage = obter_storage(args.pasta)
+    print(f"🗂️  Pasta compartilhada: {storage.shared_path}")
+
+    if args.comando == "listar":
+        backups = storage.list_backups()
+        for backup in backups:
+            print(f"   {backup['criado_em'][:19]}  {backup['tipo']:<11} {backup['tamanho_bytes'] / 1024:>10.1f} KB  "
+                  f"{backup['arquivo']}")
+        print(f"📋 {len(backups)} backup(s), {sum(b['tamanho_bytes'] for b in backups) / 1024 / 1024:.1f} MB")
+        return 0
+
+    if args.comando == "podar":
+        print(f"✅ {len(storage.prune_backups())} backup(s) removido(s)")
+        return 0
+
+    if args.comando == "restaurar":
+        # Nome de arquivo do catálogo também é aceito (relativo à pasta de backups)
+        if not os.path.exists(args.arquivo):
+            args.arquivo = str(storage.get_backups_path() / args.arquivo)
+        try:
+            resultado = storage.restore_backup(args.arquivo, args.destino)
+        except (OSError, ValueError) as e:
+            print(f"❌ Erro ao restaurar: {e}")
+            return 1
+        print(f"✅ Restaurado em {resultado['duracao_segundos']}s (quick_check: {resultado['verificacao']})")
+        return 0
+
+    caminho = storage.create_backup(incremental=args.comando == "incremental")
+    if caminho is None:
+        print("❌ Backup não realizado")
+        return 1
+    print(f"✅ Backup: {caminho}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+SECRIMPO - Benchmark das listagens da API
+Compara linhas/segundo de /ocorrencias/ e /itens/ no caminho padrão
+(ORM + response_model Pydantic) e no caminho rápido (?rapido=true: Core + orjson)
+
+Usa um banco SQLite temporário populado com dados sintéticos.
+Requer httpx (usado pelo TestClient do FastAPI).
+
+Uso: python benchmark_api.py [--ocorrencias 20000] [--repeticoes 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app as api
+from config import MAX_PAGE_SIZE
+from services import fast_json
+
+def popular_banco(engine, total_ocorrencias, itens_por_ocorrencia=2):
+    """Insere policiais, proprietários, ocorrências e itens sintéticos"""
+    api.Base.metadata.create_all(bind=engine)
+    unidades = ["8ª CPR", "10ª CPR", "16ª CPR"]
+    inicio = date(2025, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(api.Policial), [
+            {"id": i, "nome": f"Policial {i}", "matricula": f"M{i:05d}", "graduacao": "Soldado",
+             "unidade": unidades[i % 3]}
+            for i in range(1, 51)
+        ])
+        conn.execute(insert(api.Proprietario), [
+            {"id": i, "nome": f"Proprietário {i}", "documento": f"{i:011d}"}
+            for i in range(1, 1001)
+        ])
+        conn.execute(insert(api.Ocorrencia), [
+            {"id": i, "numero_genesis": f"G{i:08d}", "unidade_fato": unidades[i % 3],
+             "data_apreensao": inicio + timedelta(days=i % 365), "lei_infringida": "Lei 11.343/06",
+             "artigo": "Art. 28", "policial_condutor_id": i % 50 + 1}
+            for i in range(1, total_ocorrencias + 1)
+        ])
+        conn.execute(insert(api.ItemApreendido), [
+            {"especie": "Entorpecente", "item": "Maconha", "quantidade": 1,
+             "descricao_detalhada": "Porção embalada em plástico", "ocorrencia_id": i,
+             "proprietario_id": i % 1000 + 1, "policial_id": i % 50 + 1}
+            for i in range(1, total_ocorrencias + 1)
+            for _ in range(itens_por_ocorrencia)
+        ])
+
+def medir(client, url, total_linhas, rapido, repeticoes):
+    """Percorre a listagem completa em páginas e retorna linhas/segundo (melhor repetição)"""
+    melhor = None
+    for _ in range(repeticoes):
+        linhas = 0
+        inicio = time.perf_counter()
+        params = {"limit": MAX_PAGE_SIZE, "rapido": rapido}
+        skip = 0
+        while linhas < total_linhas:
+            if url == "/ocorrencias/" and skip:
+                params["cursor"] = cursor
+            elif skip:
+                params["skip"] = skip
+            resposta = client.get(url, params=params)
+            pagina = resposta.json()
+            if not pagina:
+                break
+            linhas += len(pagina)
+            skip += len(pagina)
+            cursor = resposta.headers.get("X-Next-Cursor")
+            if url == "/ocorrencias/" and not cursor:
+                break
+        decorrido = time.perf_counter() - inicio
+        taxa = linhas / decorrido
+        melhor = taxa if melhor is None else max(melhor, taxa)
+    return melhor
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das listagens da API SECRIMPO")
+    parser.add_argument("--ocorrencias", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'benchmark.db')}")
+        popular_banco(engine, args.ocorrencias)
+        SessionBenchmark = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def get_db_benchmark():
+            db = SessionBenchmark()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        api.app.dependency_overrides[api.get_db] = get_db_benchmark
+        client = TestClient(api.app)
+
+        print("=" * 60)
+        print("📊 SECRIMPO - Benchmark das listagens")
+        print(f"   Serializador rápido: {'orjson' if fast_json.orjson else 'json (biblioteca padrão)'}")
+        print("=" * 60)
+
+        for url, total in [("/ocorrencias/", args.ocorrencias), ("/itens/", args.ocorrencias * 2)]:
+            padrao = medir(client, url, total, False, args.repeticoes)
+            rapido = medir(client, url, total, True, args.repeticoes)
+            print(f"\n{url}")
+            print(f"   Padrão (ORM + Pydantic): {padrao:>10,.0f} linhas/s")
+            print(f"   Rápido (Core + JSON):    {rapido:>10,.0f} linhas/s")
+            print(f"   Ganho: {rapido / padrao:.1f}x")
+
+        api.app.dependency_overrides.clear()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+SECRIMPO - Benchmark modo compartilhado x modo servidor
+
+Vários clientes simultâneos (processos) executam a mesma mistura de leituras
+(página de ocorrências) e escritas (nova ocorrência):
+- arquivo: cada cliente abre o SQLite diretamente, como cada estação faz no
+  modo compartilhado. Use --pasta com a pasta de rede para medir o SMB real;
+- servidor: uma API (uvicorn) com o banco no disco local e os clientes via
+  HTTP, como no modo servidor (start_api.py --servidor).
+
+No modo arquivo o tempo medido é só o do banco (sem a API da estação), então
+a comparação favorece o modo compartilhado.
+
+Uso: python benchmark_modos.py [--clientes 4] [--operacoes 200] [--escritas 0.2] [--pasta pasta] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from services.conectividade import resumo_latencias
+
+LEITURA_SQL = "SELECT * FROM ocorrencia ORDER BY id DESC LIMIT 50"
+ESCRITA_SQL = ("INSERT INTO ocorrencia (numero_genesis, unidade_fato, data_apreensao, lei_infringida, artigo, "
+               "policial_condutor_id) VALUES (?, ?, ?, ?, ?, ?)")
+
+def nova_ocorrencia(cliente, operacao):
+    return {"numero_genesis": f"B{cliente:02d}{operacao:06d}", "unidade_fato": "8ª CPR",
+            "data_apreensao": date.today().isoformat(), "lei_infringida": "Lei 11.343/06",
+            "artigo": "Art. 28", "policial_condutor_id": operacao % 50 + 1}
+
+def criar_banco(caminho, ocorrencias):
+    from benchmark_api import popular_banco
+
+    engine = create_engine(f"sqlite:///{caminho}")
+    popular_banco(engine, ocorrencias, itens_por_ocorrencia=1)
+    engine.dispose()
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+
+def executar_cliente(cliente, operacoes, fracao_escritas, iniciar, fila, operar):
+    """Executa a mistura de operações e envia as latências (ms) para a fila"""
+    sorteio = random.Random(cliente)
+    resultado = {"leitura": [], "escrita": [], "erros": 0, "ultimo_erro": None}
+    iniciar.wait()
+    for operacao in range(operacoes):
+        tipo = "escrita" if sorteio.random() < fracao_escritas else "leitura"
+        inicio = time.perf_counter()
+        try:
+            operar(tipo, cliente, operacao)
+        except Exception as e:
+            resultado["erros"] += 1
+            resultado["ultimo_erro"] = str(e)
+            continue
+        resultado[tipo].append((time.perf_counter() - inicio) * 1000)
+    fila.put(resultado)
+
+def cliente_arquivo(caminho, cliente, operacoes, fracao_escritas, iniciar, fila):
+    conn = sqlite3.connect(caminho, timeout=30)  # mesmo timeout do modo compartilhado
+
+    def operar(tipo, cliente, operacao):
+        if tipo == "leitura":
+            conn.execute(LEITURA_SQL).fetchall()
+        else:
+            with conn:
+                conn.execute(ESCRITA_SQL, tuple(nova_ocorrencia(cliente, operacao).values()))
+
+    try:
+        executar_cliente(cliente, operacoes, fracao_escritas, iniciar, fila, operar)
+    finally:
+        conn.close()
+
+def cliente_http(url, cliente, operacoes, fracao_escritas, iniciar, fila):
+    import httpx
+
+    with httpx.Client(base_url=url, timeout=60) as http:
+        def operar(tipo, cliente, operacao):
+            if tipo == "leitura":
+                resposta = http.get("/ocorrencias/", params={"limit": 50})
+            else:
+                resposta = http.post("/ocorrencias/", json=nova_ocorrencia(cliente, operacao))
+            resposta.raise_for_status()
+
+        executar_cliente(cliente, operacoes, fracao_escritas, iniciar, fila, operar)
+
+def medir(alvo, destino, clientes, operacoes, fracao_escritas):
+    """Inicia os clientes juntos e agrega latências, vazão e erros"""
+    iniciar = multiprocessing.Event()
+    fila = multiprocessing.Queue()
+    processos = [
+        multiprocessing.Process(target=alvo, args=(destino, cliente, operacoes, fracao_escritas, iniciar, fila))
+        for cliente in range(clientes)
+    ]
+    for processo in processos:
+        processo.start()
+    inicio = time.perf_counter()
+    iniciar.set()
+    resultados = [fila.get() for _ in processos]
+    duracao = time.perf_counter() - inicio
+    for processo in processos:
+        processo.join()
+
+    latencias = {"leitura": [], "escrita": []}
+    for resultado in resultados:
+        for tipo in latencias:
+            latencias[tipo].extend(resultado[tipo])
+    concluidas = sum(len(valores) for valores in latencias.values())
+    return {
+        "clientes": clientes,
+        "operacoes": clientes * operacoes,
+        "concluidas": concluidas,
+        "erros": sum(resultado["erros"] for resultado in resultados),
+        "ultimo_erro": next((r["ultimo_erro"] for r in resultados if r["ultimo_erro"]), None),
+        "duracao_segundos": round(duracao, 3),
+        "operacoes_por_segundo": round(concluidas / duracao, 1),
+        **{tipo: {chave: round(valor, 2) if isinstance(valor, float) else valor
+                  for chave, valor in resumo_latencias(valores).items()}
+           for tipo, valores in latencias.items()},
+    }
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(banco, porta, limite=60):
+    """API em um processo uvicorn usando `banco` como banco local (SECRIMPO_DATABASE)"""
+    import httpx
+
+    ambiente = {**os.environ, "SECRIMPO_DATABASE": banco}
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=ambiente,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    fim = time.time() + limite
+    while time.time() < fim:
+        try:
+            if httpx.get(f"http://127.0.0.1:{porta}/", timeout=1).status_code == 200:
+                return servidor
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    servidor.terminate()
+    raise RuntimeError("A API do benchmark não respondeu a tempo")
+
+def imprimir(modo, resultado):
+    print(f"\n{modo}")
+    print(f"   Vazão: {resultado['operacoes_por_segundo']:>8.1f} op/s "
+          f"({resultado['concluidas']}/{resultado['operacoes']} em {resultado['duracao_segundos']}s, "
+          f"{resultado['erros']} erro(s))")
+    for tipo in ("leitura", "escrita"):
+        latencia = resultado[tipo]
+        if latencia["amostras"]:
+            print(f"   {tipo.capitalize():<8} p50 {latencia['p50_ms']:>8.2f} ms   p95 {latencia['p95_ms']:>8.2f} ms   "
+                  f"p99 {latencia['p99_ms']:>8.2f} ms")
+    if resultado["ultimo_erro"]:
+        print(f"   Último erro: {resultado['ultimo_erro']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark modo compartilhado x modo servidor")
+    parser.add_argument("--clientes", type=int, default=4)
+    parser.add_argument("--operacoes", type=int, default=200, help="Operações por cliente")
+    parser.add_argument("--escritas", type=float, default=0.2, help="Fração de escritas (0 a 1)")
+    parser.add_argument("--ocorrencias", type=int, default=2000, help="Ocorrências no banco inicial")
+    parser.add_argument("--pasta", help="Pasta do banco no modo arquivo (ex.: pasta compartilhada)")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    local = tempfile.mkdtemp(prefix="secrimpo_benchmark_")
+    pasta = args.pasta or local
+    banco_arquivo = os.path.join(pasta, "benchmark_modos.db")
+    banco_servidor = os.path.join(local, "servidor.db")
+    try:
+        criar_banco(banco_arquivo, args.ocorrencias)
+        shutil.copyfile(banco_arquivo, banco_servidor)
+
+        resultados = {"arquivo": medir(cliente_arquivo, banco_arquivo, args.clientes, args.operacoes, args.escritas)}
+        porta = porta_livre()
+        servidor = iniciar_servidor(banco_servidor, porta)
+        try:
+            resultados["servidor"] = medir(cliente_http, f"http://127.0.0.1:{porta}", args.clientes,
+                                           args.operacoes, args.escritas)
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+    finally:
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(banco_arquivo + sufixo):
+                os.remove(banco_arquivo + sufixo)
+        shutil.rmtree(local, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"pasta": pasta, "escritas": args.escritas, **resultados}, indent=2, ensure_ascii=False))
+        return
+
+    print("=" * 60)
+    print("📊 SECRIMPO - Modo compartilhado x modo servidor")
+    print(f"   {args.clientes} cliente(s) x {args.operacoes} operações, {args.escritas:.0%} escritas")
+    print(f"   Banco no modo arquivo: {pasta}")
+    print("=" * 60)
+    imprimir("Arquivo (SQLite aberto por cada estação)", resultados["arquivo"])
+    imprimir("Servidor (API HTTP, banco local no servidor)", resultados["servidor"])
+
+if __name__ == "__main__":
+    main()
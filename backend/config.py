@@ -1,17 +1,74 @@
 """
 Configurações da API SECRIMPO
+
+A configuração de armazenamento (DATABASE_URL, EXPORTS_DIR, SHARED_MODE...)
+é resolvida sob demanda no primeiro acesso, para que importar este módulo
+não toque na pasta compartilhada nem no banco.
 """
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 # Diretórios base
 BASE_DIR = Path(__file__).parent.parent
 MODELS_DIR = BASE_DIR / "models"
 
+# Tempos das etapas de inicialização (segundos), preenchidos conforme ocorrem
+TEMPOS_INICIALIZACAO = {}
+
+@contextmanager
+def medir_inicializacao(etapa):
+    """Registra em TEMPOS_INICIALIZACAO a duração de uma etapa de inicialização"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        TEMPOS_INICIALIZACAO[etapa] = time.perf_counter() - inicio
+
+def relatorio_inicializacao():
+    """Retorna o relatório de tempos de inicialização em texto"""
+    linhas = ["[CLOCK] Tempos de inicialização:"]
+    for etapa, segundos in TEMPOS_INICIALIZACAO.items():
+        linhas.append(f"   {etapa}: {segundos * 1000:.1f} ms")
+    linhas.append(f"   total: {sum(TEMPOS_INICIALIZACAO.values()) * 1000:.1f} ms")
+    return "\n".join(linhas)
+
+class BancoMigradoParaServidor(Exception):
+    """O banco da pasta compartilhada foi migrado para um servidor (modo servidor)"""
+    pass
+
+def ler_marcador_servidor(pasta_database):
+    """Conteúdo do marcador deixado pela migração para o modo servidor (None se não migrado)"""
+    marcador = Path(pasta_database) / MARCADOR_SERVIDOR
+    if not marcador.exists():
+        return None
+    with open(marcador, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _config_local(database_path):
+    database_path = Path(database_path)
+    exports_dir = BASE_DIR / "exports"
+    database_path.parent.mkdir(parents=True, exist_ok=True)
+    exports_dir.mkdir(exist_ok=True)
+    return {
+        "database_url": f"sqlite:///{database_path}",
+        "database_dir": database_path.parent,
+        "exports_dir": exports_dir,
+        "shared_mode": False,
+        "storage_manager": None
+    }
+
 # Configuração de armazenamento compartilhado
 def get_storage_config():
     """Obtém configuração de armazenamento (compartilhado ou local)"""
+    if os.getenv("SECRIMPO_DATABASE"):
+        # Banco local explícito (PC servidor, benchmarks): ignora a pasta compartilhada
+        print(f"[INFO] Usando banco local definido em SECRIMPO_DATABASE: {os.getenv('SECRIMPO_DATABASE')}")
+        return _config_local(os.getenv("SECRIMPO_DATABASE"))
+
     try:
         # Tentar carregar configuração de armazenamento compartilhado
         shared_config_path = Path(__file__).parent.parent / "shared_config.json"
@@ -22,12 +79,24 @@ def get_storage_config():
             
             # Importar aqui para evitar dependência circular
             from shared_storage import SharedStorageManager
-            storage = SharedStorageManager(config.get("shared_path"))
+            storage = SharedStorageManager(config.get("shared_path"), setup_dirs=False)
             
-            # Testar conectividade
-            is_connected, message = storage.test_connectivity()
+            # O modo inicial vem de uma verificação só de leitura (stat da pasta, com
+            # prazo curto): sem criar arquivos nem abrir o SQLite na inicialização.
+            # O monitor sonda em segundo plano e corrige o modo depois
+            acessivel, mensagem = storage.verificar_acesso()
+            monitor = storage.obter_monitor()
+            monitor.definir_estado_inicial(acessivel, mensagem)
             
-            if is_connected:
+            if acessivel:
+                marcador = ler_marcador_servidor(storage.shared_path / "database")
+                if marcador is not None:
+                    monitor.encerrar()
+                    raise BancoMigradoParaServidor(
+                        f"O banco de {storage.shared_path} foi migrado para o servidor {marcador['api_url']} "
+                        f"em {marcador['migrado_em'][:19]}. Configure esta estação como cliente "
+                        f"(server_config.json) em vez de abrir o banco pela pasta compartilhada."
+                    )
                 print(f"[CHECK] Usando armazenamento compartilhado: {storage.shared_path}")
                 return {
                     "database_url": f"sqlite:///{storage.get_database_path()}",
@@ -36,9 +105,27 @@ def get_storage_config():
                     "shared_mode": True,
                     "storage_manager": storage
                 }
+            elif DIARIO_ATIVO:
+                # Continua no banco compartilhado: escritas no diário, reproduzidas quando a
+                # pasta voltar; nunca um banco local separado (os dados divergiriam)
+                print(f"[WARNING] Armazenamento compartilhado inacessível ou lento: {mensagem}")
+                if REPLICA_ATIVA and REPLICA_CAMINHO.exists():
+                    print("[INFO] Modo offline: leituras da réplica local e escritas no diário até a pasta voltar")
+                else:
+                    print("[WARNING] Modo offline sem réplica local: leituras indisponíveis (503) e "
+                          "escritas no diário até a pasta voltar")
+                return {
+                    "database_url": f"sqlite:///{storage.get_database_path()}",
+                    "database_dir": storage.shared_path / "database",
+                    "exports_dir": storage.get_exports_path(),
+                    "shared_mode": True,
+                    "storage_manager": storage
+                }
             else:
-                print(f"[WARNING] Armazenamento compartilhado inacessível: {message}")
-                print("[INFO] Usando modo local como fallback")
+                # DIARIO_ATIVO=0: comportamento anterior, banco local separado
+                monitor.encerrar()
+                print(f"[WARNING] Armazenamento compartilhado inacessível ou lento: {mensagem}")
+                print("[INFO] Usando modo local como fallback (DIARIO_ATIVO=0)")
         
         # Fallback para modo local
         print("[INFO] Usando armazenamento local")
@@ -57,8 +144,14 @@ def get_storage_config():
             "storage_manager": None
         }
         
+    except BancoMigradoParaServidor:
+        # Não cai para o banco local: as escritas divergiriam do servidor
+        raise
     except Exception as e:
         print(f"[ERROR] Erro na configuração de armazenamento: {e}")
+        if DIARIO_ATIVO and (BASE_DIR / "shared_config.json").exists():
+            # Pasta compartilhada configurada: falha em vez de abrir um banco local divergente
+            raise
         # Fallback para local em caso de erro
         database_dir = BASE_DIR / "database"
         exports_dir = BASE_DIR / "exports"
@@ -74,38 +167,91 @@ def get_storage_config():
             "storage_manager": None
         }
 
-# Obter configuração de armazenamento
-STORAGE_CONFIG = get_storage_config()
+# Detecção automática da pasta compartilhada (SharedStorageManager sem caminho)
+STORAGE_SONDAGEM_TIMEOUT_SEGUNDOS = 3  # Prazo das sondagens paralelas dos candidatos
+STORAGE_DETECCAO_CACHE_HORAS = 24  # Validade da pasta detectada (evita sondar a cada início)
+STORAGE_DETECCAO_CACHE_ARQUIVO = BASE_DIR / "shared_path_cache.json"
+STORAGE_VERIFICACAO_TIMEOUT_SEGUNDOS = 2  # Prazo do stat da pasta que decide o modo na inicialização
 
-# Configurações do banco de dados
-DATABASE_URL = STORAGE_CONFIG["database_url"]
-DATABASE_DIR = STORAGE_CONFIG["database_dir"]
-EXPORTS_DIR = STORAGE_CONFIG["exports_dir"]
-SHARED_MODE = STORAGE_CONFIG["shared_mode"]
-STORAGE_MANAGER = STORAGE_CONFIG["storage_manager"]
+# Monitor de conectividade da pasta compartilhada (latência de leitura/escrita)
+CONECTIVIDADE_INTERVALO_SEGUNDOS = 15  # Intervalo entre sondagens em segundo plano
+CONECTIVIDADE_TIMEOUT_SEGUNDOS = 5  # Sondagem sem resposta neste prazo = offline
+CONECTIVIDADE_LATENCIA_DEGRADADA_MS = int(os.getenv("CONECTIVIDADE_LATENCIA_DEGRADADA_MS", "500"))
+CONECTIVIDADE_AMOSTRAS_DECISAO = 3  # Sondagens seguidas acima/abaixo do limite para trocar de modo
+CONECTIVIDADE_JANELA_AMOSTRAS = 100  # Sondagens usadas nos percentis de latência
 
-DATABASE_ECHO = True  # Para debug, desabilitar em produção
+# Réplica local de leitura (modo compartilhado): leituras locais, escritas no banco compartilhado
+REPLICA_ATIVA = os.getenv("REPLICA_ATIVA", "1") == "1"
+REPLICA_CAMINHO = BASE_DIR / "database" / "replica_secrimpo.db"
+REPLICA_INTERVALO_SEGUNDOS = 2  # Atualização incremental em segundo plano
+REPLICA_MAX_ATRASO_SEGUNDOS = float(os.getenv("REPLICA_MAX_ATRASO_SEGUNDOS", "5"))  # Atraso máximo servido nas leituras
 
-# Configurações SQLite para rede (se em modo compartilhado)
-if SHARED_MODE:
-    SQLITE_CONFIG = {
-        "pool_timeout": 30,
-        "pool_recycle": 3600,
-        "connect_args": {
-            "timeout": 30,
-            "check_same_thread": False
+# Diário de escritas (modo compartilhado com a pasta fora do ar)
+DIARIO_ATIVO = os.getenv("DIARIO_ATIVO", "1") == "1"
+DIARIO_CAMINHO = BASE_DIR / "database" / "diario_escritas.db"
+DIARIO_TAMANHO_LOTE = 200  # Escritas reproduzidas por transação no banco compartilhado
+
+# Modo servidor: um PC hospeda o banco localmente e serve a API; as estações usam HTTP
+SERVER_CONFIG_ARQUIVO = BASE_DIR / "server_config.json"  # URL da API lida pelo frontend
+MARCADOR_SERVIDOR = "servidor.json"  # Na pasta database/ compartilhada após a migração
+
+_storage_config = None
+_storage_lock = threading.Lock()
+
+def obter_storage_config():
+    """Resolve a configuração de armazenamento no primeiro uso e a reutiliza depois"""
+    global _storage_config
+    if _storage_config is None:
+        with _storage_lock:
+            if _storage_config is None:
+                with medir_inicializacao("configuracao_armazenamento"):
+                    _storage_config = get_storage_config()
+    return _storage_config
+
+def _sqlite_config(shared_mode):
+    """Configurações SQLite para rede (se em modo compartilhado)"""
+    if shared_mode:
+        return {
+            "pool_timeout": 30,
+            "pool_recycle": 3600,
+            "connect_args": {
+                "timeout": 30,
+                "check_same_thread": False
+            }
         }
-    }
-else:
-    SQLITE_CONFIG = {
+    return {
         "connect_args": {
             "check_same_thread": False
         }
     }
 
+# Configurações do banco de dados, resolvidas sob demanda (ver __getattr__)
+_CONFIG_SOB_DEMANDA = {
+    "STORAGE_CONFIG": lambda config: config,
+    "DATABASE_URL": lambda config: config["database_url"],
+    "DATABASE_DIR": lambda config: config["database_dir"],
+    "EXPORTS_DIR": lambda config: config["exports_dir"],
+    "SHARED_MODE": lambda config: config["shared_mode"],
+    "STORAGE_MANAGER": lambda config: config["storage_manager"],
+    "MONITOR_CONECTIVIDADE": lambda config: config["storage_manager"] and config["storage_manager"].monitor,
+    "SQLITE_CONFIG": lambda config: _sqlite_config(config["shared_mode"]),
+}
+
+def __getattr__(name):
+    if name in _CONFIG_SOB_DEMANDA:
+        valor = _CONFIG_SOB_DEMANDA[name](obter_storage_config())
+        globals()[name] = valor
+        return valor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Log de SQL do SQLAlchemy: caro em rede, habilitar só para debug (DATABASE_ECHO=1)
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "0") == "1"
+
 # Configurações da API
-API_HOST = "127.0.0.1"
-API_PORT = 8000
+API_VERSION = "1.0.0"
+BOOTSTRAP_VERSION = 1  # Versão do formato do pacote /bootstrap
+API_HOST = os.getenv("API_HOST", "127.0.0.1")  # 0.0.0.0 no PC servidor (start_api.py --servidor)
+API_PORT = int(os.getenv("API_PORT", "8000"))
 API_RELOAD = True  # Para desenvolvimento
 
 # Configurações CORS
@@ -118,8 +264,37 @@ CORS_ORIGINS = [
 ]
 
 # Configurações de exportação
-EXPORT_MAX_RECORDS = 10000  # Limite máximo de registros por exportação
-EXPORT_FORMATS = ["xlsx", "csv"]  # Formatos suportados
+EXPORT_MAX_RECORDS = int(os.getenv("EXPORT_MAX_RECORDS", "10000"))  # Linhas por aba/arquivo; acima disso a exportação é dividida em partes
+EXPORT_BATCH_SIZE = 1000  # Linhas lidas do banco por lote durante a exportação
+EXPORT_FORMATS = ["xlsx", "csv", "jsonl", "parquet"]  # Formatos suportados (parquet requer pyarrow)
+EXPORT_MAX_JOBS = int(os.getenv("EXPORT_MAX_JOBS", "2"))  # Exportações em segundo plano simultâneas (processos)
+EXPORT_MAX_JOBS_PENDENTES = 10  # Jobs aguardando na fila antes de recusar novos pedidos
+EXPORT_JOB_TTL_HORAS = 24  # Tempo de retenção dos arquivos gerados por jobs
+EXPORT_CACHE_MAX_MB = 500  # Tamanho máximo do cache de exportações (EXPORTS_DIR/cache)
+EXPORT_CACHE_MAX_ARQUIVOS = 200  # Quantidade máxima de arquivos no cache de exportações
+
+# Configurações de backup (API de backup online do SQLite)
+BACKUP_PAGINAS_POR_PASSO = 256  # Páginas copiadas por passo (256 x 4 KB = 1 MB)
+BACKUP_PAUSA_SEGUNDOS = 0.05  # Pausa entre passos, para não monopolizar a rede e o banco
+BACKUP_MAX_REINICIOS = 3  # Reinícios (escritas de outros clientes) antes de copiar o restante de uma vez
+BACKUP_MAX_INCREMENTAIS = 6  # Incrementais sobre um backup completo antes de iniciar uma nova cadeia
+BACKUP_COMPRESSAO = os.getenv("BACKUP_COMPRESSAO", "auto")  # auto (zstd ou gzip), zstd, gzip ou nenhuma
+BACKUP_NIVEL_ZSTD = 3
+BACKUP_NIVEL_GZIP = 6
+# Retenção avô-pai-filho: último backup de cada um dos N dias, semanas e meses mais recentes
+BACKUP_RETENCAO = {"diarios": 7, "semanais": 4, "mensais": 12}
+
+# Manutenção do banco em segundo plano (checkpoint do WAL, optimize, incremental vacuum)
+MANUTENCAO_ATIVA = os.getenv("MANUTENCAO_ATIVA", "1") == "1"
+MANUTENCAO_INTERVALO_SEGUNDOS = 30  # Intervalo entre verificações
+MANUTENCAO_OCIOSO_SEGUNDOS = 5  # Tempo sem requisições para considerar a API ociosa
+MANUTENCAO_WAL_PASSIVO_MB = 4  # WAL a partir deste tamanho: checkpoint PASSIVE
+MANUTENCAO_WAL_TRUNCATE_MB = 64  # WAL a partir deste tamanho: checkpoint TRUNCATE (zera o arquivo)
+MANUTENCAO_OPTIMIZE_HORAS = 6  # Intervalo entre execuções de PRAGMA optimize
+MANUTENCAO_VACUUM_PAGINAS_LIVRES = 256  # Páginas livres para acionar incremental_vacuum
+MANUTENCAO_VACUUM_PAGINAS_POR_CICLO = 1024  # Páginas liberadas por ciclo, no máximo
+# Checkpoint automático das conexões da API com o agendador ativo (limite de segurança)
+SQLITE_WAL_AUTOCHECKPOINT = 10000
 
 # Configurações de paginação
 DEFAULT_PAGE_SIZE = 50
@@ -132,14 +307,22 @@ UNIDADES_DISPONIVEIS = [
     "16ª CPR"
 ]
 
+# Catálogo de itens por espécie (usado nos formulários do frontend)
+ITENS_POR_ESPECIE = {
+    "Entorpecente": ["Maconha", "Cocaína", "Crack", "Ecstasy", "LSD", "Heroína", "Outros"],
+    "Arma": ["Pistola", "Revólver", "Rifle", "Espingarda", "Arma Branca", "Outros"],
+    "Munição": ["Cartuchos", "Balas", "Projéteis", "Outros"],
+    "Documento": ["RG", "CPF", "CNH", "Passaporte", "Certidão", "Outros"],
+    "Dinheiro": ["Real", "Dólar", "Euro", "Outros"],
+    "Eletrônico": ["Celular", "Notebook", "Tablet", "TV", "Som", "Outros"],
+    "Veículo": ["Carro", "Moto", "Bicicleta", "Caminhão", "Outros"],
+    "Outros": ["Diversos"]
+}
+
 # Configurações de logging
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-# Criar diretórios se não existirem
-EXPORTS_DIR.mkdir(exist_ok=True)
-DATABASE_DIR.mkdir(exist_ok=True)
-
 # Configurações específicas do ambiente
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
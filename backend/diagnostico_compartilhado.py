@@ -2,13 +2,30 @@
 """
 SECRIMPO - Diagnóstico de Pasta Compartilhada
 Script para verificar status e resolver problemas com armazenamento compartilhado
+
+Uso:
+  python diagnostico_compartilhado.py                 # diagnóstico completo (interativo)
+  python diagnostico_compartilhado.py --benchmark     # só o benchmark de concorrência, em JSON
+      [--clientes 8] [--operacoes 200] [--mistura leitura=0.7,insercao=0.2,sincronizacao=0.1]
+      [--processos] [--lote 50] [--timeout 5] [--banco caminho.db] [--saida resultado.json]
 """
+import argparse
 import os
+import random
 import sqlite3
+import sys
+import threading
 import time
 import json
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, date
+
+from services.conectividade import resumo_latencias
+
+# Mistura padrão do benchmark de concorrência (fração de cada operação)
+MISTURA_PADRAO = {"leitura": 0.7, "insercao": 0.2, "sincronizacao": 0.1}
 
 def test_database_performance(db_path, num_tests=5):
     """Testa performance do banco de dados"""
@@ -47,6 +64,245 @@ def test_database_performance(db_path, num_tests=5):
     
     return None
 
+def _ocupado(erro):
+    """SQLITE_BUSY/SQLITE_LOCKED: outro cliente manteve a trava além do timeout"""
+    nome = getattr(erro, "sqlite_errorname", "") or ""
+    return nome.startswith(("SQLITE_BUSY", "SQLITE_LOCKED")) or "locked" in str(erro) or "busy" in str(erro)
+
+def _operacao_leitura(conn, cliente, contador, lote):
+    # Listagem como a da API: página mais recente de ocorrências e seus itens
+    ocorrencias = conn.execute("SELECT * FROM ocorrencia ORDER BY id DESC LIMIT 50").fetchall()
+    if ocorrencias:
+        conn.execute("SELECT * FROM item_apreendido WHERE ocorrencia_id >= ?", (ocorrencias[-1][0],)).fetchall()
+    return 0
+
+def _inserir_ocorrencia(conn, cliente, numero, policial_id):
+    cursor = conn.execute(
+        "INSERT INTO ocorrencia (numero_genesis, unidade_fato, data_apreensao, lei_infringida, artigo, "
+        "policial_condutor_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (f"DIAG-{cliente:02d}-{numero:06d}", "8ª CPR", date.today().isoformat(), "Lei 11.343/06", "Art. 28",
+         policial_id)
+    )
+    return cursor.lastrowid
+
+def _operacao_insercao(conn, cliente, contador, lote):
+    # Cadastro como o POST da API: uma ocorrência e um item na mesma transação
+    with conn:
+        policial_id = conn.execute("SELECT MIN(id) FROM policial").fetchone()[0]
+        proprietario_id = conn.execute("SELECT MIN(id) FROM proprietario").fetchone()[0]
+        ocorrencia_id = _inserir_ocorrencia(conn, cliente, next(contador), policial_id)
+        conn.execute(
+            "INSERT INTO item_apreendido (especie, item, quantidade, descricao_detalhada, ocorrencia_id, "
+            "proprietario_id, policial_id) VALUES ('Entorpecente', 'Maconha', 1, 'Diagnóstico', ?, ?, ?)",
+            (ocorrencia_id, proprietario_id, policial_id)
+        )
+    return 2
+
+def _operacao_sincronizacao(conn, cliente, contador, lote):
+    # Lote como o da sincronização: deduplicação por uuid e inserção, tudo em uma transação
+    with conn:
+        policial_id = conn.execute("SELECT MIN(id) FROM policial").fetchone()[0]
+        for _ in range(lote):
+            uuid_local = str(uuid.uuid4())
+            conn.execute(
+                "SELECT id_central FROM registro_sincronizado WHERE usuario = ? AND tipo_registro = 'ocorrencia' "
+                "AND uuid_local = ?", (f"diagnostico-{cliente}", uuid_local)
+            ).fetchone()
+            ocorrencia_id = _inserir_ocorrencia(conn, cliente, next(contador), policial_id)
+            conn.execute(
+                "INSERT INTO registro_sincronizado (usuario, tipo_registro, uuid_local, id_central, timestamp_sync) "
+                "VALUES (?, 'ocorrencia', ?, ?, ?)",
+                (f"diagnostico-{cliente}", uuid_local, ocorrencia_id, datetime.now().isoformat())
+            )
+    return lote * 2
+
+OPERACOES_BENCHMARK = {
+    "leitura": _operacao_leitura,
+    "insercao": _operacao_insercao,
+    "sincronizacao": _operacao_sincronizacao,
+}
+
+def executar_cliente_benchmark(db_path, cliente, operacoes, mistura, lote, timeout, iniciar_em):
+    """
+    Um cliente do benchmark (thread ou processo): conexão própria, sorteio das
+    operações pela mistura e início sincronizado com os demais em iniciar_em
+    """
+    sorteio = random.Random(cliente)
+    tipos, pesos = list(mistura), list(mistura.values())
+    contador = iter(range(10 ** 9))
+    resultado = {tipo: {"latencias_ms": [], "erros": 0, "busy": 0} for tipo in tipos}
+    resultado.update(linhas_inseridas=0, ultimo_erro=None)
+
+    conn = sqlite3.connect(str(db_path), timeout=timeout, check_same_thread=False)
+    try:
+        time.sleep(max(0.0, iniciar_em - time.time()))
+        for _ in range(operacoes):
+            tipo = sorteio.choices(tipos, pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                resultado["linhas_inseridas"] += OPERACOES_BENCHMARK[tipo](conn, cliente, contador, lote)
+            except sqlite3.Error as e:
+                resultado[tipo]["erros"] += 1
+                resultado[tipo]["busy"] += _ocupado(e)
+                resultado["ultimo_erro"] = f"{type(e).__name__}: {e}"
+                continue
+            resultado[tipo]["latencias_ms"].append((time.perf_counter() - inicio) * 1000)
+    finally:
+        conn.close()
+    return resultado
+
+def _tamanho_wal(db_path):
+    try:
+        return os.path.getsize(f"{db_path}-wal")
+    except OSError:
+        return 0
+
+def _preparar_copia(db_path, copia):
+    """Cópia do banco na mesma pasta (mesmo armazenamento) para o benchmark não alterar os dados reais"""
+    from services.backup import backup_online
+
+    backup_online(db_path, copia, pausa=0)
+    conn = sqlite3.connect(str(copia))
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        tabelas = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        faltando = {"policial", "proprietario", "ocorrencia", "item_apreendido"} - tabelas
+        if faltando:
+            raise ValueError(f"Banco sem as tabelas {sorted(faltando)}: inicie a API uma vez para criá-las")
+        if "registro_sincronizado" not in tabelas:
+            conn.execute(
+                "CREATE TABLE registro_sincronizado (id INTEGER PRIMARY KEY, usuario VARCHAR NOT NULL, "
+                "tipo_registro VARCHAR NOT NULL, uuid_local VARCHAR NOT NULL, id_central INTEGER NOT NULL, "
+                "timestamp_sync DATETIME, hash_dados VARCHAR)"
+            )
+        if conn.execute("SELECT COUNT(*) FROM policial").fetchone()[0] == 0:
+            conn.execute("INSERT INTO policial (nome, matricula, graduacao, unidade) "
+                         "VALUES ('Diagnóstico', 'DIAG-0', 'Soldado', '8ª CPR')")
+        if conn.execute("SELECT COUNT(*) FROM proprietario").fetchone()[0] == 0:
+            conn.execute("INSERT INTO proprietario (nome, documento) VALUES ('Diagnóstico', '00000000000')")
+        conn.commit()
+    finally:
+        conn.close()
+
+def benchmark_concorrencia(db_path, clientes=4, operacoes=200, mistura=None, processos=False, lote=50,
+                           timeout=5.0):
+    """
+    Benchmark de concorrência: `clientes` threads (ou processos) executam,
+    cada um, `operacoes` operações sorteadas pela mistura (leitura, inserção
+    e lote de sincronização) sobre uma cópia do banco na mesma pasta.
+
+    Retorna (pronto para JSON) vazão, percentis de latência por operação,
+    taxa de SQLITE_BUSY (operações que esgotaram o timeout esperando a trava)
+    e crescimento do WAL durante a execução.
+    """
+    mistura = dict(mistura or MISTURA_PADRAO)
+    desconhecidas = set(mistura) - set(OPERACOES_BENCHMARK)
+    if desconhecidas:
+        raise ValueError(f"Operações desconhecidas na mistura: {sorted(desconhecidas)}")
+
+    db_path = Path(db_path)
+    copia = db_path.parent / "diagnostico_benchmark.db"
+    _preparar_copia(db_path, copia)
+    try:
+        wal = {"inicial_bytes": _tamanho_wal(copia)}
+        wal["maximo_bytes"] = wal["inicial_bytes"]
+        parar = threading.Event()
+
+        def acompanhar_wal():
+            while not parar.wait(0.05):
+                wal["maximo_bytes"] = max(wal["maximo_bytes"], _tamanho_wal(copia))
+
+        executor_classe = ProcessPoolExecutor if processos else ThreadPoolExecutor
+        with executor_classe(max_workers=clientes) as executor:
+            # Processos levam mais para iniciar (spawn no Windows): todos começam juntos em iniciar_em
+            iniciar_em = time.time() + (3.0 if processos else 0.2)
+            futuros = [
+                executor.submit(executar_cliente_benchmark, str(copia), cliente, operacoes, mistura, lote,
+                                timeout, iniciar_em)
+                for cliente in range(clientes)
+            ]
+            monitor_wal = threading.Thread(target=acompanhar_wal, daemon=True)
+            monitor_wal.start()
+            resultados = [futuro.result() for futuro in futuros]
+            duracao = time.time() - iniciar_em
+        parar.set()
+        monitor_wal.join()
+        wal["final_bytes"] = _tamanho_wal(copia)
+        wal["maximo_bytes"] = max(wal["maximo_bytes"], wal["final_bytes"])
+        # O último cliente a fechar a conexão faz checkpoint e remove o WAL: o crescimento é o pico
+        wal["crescimento_bytes"] = wal["maximo_bytes"] - wal["inicial_bytes"]
+    finally:
+        for sufixo in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{copia}{sufixo}")
+            except OSError:
+                pass
+
+    por_operacao = {}
+    for tipo in mistura:
+        latencias = [ms for resultado in resultados for ms in resultado[tipo]["latencias_ms"]]
+        erros = sum(resultado[tipo]["erros"] for resultado in resultados)
+        busy = sum(resultado[tipo]["busy"] for resultado in resultados)
+        tentativas = len(latencias) + erros
+        por_operacao[tipo] = {
+            **{chave: round(valor, 2) if isinstance(valor, float) else valor
+               for chave, valor in resumo_latencias(latencias).items()},
+            "erros": erros,
+            "busy": busy,
+            "taxa_busy": round(busy / tentativas, 4) if tentativas else 0.0,
+        }
+
+    concluidas = sum(operacao["amostras"] for operacao in por_operacao.values())
+    tentativas = concluidas + sum(operacao["erros"] for operacao in por_operacao.values())
+    busy = sum(operacao["busy"] for operacao in por_operacao.values())
+    linhas = sum(resultado["linhas_inseridas"] for resultado in resultados)
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "banco": str(db_path),
+        "execucao": "processos" if processos else "threads",
+        "clientes": clientes,
+        "operacoes_por_cliente": operacoes,
+        "mistura": mistura,
+        "lote_sincronizacao": lote,
+        "timeout_segundos": timeout,
+        "duracao_segundos": round(duracao, 3),
+        "operacoes_concluidas": concluidas,
+        "operacoes_por_segundo": round(concluidas / duracao, 1) if duracao > 0 else None,
+        "linhas_inseridas": linhas,
+        "linhas_por_segundo": round(linhas / duracao, 1) if duracao > 0 else None,
+        "taxa_busy": round(busy / tentativas, 4) if tentativas else 0.0,
+        "ultimo_erro": next((r["ultimo_erro"] for r in resultados if r["ultimo_erro"]), None),
+        "operacoes": por_operacao,
+        "wal": wal,
+    }
+
+def imprimir_benchmark(resultado):
+    """Resumo do benchmark de concorrência no formato do diagnóstico"""
+    print(f"   👥 {resultado['clientes']} cliente(s) ({resultado['execucao']}) x "
+          f"{resultado['operacoes_por_cliente']} operações em {resultado['duracao_segundos']}s")
+    print(f"   ⚡ Vazão: {resultado['operacoes_por_segundo']} op/s, {resultado['linhas_por_segundo']} linhas/s")
+    for tipo, operacao in resultado["operacoes"].items():
+        if operacao["amostras"]:
+            print(f"   {tipo:<14} p50 {operacao['p50_ms']:>8.2f} ms  p95 {operacao['p95_ms']:>8.2f} ms  "
+                  f"p99 {operacao['p99_ms']:>8.2f} ms  busy {operacao['taxa_busy']:.1%}")
+    print(f"   📝 WAL: +{resultado['wal']['crescimento_bytes'] / 1024:.0f} KB "
+          f"(máximo {resultado['wal']['maximo_bytes'] / 1024:.0f} KB)")
+
+    if resultado["taxa_busy"] > 0.01:
+        print(f"   ❌ {resultado['taxa_busy']:.1%} das operações com SQLITE_BUSY - concorrência alta para esta pasta")
+    elif (resultado["operacoes"].get("insercao", {}).get("p95_ms") or 0) > 1000:
+        print(f"   ⚠️  Escritas lentas (p95 > 1s) - verifique rede")
+    else:
+        print(f"   ✅ Concorrência sem travamentos")
+
+def parse_mistura(texto):
+    """'leitura=0.7,insercao=0.3' -> {"leitura": 0.7, "insercao": 0.3}"""
+    mistura = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        mistura[nome.strip()] = float(peso)
+    return mistura
+
 def check_database_integrity(db_path):
     """Verifica integridade do banco de dados"""
     print(f"\n🔍 Verificando integridade do banco...")
@@ -177,7 +433,7 @@ def check_network_connectivity(path):
         print(f"   ❌ Erro de conectividade: {e}")
         return False
 
-def generate_report(storage_manager):
+def generate_report(storage_manager, benchmark=None):
     """Gera relatório completo de diagnóstico"""
     print(f"\n📋 Gerando relatório de diagnóstico...")
     
@@ -227,6 +483,12 @@ def generate_report(storage_manager):
             "status": "ERRO",
             "message": "Banco de dados não encontrado"
         }
+
+    if benchmark is not None:
+        report["tests"]["concurrency_benchmark"] = {
+            "status": "OK" if benchmark["taxa_busy"] <= 0.01 else "ERRO",
+            **benchmark
+        }
     
     # Salvar relatório
     report_path = storage_manager.shared_path / "logs" / f"diagnostico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -296,15 +558,24 @@ def main():
             
             print(f"\n5️⃣  Teste de Performance")
             performance_ok = test_database_performance(db_path)
+
+            print(f"\n🏋️  Benchmark de Concorrência")
+            try:
+                benchmark = benchmark_concorrencia(db_path, clientes=4, operacoes=50)
+                imprimir_benchmark(benchmark)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                print(f"   ❌ Benchmark não executado: {e}")
+                benchmark = None
         else:
             print(f"\n4️⃣  ❌ Banco de dados não encontrado: {db_path}")
             print(f"   Execute: python backend/shared_storage.py")
             integrity_ok = False
             performance_ok = False
+            benchmark = None
         
         # Gerar relatório
         print(f"\n6️⃣  Relatório Final")
-        report = generate_report(storage)
+        report = generate_report(storage, benchmark)
         
         # Resumo final
         print(f"\n📊 Resumo do Diagnóstico:")
@@ -347,6 +618,39 @@ def main():
         return False
 
 
+def main_benchmark(argv=None):
+    """Só o benchmark de concorrência, com o resultado em JSON (sem interação)"""
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência do banco SECRIMPO")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--banco", help="Banco a medir (padrão: banco da pasta compartilhada configurada)")
+    parser.add_argument("--clientes", type=int, default=4)
+    parser.add_argument("--operacoes", type=int, default=200, help="Operações por cliente")
+    parser.add_argument("--mistura", type=parse_mistura, default=MISTURA_PADRAO,
+                        help="Frações por operação, ex.: leitura=0.7,insercao=0.2,sincronizacao=0.1")
+    parser.add_argument("--processos", action="store_true", help="Clientes em processos (padrão: threads)")
+    parser.add_argument("--lote", type=int, default=50, help="Registros por lote de sincronização")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Espera pela trava antes de SQLITE_BUSY (s)")
+    parser.add_argument("--saida", help="Arquivo para gravar o JSON")
+    args = parser.parse_args(argv)
+
+    db_path = args.banco
+    if not db_path:
+        with open("shared_config.json", "r") as f:
+            db_path = Path(json.load(f)["shared_path"]) / "database" / "secrimpo.db"
+
+    resultado = benchmark_concorrencia(db_path, clientes=args.clientes, operacoes=args.operacoes,
+                                       mistura=args.mistura, processos=args.processos, lote=args.lote,
+                                       timeout=args.timeout)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    return 0
+
+if __name__ == "__main__" and "--benchmark" in sys.argv:
+    sys.exit(main_benchmark())
+
 if __name__ == "__main__":
     try:
         success = main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+SECRIMPO - Migração do modo compartilhado (SQLite na pasta de rede) para o modo servidor
+
+No modo servidor um único PC guarda o banco no disco local e executa a API
+(python start_api.py --servidor); as demais estações usam só o frontend,
+que acessa a API pela rede (server_config.json). Nenhuma estação abre mais o
+banco pelo SMB: sem travas de arquivo pela rede e sem risco de corrupção.
+
+A migração, executada no PC que será o servidor:
+1. grava o marcador database/servidor.json na pasta compartilhada: estações
+   que ainda estiverem em modo compartilhado não iniciam mais a API (e não
+   escrevem em um banco que deixou de ser o oficial);
+2. copia o banco compartilhado para o disco local com o backup online do
+   SQLite (quick_check no arquivo gerado) e confere a contagem de cada tabela;
+3. grava server_config.json com a URL da API e desativa o shared_config.json
+   deste PC (renomeado para shared_config.migrado.json).
+
+Feche o SECRIMPO em todas as estações antes de migrar.
+
+Uso: python migrar_para_servidor.py [--url http://192.168.0.10:8000] [--destino caminho.db] [--pasta pasta]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import config
+from get_server_ip import get_local_ip
+from services.backup import BackupInvalido, backup_online
+
+TABELAS_CONFERIDAS = ["policial", "proprietario", "ocorrencia", "item_apreendido"]
+
+def contar_registros(caminho):
+    conn = sqlite3.connect(str(caminho), timeout=30)
+    try:
+        existentes = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {tabela: conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+                for tabela in TABELAS_CONFERIDAS if tabela in existentes}
+    finally:
+        conn.close()
+
+def migrar(origem, destino, api_url, forcar=False):
+    """
+    Copia o banco compartilhado `origem` para `destino` (disco local do
+    servidor) e marca a pasta compartilhada como migrada para `api_url`.
+    Levanta FileExistsError se `destino` já existir (sem forcar) e
+    BackupInvalido se a cópia não passar na verificação.
+    """
+    origem, destino = Path(origem), Path(destino)
+    if not origem.exists():
+        raise FileNotFoundError(f"Banco compartilhado não encontrado: {origem}")
+    if destino.exists() and not forcar:
+        raise FileExistsError(f"Já existe um banco em {destino} (use --forcar para substituí-lo)")
+
+    marcador = origem.parent / config.MARCADOR_SERVIDOR
+    dados_marcador = {
+        "api_url": api_url,
+        "servidor": platform.node(),
+        "banco": str(destino),
+        "migrado_em": datetime.now().isoformat(),
+    }
+    with open(marcador, "w", encoding="utf-8") as f:
+        json.dump(dados_marcador, f, indent=2, ensure_ascii=False)
+
+    try:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        copia = backup_online(origem, destino)
+    except (OSError, sqlite3.Error, BackupInvalido):
+        # Sem cópia válida o banco compartilhado continua sendo o oficial
+        os.remove(marcador)
+        raise
+
+    contagem_origem = contar_registros(origem)
+    contagem_destino = contar_registros(destino)
+    return {
+        **copia,
+        "marcador": str(marcador),
+        "registros": contagem_destino,
+        # Diferença: alguma estação escreveu durante a cópia (repita com todas fechadas)
+        "divergencias": {tabela: (contagem_origem[tabela], contagem_destino.get(tabela))
+                         for tabela in contagem_origem if contagem_origem[tabela] != contagem_destino.get(tabela)},
+    }
+
+def configurar_este_pc(api_url):
+    """server_config.json com a URL da API; o shared_config.json deste PC deixa de ser usado"""
+    with open(config.SERVER_CONFIG_ARQUIVO, "w", encoding="utf-8") as f:
+        json.dump({"api_url": api_url, "servidor": platform.node(),
+                   "configurado_em": datetime.now().isoformat()}, f, indent=2, ensure_ascii=False)
+    shared_config = config.BASE_DIR / "shared_config.json"
+    if shared_config.exists():
+        os.replace(shared_config, config.BASE_DIR / "shared_config.migrado.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra o banco compartilhado para o modo servidor")
+    parser.add_argument("--pasta", help="Pasta compartilhada (padrão: shared_config.json)")
+    parser.add_argument("--destino", default=str(config.BASE_DIR / "database" / "secrimpo.db"),
+                        help="Banco no disco local do servidor")
+    parser.add_argument("--url", help="URL da API para as estações (padrão: IP desta máquina)")
+    parser.add_argument("--forcar", action="store_true", help="Substitui um banco já existente no destino")
+    args = parser.parse_args()
+
+    pasta = args.pasta
+    if not pasta:
+        shared_config = config.BASE_DIR / "shared_config.json"
+        if not shared_config.exists():
+            print("❌ shared_config.json não encontrado; informe a pasta com --pasta")
+            return 1
+        with open(shared_config, "r") as f:
+            pasta = json.load(f).get("shared_path")
+    api_url = args.url or f"http://{get_local_ip()}:{config.API_PORT}"
+    origem = Path(pasta) / "database" / "secrimpo.db"
+
+    print("🔄 MIGRAÇÃO PARA O MODO SERVIDOR")
+    print("=" * 50)
+    print(f"🗂️  Banco compartilhado: {origem}")
+    print(f"💾 Banco do servidor:   {args.destino}")
+    print(f"🌐 URL da API:          {api_url}")
+    print("⚠️  Feche o SECRIMPO em todas as estações antes de continuar")
+    print()
+
+    try:
+        resultado = migrar(origem, args.destino, api_url, forcar=args.forcar)
+    except (OSError, sqlite3.Error, BackupInvalido) as e:
+        print(f"❌ Migração não realizada: {e}")
+        return 1
+
+    print(f"✅ Banco copiado em {resultado['duracao_segundos']}s "
+          f"({resultado['tamanho_bytes'] / 1024 / 1024:.1f} MB, quick_check: {resultado['verificacao']})")
+    for tabela, total in resultado["registros"].items():
+        print(f"   {tabela}: {total} registro(s)")
+    if resultado["divergencias"]:
+        print(f"⚠️  Contagens diferentes da origem (escritas durante a cópia?): {resultado['divergencias']}")
+        print("   Feche todas as estações e execute de novo com --forcar")
+        return 1
+
+    configurar_este_pc(api_url)
+    print(f"✅ Pasta compartilhada marcada como migrada: {resultado['marcador']}")
+    print(f"✅ {config.SERVER_CONFIG_ARQUIVO.name} gravado; shared_config.json desativado neste PC")
+    print()
+    print("📋 PRÓXIMOS PASSOS:")
+    print("1. 🚀 Neste PC, inicie a API em modo servidor:")
+    print("   cd backend")
+    print("   python start_api.py --servidor")
+    if Path(args.destino).resolve() != (config.BASE_DIR / "database" / "secrimpo.db").resolve():
+        print(f"   (com SECRIMPO_DATABASE={args.destino})")
+    print(f"2. 🔥 Libere a porta {config.API_PORT} no firewall")
+    print(f"3. 👥 Nas estações, copie {config.SERVER_CONFIG_ARQUIVO.name} para a pasta do SECRIMPO")
+    print("   (o frontend passa a usar a API do servidor; a API local não é mais necessária)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 """
 Modelos para sincronização de dados entre clientes locais e servidor central
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -36,6 +36,11 @@ class RegistroSincronizado(Base):
     timestamp_sync = Column(DateTime, default=datetime.utcnow)
     hash_dados = Column(String)  # Hash dos dados para detectar mudanças
 
+    # Consulta de deduplicação (sincronização e reprodução do diário de escritas)
+    __table_args__ = (
+        Index('ix_registro_sincronizado_usuario_tipo_uuid', 'usuario', 'tipo_registro', 'uuid_local'),
+    )
+
 # === SCHEMAS PYDANTIC PARA SINCRONIZAÇÃO ===
 
 class DadosOcorrencia(BaseModel):
@@ -0,0 +1,824 @@
+"""
+Backups do banco SQLite com a API de backup online
+
+Copiar o arquivo do banco (shutil.copy2) ignora o conteúdo ainda no WAL, pode
+capturar um arquivo no meio de uma escrita e lê o banco inteiro pela rede de
+uma só vez. Aqui a cópia é feita por sqlite3.Connection.backup em passos de
+BACKUP_PAGINAS_POR_PASSO páginas com uma pausa entre eles, de modo que os
+outros clientes continuam escrevendo durante o backup. O arquivo é escrito
+com sufixo .parcial e só recebe o nome final após passar no quick_check.
+
+Backups incrementais: cada backup guarda ao lado um arquivo .paginas com o
+hash de cada página e a posição do WAL (salts e último frame confirmado) no
+momento do backup. O incremental seguinte lê só os frames do WAL gravados
+depois dessa posição, dentro de uma transação de leitura no banco de origem:
+o custo é proporcional às alterações, não ao tamanho do banco. Se o WAL foi
+reiniciado desde então (um checkpoint completo seguido de nova escrita), as
+páginas alteradas não estão mais todas nele; aí o banco de origem é lido uma
+vez (arquivo principal com os frames do WAL por cima) e comparado com os
+hashes, sem cópia temporária. Nos dois casos só as páginas alteradas são
+gravadas na pasta de backups. restaurar() reaplica a cadeia a partir do
+completo.
+
+Os arquivos na pasta de backups são comprimidos em streaming (zstd se o
+pacote zstandard estiver instalado, senão gzip), listados em um catálogo
+(catalogo.json) e podados pela política avô-pai-filho de BACKUP_RETENCAO.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional (sem ele os backups usam gzip)
+    zstandard = None
+
+SUFIXO_PARCIAL = ".parcial"
+SUFIXO_PAGINAS = ".paginas"
+EXTENSAO_COMPLETO = ".db"
+EXTENSAO_INCREMENTAL = ".inc"
+
+# Formato dos arquivos incrementais: assinatura, cabeçalho JSON em uma linha e
+# registros (número da página em 4 bytes big-endian + conteúdo da página)
+ASSINATURA_INCREMENTAL = b"SECRIMPO-INCREMENTAL 1\n"
+ASSINATURA_PAGINAS = b"SECRIMPO-PAGINAS 2\n"
+ASSINATURA_PAGINAS_V1 = b"SECRIMPO-PAGINAS 1\n"  # sem a posição do WAL
+_NUMERO_PAGINA = struct.Struct(">I")
+TAMANHO_HASH = 16
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+# Formato do WAL (https://www.sqlite.org/fileformat.html#the_write_ahead_log):
+# cabeçalho com magic, versão, tamanho da página, sequência do checkpoint,
+# salts e checksum; cada frame tem número da página, tamanho do banco após o
+# commit (0 se o frame não fecha uma transação), salts e checksum acumulado
+_CABECALHO_WAL = struct.Struct(">8I")
+_CABECALHO_FRAME = struct.Struct(">6I")
+_ORDEM_CHECKSUM_WAL = {0x377F0682: "<", 0x377F0683: ">"}
+
+
+class BackupInvalido(Exception):
+    """O arquivo de backup não passou na verificação de integridade"""
+
+
+def verificar_integridade(caminho) -> str:
+    """Resultado do PRAGMA quick_check ('ok' quando íntegro)"""
+    conn = sqlite3.connect(str(caminho))
+    try:
+        linhas = [linha[0] for linha in conn.execute("PRAGMA quick_check")]
+    finally:
+        conn.close()
+    return "\n".join(linhas)
+
+
+def backup_online(origem, destino, paginas_por_passo: Optional[int] = None, pausa: Optional[float] = None,
+                  progresso: Optional[Callable[[int, int], None]] = None,
+                  max_reinicios: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copia o banco `origem` para `destino` sem bloquear os demais clientes.
+
+    progresso(paginas_copiadas, total_paginas) é chamado após cada passo.
+    Uma escrita de outro cliente durante a cópia faz o SQLite reiniciá-la; após
+    max_reinicios reinícios o restante é copiado em um único passo (em modo WAL
+    isso mantém só uma transação de leitura, que não bloqueia as escritas).
+    Levanta BackupInvalido se o quick_check do arquivo gerado falhar.
+    """
+    paginas_por_passo = paginas_por_passo or config.BACKUP_PAGINAS_POR_PASSO
+    pausa = config.BACKUP_PAUSA_SEGUNDOS if pausa is None else pausa
+    max_reinicios = config.BACKUP_MAX_REINICIOS if max_reinicios is None else max_reinicios
+
+    destino = str(destino)
+    parcial = destino + SUFIXO_PARCIAL
+    if os.path.exists(parcial):
+        os.remove(parcial)
+
+    estado = {"passos": 0, "reinicios": 0, "copiadas": 0, "total": 0}
+
+    def registrar_passo(status, restantes, total):
+        copiadas = total - restantes
+        # Reinício: o passo não avançou além do ponto anterior (a cópia recomeçou da página 1)
+        if estado["passos"] and copiadas <= estado["copiadas"]:
+            estado["reinicios"] += 1
+        estado.update(passos=estado["passos"] + 1, copiadas=copiadas, total=total)
+        if progresso is not None:
+            progresso(copiadas, total)
+        # Pausa fora do passo: nenhuma trava do banco de origem está mantida aqui
+        if restantes and pausa:
+            time.sleep(pausa)
+
+    inicio = time.perf_counter()
+    conn_origem = sqlite3.connect(str(origem), timeout=30)
+    conn_destino = sqlite3.connect(parcial)
+    try:
+        passo_unico = max_reinicios <= 0 or _backup_em_passos(
+            conn_origem, conn_destino, paginas_por_passo, registrar_passo, estado, max_reinicios
+        )
+        if passo_unico:
+            conn_origem.backup(conn_destino, pages=-1, progress=registrar_passo)
+        tamanho_pagina = conn_destino.execute("PRAGMA page_size").fetchone()[0]
+        paginas = conn_destino.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn_destino.close()
+        conn_origem.close()
+    duracao_copia = time.perf_counter() - inicio
+
+    verificacao = verificar_integridade(parcial)
+    if verificacao != "ok":
+        os.remove(parcial)
+        raise BackupInvalido(f"quick_check falhou para {destino}: {verificacao}")
+    os.replace(parcial, destino)
+
+    return {
+        "origem": str(origem),
+        "arquivo": destino,
+        "paginas": paginas,
+        "tamanho_bytes": paginas * tamanho_pagina,
+        "passos": estado["passos"],
+        "reinicios": estado["reinicios"],
+        "duracao_copia_segundos": round(duracao_copia, 3),
+        "duracao_segundos": round(time.perf_counter() - inicio, 3),
+        "verificacao": verificacao,
+    }
+
+
+class _MuitosReinicios(Exception):
+    pass
+
+
+def _backup_em_passos(conn_origem, conn_destino, paginas_por_passo: int, registrar_passo,
+                      estado: Dict[str, int], max_reinicios: int) -> bool:
+    """Backup em passos; retorna True se foi interrompido por excesso de reinícios"""
+    def acompanhar(status, restantes, total):
+        registrar_passo(status, restantes, total)
+        if estado["reinicios"] > max_reinicios:
+            raise _MuitosReinicios()
+
+    try:
+        conn_origem.backup(conn_destino, pages=paginas_por_passo, progress=acompanhar)
+    except _MuitosReinicios:
+        return True
+    return False
+
+
+def formatar_progresso(rotulo: str, intervalo: float = 0.1) -> Callable[[int, int], None]:
+    """Callback de progresso que imprime o percentual a cada `intervalo` do total"""
+    ultimo = {"fracao": -1.0}
+
+    def imprimir(copiadas: int, total: int):
+        fracao = copiadas / total if total else 1.0
+        if fracao >= 1.0 or fracao - ultimo["fracao"] >= intervalo:
+            ultimo["fracao"] = fracao
+            print(f"[INFO] {rotulo}: {copiadas}/{total} páginas ({fracao:.0%})")
+
+    return imprimir
+
+
+# === COMPRESSÃO ===
+def extensao_compressao(compressao: Optional[str] = None) -> str:
+    """
+    Extensão dos backups para BACKUP_COMPRESSAO: 'zstd' (.zst), 'gzip' (.gz),
+    'nenhuma' ('') ou 'auto' (zstd se o zstandard estiver instalado, senão gzip)
+    """
+    compressao = compressao or config.BACKUP_COMPRESSAO
+    if compressao == "auto":
+        compressao = "zstd" if zstandard is not None else "gzip"
+    if compressao == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Compressão zstd requer o pacote zstandard (pip install zstandard)")
+        return ".zst"
+    if compressao == "gzip":
+        return ".gz"
+    if compressao == "nenhuma":
+        return ""
+    raise ValueError(f"Compressão desconhecida: {compressao}")
+
+
+def _sem_compressao(nome: str) -> str:
+    for extensao in (".zst", ".gz"):
+        if nome.endswith(extensao):
+            return nome[:-len(extensao)]
+    return nome
+
+
+def _abrir_escrita(caminho: str):
+    """Arquivo binário para escrita, comprimido em streaming conforme a extensão"""
+    if caminho.endswith(".zst") or caminho.endswith(".zst" + SUFIXO_PARCIAL):
+        return zstandard.ZstdCompressor(level=config.BACKUP_NIVEL_ZSTD).stream_writer(open(caminho, "wb"))
+    if caminho.endswith(".gz") or caminho.endswith(".gz" + SUFIXO_PARCIAL):
+        return gzip.open(caminho, "wb", compresslevel=config.BACKUP_NIVEL_GZIP)
+    return open(caminho, "wb")
+
+
+def _abrir_leitura(caminho: str):
+    """Arquivo binário para leitura sequencial, descomprimido em streaming conforme a extensão"""
+    if caminho.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{caminho} requer o pacote zstandard (pip install zstandard)")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(caminho, "rb"), closefd=True))
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, "rb")
+    return open(caminho, "rb")
+
+
+# === BACKUPS INCREMENTAIS ===
+def _paginas(arquivo, tamanho_pagina: int) -> Iterator[bytes]:
+    while True:
+        pagina = arquivo.read(tamanho_pagina)
+        if not pagina:
+            return
+        yield pagina
+
+
+def _hash_pagina(pagina: bytes) -> bytes:
+    return hashlib.blake2b(pagina, digest_size=TAMANHO_HASH).digest()
+
+
+def _tamanho_pagina(caminho) -> int:
+    """Tamanho de página gravado no cabeçalho do banco (bytes 16-17; 1 significa 65536)"""
+    with open(caminho, "rb") as arquivo:
+        cabecalho = arquivo.read(100)
+    tamanho = struct.unpack(">H", cabecalho[16:18])[0]
+    return 65536 if tamanho == 1 else tamanho
+
+
+def gravar_hashes(caminho, tamanho_pagina: int, hashes: List[bytes], posicao_wal: Optional[Dict[str, Any]] = None):
+    parcial = str(caminho) + SUFIXO_PARCIAL
+    with open(parcial, "wb") as arquivo:
+        arquivo.write(ASSINATURA_PAGINAS)
+        arquivo.write(json.dumps({"wal": posicao_wal}).encode("utf-8") + b"\n")
+        arquivo.write(_NUMERO_PAGINA.pack(tamanho_pagina))
+        arquivo.write(b"".join(hashes))
+    os.replace(parcial, caminho)
+
+
+def ler_hashes(caminho) -> Tuple[int, List[bytes], Optional[Dict[str, Any]]]:
+    """(tamanho da página, hash de cada página, posição do WAL) de um arquivo .paginas"""
+    with open(caminho, "rb") as arquivo:
+        assinatura = arquivo.readline()
+        if assinatura == ASSINATURA_PAGINAS:
+            posicao_wal = json.loads(arquivo.readline())["wal"]
+        elif assinatura == ASSINATURA_PAGINAS_V1:
+            posicao_wal = None
+        else:
+            raise ValueError(f"Arquivo de páginas inválido: {caminho}")
+        tamanho_pagina = _NUMERO_PAGINA.unpack(arquivo.read(_NUMERO_PAGINA.size))[0]
+        conteudo = arquivo.read()
+    hashes = [conteudo[i:i + TAMANHO_HASH] for i in range(0, len(conteudo), TAMANHO_HASH)]
+    return tamanho_pagina, hashes, posicao_wal
+
+
+def eh_incremental(caminho) -> bool:
+    return _sem_compressao(str(caminho)).endswith(EXTENSAO_INCREMENTAL)
+
+
+# === LEITURA DO WAL ===
+class _WalReiniciado(Exception):
+    """O WAL foi reiniciado (ou o banco mudou fora dele) durante a leitura"""
+
+
+def _checksum_wal(dados: bytes, ordem: str, s0: int, s1: int) -> Tuple[int, int]:
+    valores = struct.unpack(f"{ordem}{len(dados) // 4}I", dados)
+    for i in range(0, len(valores), 2):
+        s0 = (s0 + valores[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + valores[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+
+def _deslocamento_frame(numero: int, tamanho_pagina: int) -> int:
+    """Início do frame `numero` (a partir de 1) no arquivo WAL"""
+    return _CABECALHO_WAL.size + (numero - 1) * (_CABECALHO_FRAME.size + tamanho_pagina)
+
+
+def ler_wal(origem, desde: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Frames confirmados do WAL de `origem` (até o último commit), validados por
+    salts e checksums como na recuperação do SQLite.
+
+    Com `desde` (posição registrada por um backup anterior) lê só os frames
+    posteriores e retorna None se não for o mesmo WAL (reiniciado, apagado ou
+    sem posição conhecida): as alterações desde então podem não estar nele.
+    Retorna a posição após o último commit, o tamanho da página, o total de
+    páginas do banco nesse commit (None se não houve commit) e, para cada
+    página, o deslocamento no WAL do seu conteúdo mais recente.
+    """
+    vazio = {"posicao": {"salts": None, "frames": 0, "checksum": None}, "tamanho_pagina": None,
+             "paginas_total": None, "paginas": {}}
+    if desde is not None and desde["salts"] is None:
+        return None
+    try:
+        arquivo = open(str(origem) + "-wal", "rb")
+    except FileNotFoundError:
+        return None if desde is not None else vazio
+
+    with arquivo:
+        cabecalho = arquivo.read(_CABECALHO_WAL.size)
+        if len(cabecalho) < _CABECALHO_WAL.size:
+            return None if desde is not None else vazio
+        magic, _, tamanho_pagina, _, salt_1, salt_2, checksum_1, checksum_2 = _CABECALHO_WAL.unpack(cabecalho)
+        ordem = _ORDEM_CHECKSUM_WAL.get(magic)
+        if ordem is None or _checksum_wal(cabecalho[:24], ordem, 0, 0) != (checksum_1, checksum_2):
+            return None if desde is not None else vazio
+        salts = [salt_1, salt_2]
+        tamanho_frame = _CABECALHO_FRAME.size + tamanho_pagina
+
+        frames, checksum = 0, (checksum_1, checksum_2)
+        if desde is not None:
+            if desde["salts"] != salts:
+                return None
+            frames = desde["frames"]
+            if frames:
+                # Mesmos salts e mesmo checksum acumulado no frame da posição: é o mesmo WAL
+                arquivo.seek(_deslocamento_frame(frames, tamanho_pagina))
+                dados = arquivo.read(_CABECALHO_FRAME.size)
+                if len(dados) < _CABECALHO_FRAME.size or list(_CABECALHO_FRAME.unpack(dados)[4:]) != desde["checksum"]:
+                    return None
+                checksum = tuple(desde["checksum"])
+
+        posicao = {"salts": salts, "frames": frames, "checksum": list(checksum)}
+        paginas, pendentes, paginas_total = {}, {}, None
+        numero = frames
+        arquivo.seek(_deslocamento_frame(frames + 1, tamanho_pagina))
+        while True:
+            frame = arquivo.read(tamanho_frame)
+            if len(frame) < tamanho_frame:
+                break
+            pagina, commit, frame_salt_1, frame_salt_2, frame_checksum_1, frame_checksum_2 = \
+                _CABECALHO_FRAME.unpack(frame[:_CABECALHO_FRAME.size])
+            if [frame_salt_1, frame_salt_2] != salts:
+                break
+            checksum = _checksum_wal(frame[:8] + frame[_CABECALHO_FRAME.size:], ordem, *checksum)
+            if checksum != (frame_checksum_1, frame_checksum_2):
+                break
+            numero += 1
+            pendentes[pagina] = _deslocamento_frame(numero, tamanho_pagina) + _CABECALHO_FRAME.size
+            if commit:
+                paginas.update(pendentes)
+                pendentes = {}
+                paginas_total = commit
+                posicao = {"salts": salts, "frames": numero, "checksum": list(checksum)}
+
+    return {"posicao": posicao, "tamanho_pagina": tamanho_pagina, "paginas_total": paginas_total,
+            "paginas": paginas}
+
+
+def _wal_intacto(origem, posicao: Dict[str, Any]) -> bool:
+    """O WAL lido ainda é o mesmo (um reinício grava salts novos no cabeçalho antes de sobrescrever frames)"""
+    if posicao["salts"] is None:
+        return True
+    try:
+        with open(str(origem) + "-wal", "rb") as arquivo:
+            cabecalho = arquivo.read(_CABECALHO_WAL.size)
+    except FileNotFoundError:
+        return False
+    return len(cabecalho) == _CABECALHO_WAL.size and list(_CABECALHO_WAL.unpack(cabecalho)[4:6]) == posicao["salts"]
+
+
+def _paginas_no_arquivo(caminho, tamanho_pagina: int) -> int:
+    """Páginas do banco no arquivo principal (tamanho no cabeçalho, se válido, senão o do arquivo)"""
+    with open(caminho, "rb") as arquivo:
+        cabecalho = arquivo.read(100)
+    if len(cabecalho) == 100 and cabecalho[24:28] == cabecalho[92:96]:
+        paginas = struct.unpack(">I", cabecalho[28:32])[0]
+        if paginas:
+            return paginas
+    return os.path.getsize(caminho) // tamanho_pagina
+
+
+def _paginas_do_wal(origem, wal: Dict[str, Any], numeros) -> Iterator[Tuple[int, bytes]]:
+    """Conteúdo das páginas `numeros` (todas presentes no WAL), na ordem"""
+    with open(str(origem) + "-wal", "rb") as arquivo:
+        for numero in numeros:
+            arquivo.seek(wal["paginas"][numero])
+            yield numero, arquivo.read(wal["tamanho_pagina"])
+
+
+def _paginas_do_banco(caminho, tamanho_pagina: int, wal: Dict[str, Any], total: int) -> Iterator[Tuple[int, bytes]]:
+    """Todas as páginas do banco no último commit lido: arquivo principal com os frames do WAL por cima"""
+    arquivo_wal = open(str(caminho) + "-wal", "rb") if wal["paginas"] else None
+    try:
+        with open(caminho, "rb") as banco:
+            for numero in range(1, total + 1):
+                deslocamento = wal["paginas"].get(numero)
+                if deslocamento is not None:
+                    arquivo_wal.seek(deslocamento)
+                    yield numero, arquivo_wal.read(tamanho_pagina)
+                    continue
+                banco.seek((numero - 1) * tamanho_pagina)
+                pagina = banco.read(tamanho_pagina)
+                if len(pagina) < tamanho_pagina:
+                    raise _WalReiniciado(f"Página {numero} ausente do banco e do WAL")
+                yield numero, pagina
+    finally:
+        if arquivo_wal is not None:
+            arquivo_wal.close()
+
+
+def backup_completo(origem, destino, pasta_temporaria: Optional[str] = None, **opcoes) -> Dict[str, Any]:
+    """
+    Backup completo, base de uma cadeia de incrementais: cópia com backup_online
+    em uma pasta temporária local, gravada em `destino` comprimida conforme a
+    extensão (.zst, .gz ou sem compressão), junto com o arquivo .paginas.
+    """
+    destino = str(destino)
+    # Posição do WAL lida antes da cópia: o próximo incremental pode regravar
+    # páginas já copiadas, mas nunca deixar de ver uma alteração
+    posicao_wal = ler_wal(origem)["posicao"]
+    with tempfile.TemporaryDirectory(dir=pasta_temporaria) as pasta:
+        copia = os.path.join(pasta, "copia.db")
+        resultado = backup_online(origem, copia, **opcoes)
+        inicio = time.perf_counter()
+        tamanho_pagina = _tamanho_pagina(copia)
+        hashes = []
+        parcial = destino + SUFIXO_PARCIAL
+        with open(copia, "rb") as entrada, _abrir_escrita(parcial) as saida:
+            for pagina in _paginas(entrada, tamanho_pagina):
+                hashes.append(_hash_pagina(pagina))
+                saida.write(pagina)
+        os.replace(parcial, destino)
+        gravar_hashes(destino + SUFIXO_PAGINAS, tamanho_pagina, hashes, posicao_wal)
+
+    resultado.update(
+        arquivo=destino,
+        tipo="completo",
+        base=os.path.basename(destino),
+        anterior=None,
+        sequencia=0,
+        tamanho_banco_bytes=resultado["tamanho_bytes"],
+        tamanho_bytes=os.path.getsize(destino),
+        duracao_segundos=round(resultado["duracao_segundos"] + time.perf_counter() - inicio, 3),
+    )
+    return resultado
+
+
+def ler_cabecalho_incremental(caminho) -> Dict[str, Any]:
+    with _abrir_leitura(str(caminho)) as arquivo:
+        if arquivo.readline() != ASSINATURA_INCREMENTAL:
+            raise ValueError(f"Arquivo incremental inválido: {caminho}")
+        return json.loads(arquivo.readline())
+
+
+def elemento_da_cadeia(caminho) -> Dict[str, Any]:
+    """Base e posição na cadeia de um backup completo (sequência 0) ou incremental"""
+    if eh_incremental(caminho):
+        cabecalho = ler_cabecalho_incremental(caminho)
+        return {"base": cabecalho["base"], "anterior": cabecalho["anterior"], "sequencia": cabecalho["sequencia"]}
+    return {"base": os.path.basename(str(caminho)), "anterior": None, "sequencia": 0}
+
+
+def _gravar_incremental(parcial: str, cabecalho: Dict[str, Any], paginas: Iterator[Tuple[int, bytes]],
+                        hashes: List[bytes], total_lidas: int,
+                        progresso: Optional[Callable[[int, int], None]]) -> Tuple[int, int]:
+    """
+    Grava as páginas cujo hash difere de `hashes` (atualizado no lugar; páginas
+    novas chegam em ordem, logo após as existentes). Retorna (lidas, alteradas).
+    """
+    lidas = alteradas = 0
+    with _abrir_escrita(parcial) as saida:
+        saida.write(ASSINATURA_INCREMENTAL)
+        saida.write(json.dumps(cabecalho).encode("utf-8") + b"\n")
+        for numero, pagina in paginas:
+            lidas += 1
+            if progresso is not None:
+                progresso(lidas, total_lidas)
+            hash_pagina = _hash_pagina(pagina)
+            if numero > len(hashes):
+                hashes.append(hash_pagina)
+            elif hashes[numero - 1] == hash_pagina:
+                continue
+            else:
+                hashes[numero - 1] = hash_pagina
+            saida.write(_NUMERO_PAGINA.pack(numero))
+            saida.write(pagina)
+            alteradas += 1
+    if progresso is not None and not lidas:
+        progresso(0, 0)
+    return lidas, alteradas
+
+
+def _ler_alteracoes(origem, tamanho_pagina: int, hashes_anteriores: List[bytes],
+                    posicao_anterior: Optional[Dict[str, Any]]):
+    """
+    Escolhe como ler as alterações desde `posicao_anterior`. Retorna (modo,
+    posição do WAL, total de páginas, páginas a comparar, quantas serão lidas):
+    'wal' com só as páginas dos frames novos ou 'varredura' com o banco inteiro.
+    """
+    wal = ler_wal(origem, posicao_anterior)
+    if wal is not None:
+        total = wal["paginas_total"] or len(hashes_anteriores)
+        numeros = sorted(numero for numero in wal["paginas"] if numero <= total)
+        # Páginas acrescentadas ao banco estão todas no WAL; se faltar alguma, o WAL não cobre o intervalo
+        if all(numero in wal["paginas"] for numero in range(len(hashes_anteriores) + 1, total + 1)) and \
+                wal["tamanho_pagina"] in (None, tamanho_pagina):
+            return "wal", wal["posicao"], total, _paginas_do_wal(origem, wal, numeros), len(numeros)
+
+    wal = ler_wal(origem)
+    if wal["tamanho_pagina"] not in (None, tamanho_pagina):
+        raise ValueError("Tamanho de página alterado desde o último backup; faça um backup completo")
+    total = wal["paginas_total"] or _paginas_no_arquivo(str(origem), tamanho_pagina)
+    return "varredura", wal["posicao"], total, _paginas_do_banco(str(origem), tamanho_pagina, wal, total), total
+
+
+def backup_incremental(origem, anterior, destino, pasta_temporaria: Optional[str] = None,
+                       tentativas: int = 3, progresso: Optional[Callable[[int, int], None]] = None,
+                       **opcoes) -> Dict[str, Any]:
+    """
+    Grava em `destino` (.inc, opcionalmente .inc.zst/.inc.gz) só as páginas que
+    mudaram desde `anterior` (backup completo ou incremental com arquivo
+    .paginas, na mesma pasta de destino).
+
+    As páginas são lidas direto do banco de origem, com uma transação de
+    leitura aberta (os checkpoints não avançam além dela): só os frames do WAL
+    posteriores ao backup anterior (modo 'wal') ou, se o WAL foi reiniciado
+    desde então, o banco inteiro uma vez (modo 'varredura'). Se o WAL for
+    reiniciado durante a leitura em todas as `tentativas`, as páginas são lidas
+    de uma cópia com backup_online em `pasta_temporaria` (modo 'copia').
+    progresso(paginas_lidas, total) é chamado a cada página lida.
+    Levanta ValueError se o tamanho de página mudou (é preciso um novo completo).
+    """
+    anterior, destino = str(anterior), str(destino)
+    tamanho_pagina, hashes_anteriores, posicao_anterior = ler_hashes(anterior + SUFIXO_PAGINAS)
+    cadeia = elemento_da_cadeia(anterior)
+    cabecalho = {
+        "base": cadeia["base"],
+        "anterior": os.path.basename(anterior),
+        "sequencia": cadeia["sequencia"] + 1,
+        "tamanho_pagina": tamanho_pagina,
+        "paginas_total": None,
+        "criado_em": datetime.now().isoformat(),
+    }
+    parcial = destino + SUFIXO_PARCIAL
+    inicio = time.perf_counter()
+
+    concluido = False
+    for _ in range(tentativas):
+        conn = sqlite3.connect(str(origem), timeout=30)
+        try:
+            conn.execute("BEGIN")
+            if conn.execute("PRAGMA page_size").fetchone()[0] != tamanho_pagina:
+                raise ValueError("Tamanho de página alterado desde o último backup; faça um backup completo")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # fixa o snapshot de leitura
+            modo, posicao_wal, total, paginas, total_lidas = _ler_alteracoes(
+                origem, tamanho_pagina, hashes_anteriores, posicao_anterior
+            )
+            cabecalho["paginas_total"] = total
+            hashes = hashes_anteriores[:total]
+            lidas, alteradas = _gravar_incremental(parcial, cabecalho, paginas, hashes, total_lidas, progresso)
+            concluido = _wal_intacto(origem, posicao_wal)
+        except _WalReiniciado:
+            concluido = False
+        finally:
+            conn.close()
+        if concluido:
+            break
+
+    if not concluido:
+        with tempfile.TemporaryDirectory(dir=pasta_temporaria) as pasta:
+            posicao_wal = ler_wal(origem)["posicao"]
+            copia = os.path.join(pasta, "copia.db")
+            backup_online(origem, copia, progresso=progresso, **opcoes)
+            if _tamanho_pagina(copia) != tamanho_pagina:
+                raise ValueError("Tamanho de página alterado desde o último backup; faça um backup completo")
+            modo = "copia"
+            total = _paginas_no_arquivo(copia, tamanho_pagina)
+            cabecalho["paginas_total"] = total
+            hashes = hashes_anteriores[:total]
+            sem_wal = {"paginas": {}}
+            lidas, alteradas = _gravar_incremental(parcial, cabecalho,
+                                                   _paginas_do_banco(copia, tamanho_pagina, sem_wal, total),
+                                                   hashes, total, None)
+    os.replace(parcial, destino)
+    gravar_hashes(destino + SUFIXO_PAGINAS, tamanho_pagina, hashes, posicao_wal)
+
+    return {
+        "origem": str(origem),
+        "arquivo": destino,
+        "tipo": "incremental",
+        "modo": modo,
+        "base": cabecalho["base"],
+        "anterior": cabecalho["anterior"],
+        "sequencia": cabecalho["sequencia"],
+        "paginas": total,
+        "paginas_lidas": lidas,
+        "paginas_alteradas": alteradas,
+        "tamanho_banco_bytes": total * tamanho_pagina,
+        "tamanho_bytes": os.path.getsize(destino),
+        "duracao_segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def cadeia_de(elemento) -> List[str]:
+    """Arquivos da cadeia até `elemento`, do backup completo ao próprio elemento"""
+    elemento = str(elemento)
+    pasta = os.path.dirname(elemento)
+    cadeia = [elemento]
+    while eh_incremental(cadeia[0]):
+        anterior = os.path.join(pasta, ler_cabecalho_incremental(cadeia[0])["anterior"])
+        if not os.path.exists(anterior):
+            raise FileNotFoundError(f"Elemento da cadeia ausente: {anterior}")
+        cadeia.insert(0, anterior)
+    return cadeia
+
+
+def _aplicar_incremental(caminho, banco):
+    with _abrir_leitura(str(caminho)) as entrada, open(banco, "r+b") as saida:
+        entrada.readline()
+        cabecalho = json.loads(entrada.readline())
+        tamanho_pagina = cabecalho["tamanho_pagina"]
+        while True:
+            numero = entrada.read(_NUMERO_PAGINA.size)
+            if not numero:
+                break
+            saida.seek((_NUMERO_PAGINA.unpack(numero)[0] - 1) * tamanho_pagina)
+            saida.write(entrada.read(tamanho_pagina))
+        saida.truncate(cabecalho["paginas_total"] * tamanho_pagina)
+
+
+def restaurar(elemento, destino) -> Dict[str, Any]:
+    """
+    Reconstrói em `destino` o banco do momento do backup `elemento` (completo ou
+    incremental), aplicando em ordem os incrementais sobre o backup completo.
+    Levanta BackupInvalido se o banco restaurado não passar no quick_check.
+    """
+    inicio = time.perf_counter()
+    cadeia = cadeia_de(elemento)
+    destino = str(destino)
+    parcial = destino + SUFIXO_PARCIAL
+    with _abrir_leitura(cadeia[0]) as entrada, open(parcial, "wb") as saida:
+        shutil.copyfileobj(entrada, saida, TAMANHO_BLOCO_COPIA)
+    for incremental in cadeia[1:]:
+        _aplicar_incremental(incremental, parcial)
+
+    verificacao = verificar_integridade(parcial)
+    if verificacao != "ok":
+        os.remove(parcial)
+        raise BackupInvalido(f"quick_check falhou para o banco restaurado de {elemento}: {verificacao}")
+    os.replace(parcial, destino)
+    return {
+        "arquivo": destino,
+        "cadeia": [os.path.basename(caminho) for caminho in cadeia],
+        "duracao_segundos": round(time.perf_counter() - inicio, 3),
+        "verificacao": verificacao,
+    }
+
+
+# === CATÁLOGO E RETENÇÃO ===
+class CatalogoBackups:
+    """
+    Índice dos backups em <pasta>/catalogo.json: listar os backups, achar o fim
+    da cadeia e aplicar a retenção não exige listar a pasta (lenta em rede).
+    Sem catálogo (ou corrompido), reconstruir() o recria a partir dos arquivos.
+    """
+    NOME = "catalogo.json"
+
+    def __init__(self, pasta):
+        self.pasta = str(pasta)
+        self.caminho = os.path.join(self.pasta, self.NOME)
+
+    def entradas(self) -> List[Dict[str, Any]]:
+        """Backups do catálogo, do mais antigo ao mais recente"""
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                return json.load(arquivo)["backups"]
+        except FileNotFoundError:
+            return self.reconstruir()
+        except (ValueError, KeyError):
+            print(f"[WARNING] Catálogo de backups inválido, reconstruindo: {self.caminho}")
+            return self.reconstruir()
+
+    def _gravar(self, entradas: List[Dict[str, Any]]):
+        entradas = sorted(entradas, key=lambda entrada: (entrada["criado_em"], entrada["arquivo"]))
+        parcial = self.caminho + SUFIXO_PARCIAL
+        with open(parcial, "w", encoding="utf-8") as arquivo:
+            json.dump({"versao": 1, "backups": entradas}, arquivo, ensure_ascii=False, indent=2)
+        os.replace(parcial, self.caminho)
+
+    @staticmethod
+    def entrada(resultado: Dict[str, Any]) -> Dict[str, Any]:
+        """Entrada do catálogo a partir do resultado de backup_completo/backup_incremental"""
+        return {
+            "arquivo": os.path.basename(resultado["arquivo"]),
+            "tipo": resultado["tipo"],
+            "base": resultado["base"],
+            "anterior": resultado["anterior"],
+            "sequencia": resultado["sequencia"],
+            "criado_em": resultado.get("criado_em") or datetime.now().isoformat(timespec="seconds"),
+            "tamanho_bytes": resultado["tamanho_bytes"],
+            "tamanho_banco_bytes": resultado.get("tamanho_banco_bytes"),
+            "paginas": resultado.get("paginas"),
+            "paginas_alteradas": resultado.get("paginas_alteradas"),
+        }
+
+    def registrar(self, resultado: Dict[str, Any]) -> Dict[str, Any]:
+        entrada = self.entrada(resultado)
+        entradas = [e for e in self.entradas() if e["arquivo"] != entrada["arquivo"]]
+        self._gravar(entradas + [entrada])
+        return entrada
+
+    def ultimo(self) -> Optional[Dict[str, Any]]:
+        """Backup mais recente que ainda existe com seu arquivo .paginas (fim da cadeia atual)"""
+        for entrada in reversed(self.entradas()):
+            caminho = os.path.join(self.pasta, entrada["arquivo"])
+            if os.path.exists(caminho) and os.path.exists(caminho + SUFIXO_PAGINAS):
+                return entrada
+        return None
+
+    def remover(self, nomes) -> int:
+        """Apaga os backups (e seus arquivos .paginas) e os tira do catálogo"""
+        nomes = set(nomes)
+        for nome in nomes:
+            for caminho in (os.path.join(self.pasta, nome), os.path.join(self.pasta, nome + SUFIXO_PAGINAS)):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+        self._gravar([e for e in self.entradas() if e["arquivo"] not in nomes])
+        return len(nomes)
+
+    def reconstruir(self) -> List[Dict[str, Any]]:
+        """Recria o catálogo listando a pasta (backups .db/.inc, comprimidos ou não)"""
+        entradas = []
+        if os.path.isdir(self.pasta):
+            for nome in os.listdir(self.pasta):
+                base = _sem_compressao(nome)
+                if not (base.endswith(EXTENSAO_COMPLETO) or base.endswith(EXTENSAO_INCREMENTAL)):
+                    continue
+                caminho = os.path.join(self.pasta, nome)
+                try:
+                    cadeia = elemento_da_cadeia(caminho)
+                except (OSError, ValueError, RuntimeError):
+                    continue
+                entradas.append({
+                    "arquivo": nome,
+                    "tipo": "incremental" if eh_incremental(nome) else "completo",
+                    "base": cadeia["base"],
+                    "anterior": cadeia["anterior"],
+                    "sequencia": cadeia["sequencia"],
+                    "criado_em": datetime.fromtimestamp(os.path.getmtime(caminho)).isoformat(timespec="seconds"),
+                    "tamanho_bytes": os.path.getsize(caminho),
+                    "tamanho_banco_bytes": None,
+                    "paginas": None,
+                    "paginas_alteradas": None,
+                })
+            self._gravar(entradas)
+        return sorted(entradas, key=lambda entrada: (entrada["criado_em"], entrada["arquivo"]))
+
+
+def selecionar_retencao(entradas: List[Dict[str, Any]], diarios: int, semanais: int,
+                        mensais: int) -> set:
+    """
+    Avô-pai-filho: o backup mais recente de cada um dos últimos `diarios` dias,
+    `semanais` semanas e `mensais` meses com backup, mais o backup mais recente.
+    Um incremental mantido mantém toda a sua cadeia (completo e anteriores).
+    Retorna os nomes dos arquivos a manter.
+    """
+    recentes = sorted(entradas, key=lambda entrada: (entrada["criado_em"], entrada["arquivo"]), reverse=True)
+    manter = {recentes[0]["arquivo"]} if recentes else set()
+
+    periodos = [
+        (diarios, lambda momento: momento.date()),
+        (semanais, lambda momento: momento.isocalendar()[:2]),
+        (mensais, lambda momento: (momento.year, momento.month)),
+    ]
+    for quantidade, periodo in periodos:
+        vistos = set()
+        for entrada in recentes:
+            chave = periodo(datetime.fromisoformat(entrada["criado_em"]))
+            if chave in vistos:
+                continue
+            if len(vistos) >= quantidade:
+                break
+            vistos.add(chave)
+            manter.add(entrada["arquivo"])
+
+    por_nome = {entrada["arquivo"]: entrada for entrada in entradas}
+    for nome in list(manter):
+        anterior = por_nome[nome]["anterior"]
+        while anterior is not None and anterior in por_nome and anterior not in manter:
+            manter.add(anterior)
+            anterior = por_nome[anterior]["anterior"]
+    return manter
+
+
+def aplicar_retencao(catalogo: CatalogoBackups, diarios: Optional[int] = None, semanais: Optional[int] = None,
+                     mensais: Optional[int] = None) -> List[str]:
+    """Remove os backups fora da política de retenção (padrão BACKUP_RETENCAO); retorna os removidos"""
+    retencao = config.BACKUP_RETENCAO
+    entradas = catalogo.entradas()
+    manter = selecionar_retencao(
+        entradas,
+        retencao["diarios"] if diarios is None else diarios,
+        retencao["semanais"] if semanais is None else semanais,
+        retencao["mensais"] if mensais is None else mensais,
+    )
+    removidos = [entrada["arquivo"] for entrada in entradas if entrada["arquivo"] not in manter]
+    if removidos:
+        catalogo.remover(removidos)
+    return removidos
@@ -0,0 +1,214 @@
+"""
+Monitor de conectividade da pasta compartilhada
+
+test_connectivity cria e apaga um arquivo e abre o banco a cada chamada, e
+era chamado de forma síncrona na configuração e no status. O
+MonitorConectividade sonda a pasta em segundo plano a cada
+CONECTIVIDADE_INTERVALO_SEGUNDOS, guarda as latências de leitura e escrita
+das últimas CONECTIVIDADE_JANELA_AMOSTRAS sondagens e responde estado() na
+hora, a partir do último resultado.
+
+Modos:
+- normal: últimas sondagens dentro de CONECTIVIDADE_LATENCIA_DEGRADADA_MS;
+- degradado: as últimas CONECTIVIDADE_AMOSTRAS_DECISAO sondagens acima do
+  limite (volta ao normal quando todas ficam abaixo dele);
+- offline: a última sondagem falhou ou não respondeu em
+  CONECTIVIDADE_TIMEOUT_SEGUNDOS.
+
+Quem precisa reagir à troca de modo registra um callback em ao_mudar_modo.
+"""
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+
+MODO_NORMAL = "normal"
+MODO_DEGRADADO = "degradado"
+MODO_OFFLINE = "offline"
+
+
+def percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil pelo método do posto mais próximo (None sem amostras)"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posto = max(1, -(-len(ordenados) * p // 100))  # teto de n * p / 100
+    return ordenados[int(posto) - 1]
+
+
+def resumo_latencias(valores) -> Dict[str, Any]:
+    valores = list(valores)
+    return {
+        "amostras": len(valores),
+        "p50_ms": percentil(valores, 50),
+        "p95_ms": percentil(valores, 95),
+        "p99_ms": percentil(valores, 99),
+        "max_ms": max(valores) if valores else None,
+    }
+
+
+class MonitorConectividade:
+    """Sonda a pasta compartilhada em segundo plano e mantém o estado em cache"""
+
+    def __init__(self, sondar: Callable[[], Tuple[float, float]], intervalo: Optional[float] = None,
+                 timeout: Optional[float] = None, limite_latencia_ms: Optional[float] = None,
+                 janela: Optional[int] = None, amostras_decisao: Optional[int] = None):
+        # sondar() faz uma leitura e uma escrita e retorna (leitura_ms, escrita_ms); exceção = falha
+        self.sondar = sondar
+        self.intervalo = config.CONECTIVIDADE_INTERVALO_SEGUNDOS if intervalo is None else intervalo
+        self.timeout = config.CONECTIVIDADE_TIMEOUT_SEGUNDOS if timeout is None else timeout
+        self.limite_latencia_ms = (config.CONECTIVIDADE_LATENCIA_DEGRADADA_MS if limite_latencia_ms is None
+                                   else limite_latencia_ms)
+        janela = config.CONECTIVIDADE_JANELA_AMOSTRAS if janela is None else janela
+        self.amostras_decisao = (config.CONECTIVIDADE_AMOSTRAS_DECISAO if amostras_decisao is None
+                                 else amostras_decisao)
+
+        self._lock = threading.Lock()
+        self._leituras = deque(maxlen=janela)
+        self._escritas = deque(maxlen=janela)
+        self._recentes = deque(maxlen=self.amostras_decisao)
+        self._callbacks = []
+        self._sondagem = None
+        self._primeira = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self.modo = None
+        self.mensagem = "Aguardando primeira sondagem"
+        self.ultima_sondagem = None
+        self.sondagens = 0
+        self.falhas = 0
+        self.falhas_consecutivas = 0
+
+    def ao_mudar_modo(self, callback: Callable[[Optional[str], str], None]):
+        """Registra callback(modo_anterior, modo_novo), chamado na thread do monitor"""
+        self._callbacks.append(callback)
+
+    # === SONDAGEM ===
+    def sondar_agora(self) -> Dict[str, Any]:
+        """
+        Executa uma sondagem com prazo e atualiza o estado. A sondagem roda em
+        uma thread daemon: se travar (host SMB fora do ar) é abandonada no prazo
+        e nenhuma outra começa até ela terminar.
+        """
+        if self._sondagem is not None and self._sondagem.is_alive():
+            self._registrar_falha("Sondagem anterior ainda sem resposta")
+            return self.estado()
+
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["latencias"] = self.sondar()
+            except Exception as e:
+                resultado["erro"] = str(e)
+
+        self._sondagem = threading.Thread(target=executar, name="sondagem-armazenamento", daemon=True)
+        self._sondagem.start()
+        self._sondagem.join(self.timeout)
+
+        if self._sondagem.is_alive():
+            self._registrar_falha(f"Sem resposta em {self.timeout}s")
+        elif "erro" in resultado:
+            self._registrar_falha(f"Erro de conectividade: {resultado['erro']}")
+        else:
+            self._registrar_latencias(*resultado["latencias"])
+        return self.estado()
+
+    def _registrar_latencias(self, leitura_ms: float, escrita_ms: float):
+        with self._lock:
+            self._leituras.append(round(leitura_ms, 2))
+            self._escritas.append(round(escrita_ms, 2))
+            self._recentes.append(max(leitura_ms, escrita_ms))
+            self.falhas_consecutivas = 0
+            # Só degrada com CONECTIVIDADE_AMOSTRAS_DECISAO sondagens lentas seguidas
+            # (no início e após uma falha a janela ainda está incompleta)
+            if len(self._recentes) == self.amostras_decisao and min(self._recentes) > self.limite_latencia_ms:
+                modo = MODO_DEGRADADO
+                mensagem = f"Latência acima de {self.limite_latencia_ms} ms"
+            elif max(self._recentes) <= self.limite_latencia_ms or self.modo != MODO_DEGRADADO:
+                modo = MODO_NORMAL
+                mensagem = "Conectividade OK"
+            else:
+                modo, mensagem = self.modo, self.mensagem
+        self._atualizar(modo, mensagem)
+
+    def _registrar_falha(self, mensagem: str):
+        with self._lock:
+            self.falhas += 1
+            self.falhas_consecutivas += 1
+            self._recentes.clear()
+        self._atualizar(MODO_OFFLINE, mensagem)
+
+    def _atualizar(self, modo: str, mensagem: str):
+        with self._lock:
+            anterior = self.modo
+            self.modo = modo
+            self.mensagem = mensagem
+            self.sondagens += 1
+            self.ultima_sondagem = datetime.now().isoformat(timespec="seconds")
+        self._primeira.set()
+        if anterior != modo:
+            for callback in self._callbacks:
+                try:
+                    callback(anterior, modo)
+                except Exception as e:
+                    print(f"[WARNING] Erro ao notificar troca de modo ({anterior} -> {modo}): {e}")
+
+    # === ESTADO ===
+    @property
+    def conectado(self) -> bool:
+        return self.modo == MODO_NORMAL
+
+    def definir_estado_inicial(self, conectado: bool, mensagem: str):
+        """
+        Modo até a primeira sondagem terminar, a partir de uma verificação mais
+        leve feita por quem inicia o monitor (ex.: stat da pasta na configuração).
+        Não conta como sondagem nem dispara callbacks; ignorado se uma sondagem
+        já concluiu.
+        """
+        with self._lock:
+            if self.modo is None:
+                self.modo = MODO_NORMAL if conectado else MODO_OFFLINE
+                self.mensagem = f"{mensagem} (verificação inicial)"
+
+    def aguardar_primeira_sondagem(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Estado após a primeira sondagem (ou o estado atual, se ela não concluir no prazo)"""
+        self._primeira.wait(self.timeout + 1 if timeout is None else timeout)
+        return self.estado()
+
+    def estado(self) -> Dict[str, Any]:
+        """Último estado conhecido, sem tocar na pasta compartilhada"""
+        with self._lock:
+            return {
+                "modo": self.modo,
+                "conectado": self.modo == MODO_NORMAL,
+                "mensagem": self.mensagem,
+                "ultima_sondagem": self.ultima_sondagem,
+                "sondagens": self.sondagens,
+                "falhas": self.falhas,
+                "falhas_consecutivas": self.falhas_consecutivas,
+                "limite_latencia_ms": self.limite_latencia_ms,
+                "leitura": resumo_latencias(self._leituras),
+                "escrita": resumo_latencias(self._escritas),
+            }
+
+    # === THREAD ===
+    def _executar(self):
+        while True:
+            self.sondar_agora()
+            if self._parar.wait(self.intervalo):
+                break
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="monitor-armazenamento", daemon=True)
+            self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
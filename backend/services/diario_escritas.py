@@ -0,0 +1,240 @@
+"""
+Diário local de escritas (pasta compartilhada fora do ar)
+
+Antes, sem a pasta compartilhada a API passava a usar um banco local
+separado e os dados divergiam. Agora, com o armazenamento fora do modo
+normal, os cadastros são gravados neste diário (SQLite local com
+synchronous=FULL: a escrita confirmada sobrevive a uma queda de energia) e
+respondidos com um id provisório negativo, que pode ser usado como
+referência em cadastros seguintes (ex.: item de uma ocorrência criada
+offline).
+
+Quando a pasta volta, reproduzir() envia as escritas em ordem, em lotes de
+DIARIO_TAMANHO_LOTE por transação no banco compartilhado:
+- remapeamento: ids provisórios nas chaves estrangeiras são trocados pelos
+  ids definitivos das escritas já reproduzidas;
+- deduplicação: a função aplicar (da API) registra a chave de cada escrita
+  no banco compartilhado, na mesma transação, e reaproveita registros
+  existentes; reproduzir de novo um lote interrompido não duplica nada.
+
+Uma escrita que falhar (ex.: dado inválido) é marcada com o erro e não
+bloqueia as demais; as que dependem dela também falham e ficam listadas.
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+import config
+
+# Campos que referenciam outros registros (podem conter ids provisórios)
+CHAVES_ESTRANGEIRAS = {
+    "policial": (),
+    "proprietario": (),
+    "ocorrencia": ("policial_condutor_id",),
+    "item_apreendido": ("ocorrencia_id", "proprietario_id", "policial_id"),
+}
+
+
+class ReferenciaPendente(Exception):
+    """Chave estrangeira com id provisório que não foi reproduzido (escrita anterior falhou)"""
+    pass
+
+
+# Falhas do próprio dado (marcadas na escrita); as demais (ex.: pasta fora do ar
+# de novo) interrompem a reprodução e as escritas continuam pendentes
+ERROS_DE_DADOS = (ReferenciaPendente, IntegrityError, ValueError, TypeError, KeyError)
+
+
+class DiarioEscritas:
+    """Escritas feitas com a pasta compartilhada fora do ar, para reprodução posterior"""
+
+    def __init__(self, caminho=None, tamanho_lote: Optional[int] = None):
+        self.caminho = str(caminho or config.DIARIO_CAMINHO)
+        self.tamanho_lote = config.DIARIO_TAMANHO_LOTE if tamanho_lote is None else tamanho_lote
+        Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._reproduzindo = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS escrita (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chave TEXT UNIQUE NOT NULL,
+                tipo TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                criado_em TEXT NOT NULL,
+                id_central INTEGER,
+                reproduzido_em TEXT,
+                erro TEXT
+            )
+        """)
+        self.ultima_reproducao = None
+
+    # === REGISTRO ===
+    def registrar(self, tipo: str, dados: Dict[str, Any]) -> int:
+        """Grava a escrita e retorna o id provisório (negativo) do registro"""
+        if tipo not in CHAVES_ESTRANGEIRAS:
+            raise ValueError(f"Tipo de escrita desconhecido: {tipo}")
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO escrita (chave, tipo, dados, criado_em) VALUES (?, ?, ?, ?)",
+                (str(uuid.uuid4()), tipo, json.dumps(dados, default=str), datetime.now().isoformat())
+            )
+        return -cursor.lastrowid
+
+    def existe(self, id_provisorio: int) -> bool:
+        """Id provisório registrado neste diário e sem erro"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM escrita WHERE id = ? AND erro IS NULL", (-id_provisorio,)
+            ).fetchone() is not None
+
+    def id_central(self, id_provisorio: int) -> Optional[int]:
+        """Id definitivo de um registro provisório já reproduzido"""
+        with self._lock:
+            linha = self._conn.execute("SELECT id_central FROM escrita WHERE id = ?", (-id_provisorio,)).fetchone()
+        return linha[0] if linha else None
+
+    def resolver(self, tipo: str, dados: Dict[str, Any], exigir: bool = False) -> Dict[str, Any]:
+        """
+        Troca ids provisórios das chaves estrangeiras pelos definitivos já
+        conhecidos. Com exigir=True, um provisório ainda sem id definitivo gera
+        ReferenciaPendente.
+        """
+        dados = dict(dados)
+        for campo in CHAVES_ESTRANGEIRAS[tipo]:
+            valor = dados.get(campo)
+            if isinstance(valor, int) and valor < 0:
+                definitivo = self.id_central(valor)
+                if definitivo is not None:
+                    dados[campo] = definitivo
+                elif exigir:
+                    raise ReferenciaPendente(f"{campo}={valor} não foi reproduzido")
+        return dados
+
+    def tem_pendentes(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM escrita WHERE id_central IS NULL AND erro IS NULL LIMIT 1"
+            ).fetchone() is not None
+
+    def pendentes(self, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT id, chave, tipo, dados, criado_em FROM escrita "
+                "WHERE id_central IS NULL AND erro IS NULL ORDER BY id LIMIT ?",
+                (-1 if limite is None else limite,)
+            ).fetchall()
+        return [
+            {"id_provisorio": -id_, "chave": chave, "tipo": tipo, "dados": json.loads(dados), "criado_em": criado_em}
+            for id_, chave, tipo, dados, criado_em in linhas
+        ]
+
+    # === REPRODUÇÃO ===
+    def reproduzir(self, fabrica_sessao, aplicar: Callable[[Any, str, Dict[str, Any], str], int]) -> Dict[str, Any]:
+        """
+        Envia as escritas pendentes ao banco compartilhado, em lotes de
+        tamanho_lote por transação. aplicar(db, tipo, dados, chave) grava (ou
+        encontra) o registro e retorna o id definitivo.
+        """
+        resultado = {"reproduzidas": 0, "lotes": 0, "erros": 0}
+        with self._reproduzindo:
+            while True:
+                lote = self.pendentes(self.tamanho_lote)
+                if not lote:
+                    break
+                try:
+                    self._marcar(self._aplicar_lote(fabrica_sessao, aplicar, lote))
+                    resultado["reproduzidas"] += len(lote)
+                except ERROS_DE_DADOS:
+                    # Dado inválido no lote: reaplica uma escrita por transação para isolar as que falham
+                    for entrada in lote:
+                        try:
+                            self._marcar(self._aplicar_lote(fabrica_sessao, aplicar, [entrada]))
+                            resultado["reproduzidas"] += 1
+                        except ERROS_DE_DADOS as e:
+                            self._marcar_erro(entrada, e)
+                            resultado["erros"] += 1
+                resultado["lotes"] += 1
+        self.ultima_reproducao = {**resultado, "em": datetime.now().isoformat(timespec="seconds")}
+        return resultado
+
+    def _aplicar_lote(self, fabrica_sessao, aplicar, lote: List[Dict[str, Any]]) -> List[tuple]:
+        """Um lote em uma transação; ids do próprio lote resolvidos à medida que são gravados"""
+        definitivos = {}
+        with fabrica_sessao() as db:
+            try:
+                for entrada in lote:
+                    dados = dict(entrada["dados"])
+                    for campo in CHAVES_ESTRANGEIRAS[entrada["tipo"]]:
+                        if dados.get(campo) in definitivos:
+                            dados[campo] = definitivos[dados[campo]]
+                    dados = self.resolver(entrada["tipo"], dados, exigir=True)
+                    definitivos[entrada["id_provisorio"]] = aplicar(db, entrada["tipo"], dados, entrada["chave"])
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return [(-id_provisorio, id_central) for id_provisorio, id_central in definitivos.items()]
+
+    def _marcar(self, reproduzidas: List[tuple]):
+        agora = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE escrita SET id_central = ?, reproduzido_em = ? WHERE id = ?",
+                [(id_central, agora, id_) for id_, id_central in reproduzidas]
+            )
+            self._conn.execute("COMMIT")
+
+    def _marcar_erro(self, entrada: Dict[str, Any], erro: Exception):
+        print(f"[WARNING] Escrita {entrada['id_provisorio']} ({entrada['tipo']}) não reproduzida: {erro}")
+        with self._lock:
+            self._conn.execute("UPDATE escrita SET erro = ? WHERE id = ?", (str(erro), -entrada["id_provisorio"]))
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            pendentes, reproduzidas, com_erro = self._conn.execute(
+                "SELECT SUM(id_central IS NULL AND erro IS NULL), SUM(id_central IS NOT NULL), "
+                "SUM(erro IS NOT NULL) FROM escrita"
+            ).fetchone()
+            erros = self._conn.execute(
+                "SELECT id, tipo, erro FROM escrita WHERE erro IS NOT NULL ORDER BY id DESC LIMIT 20"
+            ).fetchall()
+        return {
+            "pendentes": pendentes or 0,
+            "reproduzidas": reproduzidas or 0,
+            "com_erro": com_erro or 0,
+            "erros": [{"id_provisorio": -id_, "tipo": tipo, "erro": erro} for id_, tipo, erro in erros],
+            "ultima_reproducao": self.ultima_reproducao,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_diario = None
+
+
+def obter_diario() -> Optional[DiarioEscritas]:
+    """Diário do processo da API (criado no primeiro uso, se DIARIO_ATIVO)"""
+    global _diario
+    if _diario is None and config.DIARIO_ATIVO:
+        _diario = DiarioEscritas()
+    return _diario
+
+
+def encerrar_diario():
+    global _diario
+    if _diario is not None:
+        _diario.fechar()
+        _diario = None
@@ -1,112 +1,246 @@
-import pandas as pd
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, aliased
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence
+import itertools
+import json
 import os
 import sys
 
-# Adiciona o diretório raiz ao path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# Adiciona o diretório do backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.ocorrencia import Ocorrencia
-from models.policial import Policial
-from models.proprietario import Proprietario
-from models.item_apreendido import ItemApreendido
-from backend.services.crud_service import get_ocorrencias_por_periodo
+import config
+from app import Policial, Proprietario, Ocorrencia, ItemApreendido
+from services.export_engine import (
+    LIMITE_LINHAS_XLSX, Aba, criar_writer, dividir_abas, exportar, exportar_em_arquivos, extensao_arquivo
+)
+
+def _garantir_linhas(linhas: Iterable, mensagem: str) -> Iterator:
+    """Lê a primeira linha antecipadamente: levanta ValueError se não houver nenhuma"""
+    linhas = iter(linhas)
+    try:
+        primeira = next(linhas)
+    except StopIteration:
+        raise ValueError(mensagem)
+    return itertools.chain([primeira], linhas)
+
+def _exportar_lote_em_processo(database_url: str, sqlite_config: dict, export_dir: str, policiais_ids: List[int],
+                               data_inicio: date, data_fim: date, formato: str) -> List[str]:
+    """
+    Executado em um processo do pool: gera os arquivos de um subconjunto de policiais.
+    sqlite_config: config.SQLITE_CONFIG do processo da API (timeouts do modo compartilhado)
+    """
+    engine = create_engine(database_url, **sqlite_config)
+    try:
+        with Session(engine) as db:
+            return ExcelExportService(db, export_dir=export_dir).export_lote_policiais(
+                data_inicio, data_fim, policiais_ids=policiais_ids, modo="arquivos", formato=formato
+            )
+    finally:
+        engine.dispose()
 
 class ExcelExportService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, export_dir: Optional[str] = None, destino=None, progresso=None,
+                 max_linhas: Optional[int] = None, dividir_em_arquivos: bool = False):
+        """
+        destino: opcional, um CanalExportacao (services.export_stream); quando
+        informado os relatórios são escritos nele em vez de em export_dir e os
+        métodos de exportação retornam apenas o nome do arquivo.
+        progresso: opcional, objeto com iniciar(nome_arquivo, linhas_estimadas) e
+        registrar_progresso(linhas), notificado durante a escrita em export_dir.
+        max_linhas: linhas de dados por parte (padrão EXPORT_MAX_RECORDS). Abas XLSX
+        (e abas de .zip) maiores continuam em 'Título (2)', 'Título (3)'...
+        dividir_em_arquivos: em vez de abas, um arquivo por parte em export_dir;
+        com mais de uma parte o método retorna o caminho do manifesto JSON.
+        Após cada exportação self.manifesto lista as partes (ParteExportacao).
+        """
         self.db = db
-        self.export_dir = "exports"
-        
+        self.destino = destino
+        self.progresso = destino if destino is not None else progresso
+        self.tamanho_lote = config.EXPORT_BATCH_SIZE
+        self.max_linhas = min(max_linhas or config.EXPORT_MAX_RECORDS, LIMITE_LINHAS_XLSX)
+        self.dividir_em_arquivos = dividir_em_arquivos
+        self.manifesto = []
+        if destino is not None:
+            self.export_dir = None
+            return
+
+        self.export_dir = str(export_dir or config.EXPORTS_DIR)
+
         # Cria diretório de exports se não existir
         if not os.path.exists(self.export_dir):
             os.makedirs(self.export_dir)
-    
-    def export_ocorrencias_completo(self, data_inicio: date, data_fim: date) -> str:
+
+    @staticmethod
+    def _filtrar_periodo(stmt, data_inicio: date, data_fim: date, fim_exclusivo: bool = False):
+        stmt = stmt.where(Ocorrencia.data_apreensao >= data_inicio)
+        if fim_exclusivo:
+            return stmt.where(Ocorrencia.data_apreensao < data_fim)
+        return stmt.where(Ocorrencia.data_apreensao <= data_fim)
+
+    def _executar(self, stmt):
+        """Executa um SELECT lendo o cursor em lotes de EXPORT_BATCH_SIZE linhas"""
+        return self.db.execute(stmt, execution_options={"yield_per": self.tamanho_lote})
+
+    def _estimar_linhas(self, stmt, extra: int = 0) -> Optional[int]:
+        """Total de linhas do SELECT, contado apenas quando há acompanhamento de progresso"""
+        if self.progresso is None:
+            return None
+        return self.db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery())) + extra
+
+    def _salvar(self, nome_base: str, abas: Iterable[Aba], formato: str = "xlsx",
+                linhas_estimadas: Optional[int] = None, multiplas_abas: Optional[bool] = None) -> str:
+        """
+        Escreve as abas no formato pedido; formatos sem abas com várias abas geram .zip.
+        abas pode ser um gerador (abas produzidas durante a leitura) se multiplas_abas for informado.
+        """
+        if multiplas_abas is None:
+            multiplas_abas = len(abas) > 1
+        nome_arquivo = f"{nome_base}.{extensao_arquivo(formato, multiplas_abas)}"
+        self.manifesto = []
+        if self.progresso is not None:
+            self.progresso.iniciar(nome_arquivo, linhas_estimadas)
+        progresso = self.progresso.registrar_progresso if self.progresso is not None else None
+
+        if self.dividir_em_arquivos and self.destino is None:
+            return self._salvar_em_arquivos(nome_base, abas, formato, multiplas_abas, progresso)
+
+        if self.destino is not None:
+            destino, resultado = self.destino, nome_arquivo
+        else:
+            destino = resultado = os.path.join(self.export_dir, nome_arquivo)
+
+        # CSV/JSONL/Parquet de uma aba não têm limite de linhas; XLSX e .zip dividem em abas
+        if formato == "xlsx" or multiplas_abas:
+            abas = dividir_abas(abas, self.max_linhas)
+        exportar(criar_writer(formato, destino, multiplas_abas), abas, progresso=progresso,
+                 intervalo_progresso=self.tamanho_lote, manifesto=self.manifesto)
+        for parte in self.manifesto:
+            parte.arquivo = nome_arquivo
+        return resultado
+
+    def _salvar_em_arquivos(self, nome_base: str, abas: Iterable[Aba], formato: str, multiplas_abas: bool,
+                            progresso) -> str:
+        """
+        Um arquivo a cada max_linhas linhas ({nome_base}_parte001, _parte002...) e o
+        manifesto {nome_base}_manifesto.json; com uma única parte gera só {nome_base}.
+        """
+        extensao = extensao_arquivo(formato, multiplas_abas)
+
+        def caminho_parte(parte: int) -> str:
+            return os.path.join(self.export_dir, f"{nome_base}_parte{parte:03d}.{extensao}")
+
+        exportar_em_arquivos(
+            lambda parte: criar_writer(formato, caminho_parte(parte), multiplas_abas), abas, self.max_linhas,
+            progresso=progresso, intervalo_progresso=self.tamanho_lote, manifesto=self.manifesto
+        )
+
+        if self.manifesto[-1].parte == 1:
+            caminho = os.path.join(self.export_dir, f"{nome_base}.{extensao}")
+            os.replace(caminho_parte(1), caminho)
+            for parte in self.manifesto:
+                parte.arquivo = os.path.basename(caminho)
+            return caminho
+
+        for parte in self.manifesto:
+            parte.arquivo = os.path.basename(caminho_parte(parte.parte))
+        caminho_manifesto = os.path.join(self.export_dir, f"{nome_base}_manifesto.json")
+        with open(caminho_manifesto, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "relatorio": nome_base,
+                "formato": formato,
+                "max_linhas": self.max_linhas,
+                "arquivos": self.manifesto[-1].parte,
+                "linhas": sum(parte.linhas for parte in self.manifesto),
+                "partes": [parte.como_dict() for parte in self.manifesto],
+            }, arquivo, ensure_ascii=False, indent=2)
+        return caminho_manifesto
+
+    COLUNAS_COMPLETO = [
+        'ID_Ocorrencia', 'Numero_Genesis', 'Unidade_Fato', 'Data_Apreensao', 'Lei_Infringida',
+        'Artigo', 'Policial_Condutor', 'Matricula_Condutor', 'Graduacao_Condutor', 'Unidade_Condutor',
+        'Item_Especie', 'Item_Nome', 'Item_Quantidade', 'Item_Descricao', 'Proprietario_Nome',
+        'Proprietario_Documento', 'Policial_Apreensor', 'Matricula_Apreensor'
+    ]
+    # Colunas numéricas (as demais são texto nos formatos tipados, como Parquet)
+    TIPOS_COMPLETO = {'ID_Ocorrencia': int, 'Item_Quantidade': int}
+
+    def _consulta_completo(self, data_inicio: date, data_fim: date):
+        """Uma linha por item (ou por ocorrência sem itens), em um único SELECT com joins"""
+        condutor = aliased(Policial)
+        apreensor = aliased(Policial)
+        stmt = (
+            select(
+                Ocorrencia.id, Ocorrencia.numero_genesis, Ocorrencia.unidade_fato,
+                Ocorrencia.data_apreensao, Ocorrencia.lei_infringida, Ocorrencia.artigo,
+                condutor.nome, condutor.matricula, condutor.graduacao, condutor.unidade,
+                ItemApreendido.especie, ItemApreendido.item, ItemApreendido.quantidade,
+                ItemApreendido.descricao_detalhada, Proprietario.nome, Proprietario.documento,
+                apreensor.nome, apreensor.matricula
+            )
+            .join(condutor, Ocorrencia.policial_condutor_id == condutor.id)
+            .outerjoin(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .outerjoin(Proprietario, ItemApreendido.proprietario_id == Proprietario.id)
+            .outerjoin(apreensor, ItemApreendido.policial_id == apreensor.id)
+            .order_by(Ocorrencia.data_apreensao, Ocorrencia.id, ItemApreendido.id)
+        )
+        return self._filtrar_periodo(stmt, data_inicio, data_fim)
+
+    def _linhas_completo(self, stmt):
+        for linha in self._executar(stmt):
+            linha = tuple(linha)
+            yield linha[:3] + (linha[3].strftime('%d/%m/%Y'),) + linha[4:]
+
+    def export_ocorrencias_completo(self, data_inicio: date, data_fim: date, formato: str = "xlsx") -> str:
         """
         Exporta relatório completo de ocorrências com todos os dados relacionados
         """
-        # Busca ocorrências no período
-        ocorrencias = get_ocorrencias_por_periodo(self.db, data_inicio, data_fim)
-        
-        if not ocorrencias:
-            raise ValueError("Nenhuma ocorrência encontrada no período especificado")
-        
-        # Prepara dados para o DataFrame
-        dados_completos = []
-        
-        for ocorrencia in ocorrencias:
-            # Dados básicos da ocorrência
-            dados_base = {
-                'ID_Ocorrencia': ocorrencia.id,
-                'Numero_Genesis': ocorrencia.numero_genesis,
-                'Unidade_Fato': ocorrencia.unidade_fato,
-                'Data_Apreensao': ocorrencia.data_apreensao.strftime('%d/%m/%Y'),
-                'Lei_Infringida': ocorrencia.lei_infringida,
-                'Artigo': ocorrencia.artigo,
-                'Policial_Condutor': ocorrencia.policial_condutor.nome,
-                'Matricula_Condutor': ocorrencia.policial_condutor.matricula,
-                'Graduacao_Condutor': ocorrencia.policial_condutor.graduacao,
-                'Unidade_Condutor': ocorrencia.policial_condutor.unidade
-            }
-            
-            # Se não há itens, adiciona linha só com dados da ocorrência
-            if not ocorrencia.itens_apreendidos:
-                dados_completos.append({
-                    **dados_base,
-                    'Item_Especie': '',
-                    'Item_Nome': '',
-                    'Item_Quantidade': '',
-                    'Item_Descricao': '',
-                    'Proprietario_Nome': '',
-                    'Proprietario_Documento': '',
-                    'Policial_Apreensor': '',
-                    'Matricula_Apreensor': ''
-                })
-            else:
-                # Adiciona uma linha para cada item apreendido
-                for item in ocorrencia.itens_apreendidos:
-                    dados_completos.append({
-                        **dados_base,
-                        'Item_Especie': item.especie,
-                        'Item_Nome': item.item,
-                        'Item_Quantidade': item.quantidade,
-                        'Item_Descricao': item.descricao_detalhada,
-                        'Proprietario_Nome': item.proprietario.nome,
-                        'Proprietario_Documento': item.proprietario.documento,
-                        'Policial_Apreensor': item.policial.nome,
-                        'Matricula_Apreensor': item.policial.matricula
-                    })
-        
-        # Cria DataFrame
-        df = pd.DataFrame(dados_completos)
-        
-        # Nome do arquivo
-        nome_arquivo = f"relatorio_completo_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}.xlsx"
-        caminho_arquivo = os.path.join(self.export_dir, nome_arquivo)
-        
-        # Exporta para Excel com formatação
-        with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Relatório Completo', index=False)
-            
-            # Ajusta largura das colunas
-            worksheet = writer.sheets['Relatório Completo']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        return caminho_arquivo
-    
-    def export_resumo_mensal(self, ano: int, mes: int) -> str:
+        stmt = self._consulta_completo(data_inicio, data_fim)
+        linhas = _garantir_linhas(
+            self._linhas_completo(stmt),
+            "Nenhuma ocorrência encontrada no período especificado"
+        )
+
+        nome_base = f"relatorio_completo_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}"
+        return self._salvar(nome_base, [
+            Aba('Relatório Completo', self.COLUNAS_COMPLETO, linhas, largura_maxima=50,
+                tipos=self.TIPOS_COMPLETO)
+        ], formato, self._estimar_linhas(stmt))
+
+    COLUNAS_RESUMO = ['Data', 'Genesis', 'Unidade', 'Lei', 'Artigo', 'Condutor', 'Qtd_Itens']
+    TIPOS_RESUMO = {'Qtd_Itens': int}
+
+    def _consulta_resumo(self, data_inicio: date, data_fim: date, fim_exclusivo: bool = True):
+        """Uma linha por ocorrência com o nome do condutor e a quantidade de itens"""
+        stmt = (
+            select(
+                Ocorrencia.data_apreensao, Ocorrencia.numero_genesis, Ocorrencia.unidade_fato,
+                Ocorrencia.lei_infringida, Ocorrencia.artigo, Policial.nome,
+                func.count(ItemApreendido.id)
+            )
+            .join(Policial, Ocorrencia.policial_condutor_id == Policial.id)
+            .outerjoin(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .group_by(Ocorrencia.id)
+            .order_by(Ocorrencia.data_apreensao, Ocorrencia.id)
+        )
+        return self._filtrar_periodo(stmt, data_inicio, data_fim, fim_exclusivo=fim_exclusivo)
+
+    def _linhas_resumo(self, linhas):
+        total_ocorrencias = 0
+        total_itens = 0
+
+        for data_apreensao, genesis, unidade, lei, artigo, condutor, qtd_itens in linhas:
+            total_ocorrencias += 1
+            total_itens += qtd_itens
+
+            yield (data_apreensao.strftime('%d/%m/%Y'), genesis, unidade, lei, artigo, condutor, qtd_itens)
+
+        # Linha de totais
+        yield ('TOTAL', None, None, None, None, f'{total_ocorrencias} ocorrências', total_itens)
+
+    def export_resumo_mensal(self, ano: int, mes: int, formato: str = "xlsx") -> str:
         """
         Exporta resumo mensal das ocorrências
         """
@@ -116,72 +250,107 @@ class ExcelExportService:
             data_fim = date(ano + 1, 1, 1)
         else:
             data_fim = date(ano, mes + 1, 1)
-        
-        # Busca ocorrências
-        ocorrencias = get_ocorrencias_por_periodo(self.db, data_inicio, data_fim)
-        
-        if not ocorrencias:
-            raise ValueError(f"Nenhuma ocorrência encontrada em {mes:02d}/{ano}")
-        
-        # Prepara dados resumidos
-        dados_resumo = []
-        total_itens = 0
-        
-        for ocorrencia in ocorrencias:
-            qtd_itens = len(ocorrencia.itens_apreendidos)
-            total_itens += qtd_itens
-            
-            dados_resumo.append({
-                'Data': ocorrencia.data_apreensao.strftime('%d/%m/%Y'),
-                'Genesis': ocorrencia.numero_genesis,
-                'Unidade': ocorrencia.unidade_fato,
-                'Lei': ocorrencia.lei_infringida,
-                'Artigo': ocorrencia.artigo,
-                'Condutor': ocorrencia.policial_condutor.nome,
-                'Qtd_Itens': qtd_itens
-            })
-        
-        # Cria DataFrame
-        df = pd.DataFrame(dados_resumo)
-        
-        # Adiciona linha de totais
-        df_totais = pd.DataFrame([{
-            'Data': 'TOTAL',
-            'Genesis': '',
-            'Unidade': '',
-            'Lei': '',
-            'Artigo': '',
-            'Condutor': f'{len(ocorrencias)} ocorrências',
-            'Qtd_Itens': total_itens
-        }])
-        
-        df = pd.concat([df, df_totais], ignore_index=True)
-        
-        # Nome do arquivo
-        nome_arquivo = f"resumo_mensal_{ano}_{mes:02d}.xlsx"
-        caminho_arquivo = os.path.join(self.export_dir, nome_arquivo)
-        
-        # Exporta para Excel
-        with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'Resumo {mes:02d}/{ano}', index=False)
-            
-            # Formatação
-            worksheet = writer.sheets[f'Resumo {mes:02d}/{ano}']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        return caminho_arquivo
-    
-    def export_por_policial(self, policial_id: int, data_inicio: date, data_fim: date) -> str:
+
+        stmt = self._consulta_resumo(data_inicio, data_fim)
+        ocorrencias = _garantir_linhas(
+            self._executar(stmt),
+            f"Nenhuma ocorrência encontrada em {mes:02d}/{ano}"
+        )
+
+        nome_base = f"resumo_mensal_{ano}_{mes:02d}"
+        return self._salvar(nome_base, [
+            Aba(f'Resumo {mes:02d}-{ano}', self.COLUNAS_RESUMO, self._linhas_resumo(ocorrencias), largura_maxima=30,
+                tipos=self.TIPOS_RESUMO)
+        ], formato, self._estimar_linhas(stmt, extra=1))
+
+    @staticmethod
+    def _grupos_mensais(linhas):
+        """Particiona as linhas do resumo (já ordenadas por data) em (ano, mês, linhas do mês)"""
+        mes_da_linha = lambda linha: (linha[0].year, linha[0].month)
+        for (ano, mes), grupo in itertools.groupby(linhas, key=mes_da_linha):
+            yield ano, mes, grupo
+
+    def export_resumos_mensais(self, data_inicio: date, data_fim: date, modo: str = "abas",
+                               formato: str = "xlsx"):
+        """
+        Resumo mensal de todos os meses do período (ex.: um ano inteiro), lendo o
+        período uma única vez e particionando as linhas por mês. Meses sem
+        ocorrências não geram aba nem arquivo.
+
+        modo="abas": um arquivo com uma aba por mês (retorna o caminho).
+        modo="arquivos": um arquivo por mês, com o mesmo conteúdo de export_resumo_mensal,
+        em uma pasta do período (retorna a lista de caminhos).
+        """
+        if modo not in ("abas", "arquivos"):
+            raise ValueError(f"Modo inválido: {modo}")
+        if modo == "arquivos" and self.destino is not None:
+            raise ValueError("Um arquivo por mês não é suportado em streaming; use modo='abas'")
+        if data_fim < data_inicio:
+            raise ValueError("Data final anterior à data inicial")
+        periodo = f"{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}"
+
+        stmt = self._consulta_resumo(data_inicio, data_fim, fim_exclusivo=False)
+        meses = self._grupos_mensais(_garantir_linhas(
+            self._executar(stmt),
+            "Nenhuma ocorrência encontrada no período especificado"
+        ))
+
+        if modo == "abas":
+            abas = (
+                Aba(f'Resumo {mes:02d}-{ano}', self.COLUNAS_RESUMO, self._linhas_resumo(linhas), largura_maxima=30,
+                    tipos=self.TIPOS_RESUMO)
+                for ano, mes, linhas in meses
+            )
+            # Uma linha de total por mês do período (estimativa: todos os meses com dados)
+            total_meses = (data_fim.year - data_inicio.year) * 12 + data_fim.month - data_inicio.month + 1
+            return self._salvar(f"resumos_mensais_{periodo}", abas, formato,
+                                self._estimar_linhas(stmt, extra=total_meses), multiplas_abas=True)
+
+        pasta_resumos = os.path.join(self.export_dir, f"resumos_mensais_{periodo}")
+        os.makedirs(pasta_resumos, exist_ok=True)
+        servico_resumos = ExcelExportService(self.db, export_dir=pasta_resumos, max_linhas=self.max_linhas,
+                                             dividir_em_arquivos=self.dividir_em_arquivos)
+        return [
+            servico_resumos._salvar(
+                f"resumo_mensal_{ano}_{mes:02d}",
+                [Aba(f'Resumo {mes:02d}-{ano}', self.COLUNAS_RESUMO, self._linhas_resumo(linhas), largura_maxima=30,
+                     tipos=self.TIPOS_RESUMO)],
+                formato
+            )
+            for ano, mes, linhas in meses
+        ]
+
+    COLUNAS_POLICIAL = [
+        'Data', 'Genesis', 'Unidade', 'Lei', 'Artigo', 'Item', 'Especie', 'Quantidade',
+        'Proprietario', 'Documento'
+    ]
+    TIPOS_POLICIAL = {'Quantidade': int}
+
+    def _consulta_policial(self, policial_id: int, data_inicio: date, data_fim: date):
+        """Itens das ocorrências conduzidas pelo policial, em um único SELECT com joins"""
+        stmt = (
+            select(
+                Ocorrencia.data_apreensao, Ocorrencia.numero_genesis, Ocorrencia.unidade_fato,
+                Ocorrencia.lei_infringida, Ocorrencia.artigo, ItemApreendido.item,
+                ItemApreendido.especie, ItemApreendido.quantidade, Proprietario.nome,
+                Proprietario.documento
+            )
+            .join(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .join(Proprietario, ItemApreendido.proprietario_id == Proprietario.id)
+            .where(Ocorrencia.policial_condutor_id == policial_id)
+            .order_by(Ocorrencia.data_apreensao, Ocorrencia.id, ItemApreendido.id)
+        )
+        return self._filtrar_periodo(stmt, data_inicio, data_fim)
+
+    @staticmethod
+    def _formatar_linha_policial(linha: Sequence) -> tuple:
+        return (linha[0].strftime('%d/%m/%Y'),) + tuple(linha[1:])
+
+    def _linhas_policial(self, stmt):
+        for linha in self._executar(stmt):
+            yield self._formatar_linha_policial(linha)
+
+    def export_por_policial(self, policial_id: int, data_inicio: date, data_fim: date, formato: str = "xlsx") -> str:
         """
         Exporta relatório de ocorrências por policial específico
         """
@@ -189,128 +358,180 @@ class ExcelExportService:
         policial = self.db.query(Policial).filter(Policial.id == policial_id).first()
         if not policial:
             raise ValueError("Policial não encontrado")
-        
-        # Busca ocorrências do policial no período
-        ocorrencias = self.db.query(Ocorrencia).filter(
-            Ocorrencia.policial_condutor_id == policial_id,
-            Ocorrencia.data_apreensao >= data_inicio,
-            Ocorrencia.data_apreensao <= data_fim
-        ).all()
-        
-        if not ocorrencias:
-            raise ValueError(f"Nenhuma ocorrência encontrada para {policial.nome} no período")
-        
-        # Prepara dados
-        dados_policial = []
-        
-        for ocorrencia in ocorrencias:
-            for item in ocorrencia.itens_apreendidos:
-                dados_policial.append({
-                    'Data': ocorrencia.data_apreensao.strftime('%d/%m/%Y'),
-                    'Genesis': ocorrencia.numero_genesis,
-                    'Unidade': ocorrencia.unidade_fato,
-                    'Lei': ocorrencia.lei_infringida,
-                    'Artigo': ocorrencia.artigo,
-                    'Item': item.item,
-                    'Especie': item.especie,
-                    'Quantidade': item.quantidade,
-                    'Proprietario': item.proprietario.nome,
-                    'Documento': item.proprietario.documento
-                })
-        
-        # Cria DataFrame
-        df = pd.DataFrame(dados_policial)
-        
-        # Nome do arquivo
-        nome_arquivo = f"relatorio_{policial.nome.replace(' ', '_')}_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}.xlsx"
-        caminho_arquivo = os.path.join(self.export_dir, nome_arquivo)
-        
-        # Exporta para Excel
-        with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'{policial.nome[:30]}', index=False)
-            
-            # Formatação
-            worksheet = writer.sheets[f'{policial.nome[:30]}']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 40)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        return caminho_arquivo
-    
-    def export_estatisticas(self, data_inicio: date, data_fim: date) -> str:
+
+        stmt = self._consulta_policial(policial_id, data_inicio, data_fim)
+        linhas = _garantir_linhas(
+            self._linhas_policial(stmt),
+            f"Nenhuma ocorrência encontrada para {policial.nome} no período"
+        )
+
+        nome_base = f"relatorio_{policial.nome.replace(' ', '_')}_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}"
+        return self._salvar(nome_base, [
+            Aba(policial.nome[:30], self.COLUNAS_POLICIAL, linhas, largura_maxima=40,
+                tipos=self.TIPOS_POLICIAL)
+        ], formato, self._estimar_linhas(stmt))
+
+    def _consulta_lote_policiais(self, data_inicio: date, data_fim: date, unidade: Optional[str] = None,
+                                 policiais_ids: Optional[Sequence[int]] = None):
+        """Itens de todos os condutores do período, ordenados por condutor (um único SELECT)"""
+        stmt = (
+            select(
+                Policial.id, Policial.nome, Policial.matricula,
+                Ocorrencia.data_apreensao, Ocorrencia.numero_genesis, Ocorrencia.unidade_fato,
+                Ocorrencia.lei_infringida, Ocorrencia.artigo, ItemApreendido.item,
+                ItemApreendido.especie, ItemApreendido.quantidade, Proprietario.nome,
+                Proprietario.documento
+            )
+            .join(Policial, Ocorrencia.policial_condutor_id == Policial.id)
+            .join(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .join(Proprietario, ItemApreendido.proprietario_id == Proprietario.id)
+            .order_by(Ocorrencia.policial_condutor_id, Ocorrencia.data_apreensao, Ocorrencia.id, ItemApreendido.id)
+        )
+        if unidade is not None:
+            stmt = stmt.where(Policial.unidade == unidade)
+        if policiais_ids is not None:
+            stmt = stmt.where(Ocorrencia.policial_condutor_id.in_(policiais_ids))
+        return self._filtrar_periodo(stmt, data_inicio, data_fim)
+
+    def _grupos_policiais(self, linhas):
+        """Particiona as linhas (já ordenadas por condutor) em (id, nome, matrícula, linhas do policial)"""
+        for (policial_id, nome, matricula), grupo in itertools.groupby(linhas, key=lambda linha: tuple(linha[:3])):
+            yield policial_id, nome, matricula, (self._formatar_linha_policial(linha[3:]) for linha in grupo)
+
+    def export_lote_policiais(self, data_inicio: date, data_fim: date, unidade: Optional[str] = None,
+                              policiais_ids: Optional[Sequence[int]] = None, modo: str = "abas",
+                              formato: str = "xlsx", processos: int = 1):
+        """
+        Relatório por policial de todos os condutores do período (opcionalmente de uma
+        unidade), lendo o período uma única vez e particionando as linhas por condutor.
+
+        modo="abas": um arquivo com uma aba por policial (retorna o caminho).
+        modo="arquivos": um arquivo por policial em uma pasta do lote (retorna a lista de caminhos);
+        com processos > 1 os policiais são divididos entre processos, cada um com sua consulta.
+        """
+        if modo not in ("abas", "arquivos"):
+            raise ValueError(f"Modo inválido: {modo}")
+        if modo == "arquivos" and self.destino is not None:
+            raise ValueError("Um arquivo por policial não é suportado em streaming; use modo='abas'")
+        periodo = f"{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}"
+
+        if modo == "arquivos" and processos > 1:
+            return self._export_lote_paralelo(data_inicio, data_fim, unidade, policiais_ids, formato, processos)
+
+        grupos = self._grupos_policiais(_garantir_linhas(
+            self._executar(self._consulta_lote_policiais(data_inicio, data_fim, unidade, policiais_ids)),
+            "Nenhuma ocorrência encontrada para os policiais no período"
+        ))
+
+        if modo == "abas":
+            sufixo = f"_{unidade.replace(' ', '_')}" if unidade else ""
+            abas = (
+                Aba(f"{nome[:20]} {matricula}", self.COLUNAS_POLICIAL, linhas, largura_maxima=40,
+                    tipos=self.TIPOS_POLICIAL)
+                for _, nome, matricula, linhas in grupos
+            )
+            return self._salvar(f"relatorio_policiais{sufixo}_{periodo}", abas, formato, multiplas_abas=True)
+
+        pasta_lote = os.path.join(self.export_dir, f"lote_policiais_{periodo}")
+        os.makedirs(pasta_lote, exist_ok=True)
+        servico_lote = ExcelExportService(self.db, export_dir=pasta_lote, max_linhas=self.max_linhas,
+                                          dividir_em_arquivos=self.dividir_em_arquivos)
+        return [
+            servico_lote._salvar(
+                f"relatorio_{nome.replace(' ', '_')}_{matricula}_{periodo}",
+                [Aba(nome[:30], self.COLUNAS_POLICIAL, linhas, largura_maxima=40, tipos=self.TIPOS_POLICIAL)], formato
+            )
+            for _, nome, matricula, linhas in grupos
+        ]
+
+    def _export_lote_paralelo(self, data_inicio: date, data_fim: date, unidade: Optional[str],
+                              policiais_ids: Optional[Sequence[int]], formato: str, processos: int) -> List[str]:
+        """Divide os condutores do período entre processos; cada um gera os arquivos da sua parte"""
+        stmt = (
+            select(Ocorrencia.policial_condutor_id)
+            .join(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .distinct()
+            .order_by(Ocorrencia.policial_condutor_id)
+        )
+        if unidade is not None:
+            stmt = stmt.join(Policial, Ocorrencia.policial_condutor_id == Policial.id).where(Policial.unidade == unidade)
+        if policiais_ids is not None:
+            stmt = stmt.where(Ocorrencia.policial_condutor_id.in_(policiais_ids))
+        ids = list(self.db.scalars(self._filtrar_periodo(stmt, data_inicio, data_fim)))
+        if not ids:
+            raise ValueError("Nenhuma ocorrência encontrada para os policiais no período")
+
+        partes = [ids[indice::processos] for indice in range(min(processos, len(ids)))]
+        database_url = self.db.get_bind().url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=len(partes)) as executor:
+            futuros = [
+                executor.submit(_exportar_lote_em_processo, database_url, config.SQLITE_CONFIG, self.export_dir,
+                                parte, data_inicio, data_fim, formato)
+                for parte in partes
+            ]
+            return sorted(caminho for futuro in futuros for caminho in futuro.result())
+
+    def export_estatisticas(self, data_inicio: date, data_fim: date, formato: str = "xlsx") -> str:
         """
         Exporta planilha com estatísticas do período
         """
-        # Busca dados
-        ocorrencias = get_ocorrencias_por_periodo(self.db, data_inicio, data_fim)
-        
-        if not ocorrencias:
-            raise ValueError("Nenhuma ocorrência encontrada no período")
-        
-        # Estatísticas por lei
+        # Um único SELECT agregado por (lei, condutor, unidade); o banco faz a contagem
+        stmt = (
+            select(
+                Ocorrencia.lei_infringida, Policial.nome, Ocorrencia.unidade_fato,
+                func.count(func.distinct(Ocorrencia.id)), func.count(ItemApreendido.id)
+            )
+            .join(Policial, Ocorrencia.policial_condutor_id == Policial.id)
+            .outerjoin(ItemApreendido, ItemApreendido.ocorrencia_id == Ocorrencia.id)
+            .group_by(Ocorrencia.lei_infringida, Policial.nome, Ocorrencia.unidade_fato)
+        )
+        grupos = _garantir_linhas(
+            self._executar(self._filtrar_periodo(stmt, data_inicio, data_fim)),
+            "Nenhuma ocorrência encontrada no período"
+        )
+
+        # Contagens por dimensão (memória proporcional aos valores distintos)
         stats_lei = {}
         stats_policial = {}
         stats_unidade = {}
+        total_ocorrencias = 0
         total_itens = 0
-        
-        for ocorrencia in ocorrencias:
-            # Por lei
-            lei = ocorrencia.lei_infringida
-            if lei not in stats_lei:
-                stats_lei[lei] = 0
-            stats_lei[lei] += 1
-            
-            # Por policial
-            policial = ocorrencia.policial_condutor.nome
-            if policial not in stats_policial:
-                stats_policial[policial] = 0
-            stats_policial[policial] += 1
-            
-            # Por unidade
-            unidade = ocorrencia.unidade_fato
-            if unidade not in stats_unidade:
-                stats_unidade[unidade] = 0
-            stats_unidade[unidade] += 1
-            
-            # Total de itens
-            total_itens += len(ocorrencia.itens_apreendidos)
-        
-        # Nome do arquivo
-        nome_arquivo = f"estatisticas_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}.xlsx"
-        caminho_arquivo = os.path.join(self.export_dir, nome_arquivo)
-        
-        # Cria planilha com múltiplas abas
-        with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-            # Aba resumo geral
-            resumo_geral = pd.DataFrame([
-                ['Total de Ocorrências', len(ocorrencias)],
-                ['Total de Itens Apreendidos', total_itens],
-                ['Período', f"{data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}"],
-                ['Data do Relatório', datetime.now().strftime('%d/%m/%Y %H:%M')]
-            ], columns=['Descrição', 'Valor'])
-            resumo_geral.to_excel(writer, sheet_name='Resumo Geral', index=False)
-            
-            # Aba por lei
-            df_lei = pd.DataFrame(list(stats_lei.items()), columns=['Lei', 'Quantidade'])
-            df_lei = df_lei.sort_values('Quantidade', ascending=False)
-            df_lei.to_excel(writer, sheet_name='Por Lei', index=False)
-            
-            # Aba por policial
-            df_policial = pd.DataFrame(list(stats_policial.items()), columns=['Policial', 'Quantidade'])
-            df_policial = df_policial.sort_values('Quantidade', ascending=False)
-            df_policial.to_excel(writer, sheet_name='Por Policial', index=False)
-            
-            # Aba por unidade
-            df_unidade = pd.DataFrame(list(stats_unidade.items()), columns=['Unidade', 'Quantidade'])
-            df_unidade = df_unidade.sort_values('Quantidade', ascending=False)
-            df_unidade.to_excel(writer, sheet_name='Por Unidade', index=False)
-        
-        return caminho_arquivo
\ No newline at end of file
+
+        for lei, policial, unidade, qtd_ocorrencias, qtd_itens in grupos:
+            total_ocorrencias += qtd_ocorrencias
+            total_itens += qtd_itens
+            stats_lei[lei] = stats_lei.get(lei, 0) + qtd_ocorrencias
+            stats_policial[policial] = stats_policial.get(policial, 0) + qtd_ocorrencias
+            stats_unidade[unidade] = stats_unidade.get(unidade, 0) + qtd_ocorrencias
+
+        def ordenar(stats):
+            return sorted(stats.items(), key=lambda par: par[1], reverse=True)
+
+        nome_base = f"estatisticas_{data_inicio.strftime('%Y%m%d')}_{data_fim.strftime('%Y%m%d')}"
+        return self._salvar(nome_base, [
+            Aba('Resumo Geral', ['Descrição', 'Valor'], [
+                ('Total de Ocorrências', total_ocorrencias),
+                ('Total de Itens Apreendidos', total_itens),
+                ('Período', f"{data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}"),
+                ('Data do Relatório', datetime.now().strftime('%d/%m/%Y %H:%M'))
+            ]),
+            Aba('Por Lei', ['Lei', 'Quantidade'], ordenar(stats_lei), tipos={'Quantidade': int}),
+            Aba('Por Policial', ['Policial', 'Quantidade'], ordenar(stats_policial), tipos={'Quantidade': int}),
+            Aba('Por Unidade', ['Unidade', 'Quantidade'], ordenar(stats_unidade), tipos={'Quantidade': int}),
+        ], formato)
+
+    def exportar_relatorio(self, relatorio: str, parametros: dict, formato: str = "xlsx") -> str:
+        """Exporta pelo nome do relatório (completo, resumo_mensal, resumos_mensais, policial, estatisticas)"""
+        if relatorio == "completo":
+            return self.export_ocorrencias_completo(parametros["data_inicio"], parametros["data_fim"], formato)
+        if relatorio == "resumo_mensal":
+            return self.export_resumo_mensal(parametros["ano"], parametros["mes"], formato)
+        if relatorio == "resumos_mensais":
+            return self.export_resumos_mensais(parametros["data_inicio"], parametros["data_fim"], formato=formato)
+        if relatorio == "policial":
+            return self.export_por_policial(
+                parametros["policial_id"], parametros["data_inicio"], parametros["data_fim"], formato
+            )
+        if relatorio == "estatisticas":
+            return self.export_estatisticas(parametros["data_inicio"], parametros["data_fim"], formato)
+        raise ValueError(f"Relatório desconhecido: {relatorio}")
@@ -0,0 +1,209 @@
+"""
+Cache de exportações em EXPORTS_DIR/cache
+
+Cada arquivo gerado é guardado em cache/<chave>/<nome do arquivo>, onde a
+chave combina o tipo de relatório, os parâmetros, o formato e a versão dos
+dados do período (ver app.versao_dados_periodo). Uma sincronização ou edição
+que toque o período muda a versão e, portanto, a chave: a entrada antiga
+deixa de ser usada e sai pela remoção LRU (mtime da pasta, atualizado a cada
+acerto) quando o cache passa de EXPORT_CACHE_MAX_MB ou EXPORT_CACHE_MAX_ARQUIVOS.
+Entradas fixadas por jobs de exportação (fixar) não saem pelo LRU até o fim
+do TTL do job, mesmo que o cache fique acima do limite nesse intervalo.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+PASTA_CACHE = "cache"
+_PREFIXO_TEMPORARIO = ".tmp-"
+
+
+def periodo_relatorio(relatorio: str, parametros: Dict[str, Any]) -> Tuple[date, date]:
+    """Período de dados (inclusive) lido por um relatório"""
+    if relatorio == "resumo_mensal":
+        ano, mes = parametros["ano"], parametros["mes"]
+        fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+        return date(ano, mes, 1), date.fromordinal(fim.toordinal() - 1)
+    return parametros["data_inicio"], parametros["data_fim"]
+
+
+class GravacaoCache:
+    """
+    Arquivo do cache escrito aos poucos (ex.: cópia de uma exportação em streaming).
+    Como em adicionar(), arquivos maiores que o cache não entram nele: ao passar
+    de max_bytes a cópia é interrompida e concluir() não publica nada.
+    """
+
+    def __init__(self, cache: "CacheExportacoes", chave: str):
+        self.cache = cache
+        self.chave = chave
+        self.pasta = os.path.join(cache.pasta, f"{_PREFIXO_TEMPORARIO}{uuid.uuid4().hex}")
+        os.makedirs(self.pasta, exist_ok=True)
+        self.arquivo = open(os.path.join(self.pasta, "conteudo"), "wb")
+        self.tamanho = 0
+        self.excedeu = False
+
+    def write(self, dados):
+        if self.excedeu:
+            return
+        self.tamanho += len(dados)
+        if self.tamanho > self.cache.max_bytes:
+            self.excedeu = True
+            self.descartar()
+            return
+        self.arquivo.write(dados)
+
+    def concluir(self, nome_arquivo: str) -> Optional[str]:
+        if self.excedeu:
+            return None
+        self.arquivo.close()
+        os.replace(os.path.join(self.pasta, "conteudo"), os.path.join(self.pasta, nome_arquivo))
+        return self.cache._publicar(self.chave, self.pasta)
+
+    def descartar(self):
+        self.arquivo.close()
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+
+class CacheExportacoes:
+    """Arquivos de exportação reutilizáveis enquanto os dados do período não mudam"""
+
+    def __init__(self, pasta: Optional[str] = None, max_mb: Optional[float] = None,
+                 max_arquivos: Optional[int] = None):
+        self.pasta = pasta or os.path.join(str(config.EXPORTS_DIR), PASTA_CACHE)
+        self.max_bytes = (config.EXPORT_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+        self.max_arquivos = config.EXPORT_CACHE_MAX_ARQUIVOS if max_arquivos is None else max_arquivos
+        self.acertos = 0
+        self.faltas = 0
+        self._lock = threading.Lock()
+        self._fixadas: Dict[str, float] = {}  # pasta da entrada -> instante até o qual não pode sair pelo LRU
+        os.makedirs(self.pasta, exist_ok=True)
+
+    @staticmethod
+    def chave(relatorio: str, parametros: Dict[str, Any], formato: str, versao_dados: str) -> str:
+        conteudo = json.dumps([relatorio, parametros, formato, versao_dados], sort_keys=True, default=str)
+        return hashlib.sha256(conteudo.encode()).hexdigest()[:32]
+
+    def _caminho(self, chave: str) -> Optional[str]:
+        pasta = os.path.join(self.pasta, chave)
+        try:
+            nomes = os.listdir(pasta)
+            os.utime(pasta)  # uso mais recente (LRU)
+        except OSError:
+            return None
+        return os.path.join(pasta, nomes[0]) if nomes else None
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Caminho do arquivo em cache (marcando o uso para o LRU) ou None"""
+        caminho = self._caminho(chave)
+        if caminho is None:
+            self.faltas += 1
+        else:
+            self.acertos += 1
+        return caminho
+
+    def gravar(self, chave: str) -> GravacaoCache:
+        return GravacaoCache(self, chave)
+
+    def adicionar(self, chave: str, caminho: str) -> str:
+        """Move um arquivo já gerado para o cache; retorna o novo caminho (ou o original, se maior que o cache)"""
+        if os.path.getsize(caminho) > self.max_bytes:
+            return caminho
+        pasta = os.path.join(self.pasta, f"{_PREFIXO_TEMPORARIO}{uuid.uuid4().hex}")
+        os.makedirs(pasta)
+        shutil.move(caminho, os.path.join(pasta, os.path.basename(caminho)))
+        return self._publicar(chave, pasta)
+
+    def fixar(self, caminho: str, ate: float):
+        """Mantém no cache a entrada de `caminho` até o instante `ate` (job que ainda pode baixá-la)"""
+        pasta = os.path.dirname(caminho)
+        with self._lock:
+            self._fixadas[pasta] = max(ate, self._fixadas.get(pasta, 0))
+
+    def _publicar(self, chave: str, pasta_temporaria: str) -> Optional[str]:
+        destino = os.path.join(self.pasta, chave)
+        with self._lock:
+            if os.path.isdir(destino):
+                # Gerado em paralelo por outra requisição: mantém o existente
+                shutil.rmtree(pasta_temporaria, ignore_errors=True)
+            else:
+                os.replace(pasta_temporaria, destino)
+        self.remover_excedentes()
+        return self._caminho(chave)
+
+    def _entradas(self):
+        """(mtime, tamanho, pasta) das entradas publicadas"""
+        entradas = []
+        for nome in os.listdir(self.pasta):
+            pasta = os.path.join(self.pasta, nome)
+            if nome.startswith(_PREFIXO_TEMPORARIO) or not os.path.isdir(pasta):
+                continue
+            try:
+                tamanho = sum(entrada.stat().st_size for entrada in os.scandir(pasta))
+                entradas.append((os.path.getmtime(pasta), tamanho, pasta))
+            except FileNotFoundError:
+                continue
+        return entradas
+
+    def remover_excedentes(self) -> int:
+        """Remove as entradas menos usadas até respeitar os limites de tamanho e quantidade"""
+        with self._lock:
+            agora = time.time()
+            self._fixadas = {pasta: ate for pasta, ate in self._fixadas.items() if ate > agora}
+            todas = self._entradas()
+            total = sum(tamanho for _, tamanho, _ in todas)
+            quantidade = len(todas)
+            entradas = sorted(entrada for entrada in todas if entrada[2] not in self._fixadas)
+            removidas = 0
+            while entradas and (total > self.max_bytes or quantidade > self.max_arquivos):
+                _, tamanho, pasta = entradas.pop(0)
+                shutil.rmtree(pasta, ignore_errors=True)
+                total -= tamanho
+                quantidade -= 1
+                removidas += 1
+
+            # Gravações interrompidas há mais de uma hora
+            limite = time.time() - 3600
+            for nome in os.listdir(self.pasta):
+                pasta = os.path.join(self.pasta, nome)
+                if nome.startswith(_PREFIXO_TEMPORARIO) and os.path.getmtime(pasta) < limite:
+                    shutil.rmtree(pasta, ignore_errors=True)
+        return removidas
+
+    def limpar(self):
+        with self._lock:
+            for nome in os.listdir(self.pasta):
+                shutil.rmtree(os.path.join(self.pasta, nome), ignore_errors=True)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        entradas = self._entradas()
+        return {
+            "arquivos": len(entradas),
+            "tamanho_mb": round(sum(tamanho for _, tamanho, _ in entradas) / (1024 * 1024), 2),
+            "limite_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "limite_arquivos": self.max_arquivos,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache() -> CacheExportacoes:
+    """Cache de exportações do processo da API, criado no primeiro uso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheExportacoes()
+    return _cache
@@ -0,0 +1,454 @@
+"""
+Motor de exportação em streaming
+
+As linhas de cada aba são consumidas de um iterador (normalmente um cursor
+do banco lido em lotes) e escritas imediatamente pelo writer do formato
+escolhido (XLSX write-only, CSV, JSONL ou Parquet), de modo que o uso de
+memória não depende do número de linhas.
+
+Todos os writers seguem a mesma interface: nova_aba(titulo, colunas,
+largura_maxima, tipos), escrever(linha) e fechar().
+
+Exportações acima de um limite de linhas são divididas em partes: abas
+consecutivas (dividir_abas) ou arquivos consecutivos (exportar_em_arquivos);
+as partes produzidas são descritas por uma lista de ParteExportacao.
+"""
+import csv
+import io
+import itertools
+import re
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from services.fast_json import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow é opcional (apenas para Parquet)
+    pyarrow = None
+
+# Caracteres não permitidos em nomes de abas do Excel
+_CARACTERES_INVALIDOS_ABA = re.compile(r"[\[\]:*?/\\]")
+
+# Linhas mantidas em memória por aba para calcular larguras antes da escrita
+LINHAS_AMOSTRA_LARGURA = 1000
+
+# Linhas de dados por aba do Excel (1.048.576 linhas, incluindo o cabeçalho)
+LIMITE_LINHAS_XLSX = 1048575
+
+# Linhas agrupadas por row group no Parquet
+LINHAS_POR_GRUPO_PARQUET = 10000
+
+
+def titulo_aba_valido(titulo: str) -> str:
+    """Ajusta o título às regras do Excel (sem caracteres especiais, até 31 caracteres)"""
+    titulo = _CARACTERES_INVALIDOS_ABA.sub("_", titulo).strip() or "Planilha"
+    return titulo[:31]
+
+
+class Aba:
+    """
+    Definição de uma aba: título, colunas e iterador de linhas (sequências na ordem das colunas).
+    tipos: opcional, tipo Python (int ou float) das colunas numéricas, declarado pelo
+    relatório; as demais colunas são texto nos formatos tipados (Parquet).
+    """
+
+    def __init__(self, titulo: str, colunas: Sequence[str], linhas: Iterable[Sequence[Any]],
+                 largura_maxima: int = 50, tipos: Optional[Dict[str, type]] = None):
+        self.titulo = titulo
+        self.colunas = list(colunas)
+        self.linhas = linhas
+        self.largura_maxima = largura_maxima
+        self.tipos = dict(tipos or {})
+
+
+class LarguraColunas:
+    """Largura das colunas calculada incrementalmente: máximo corrente por coluna, limitado"""
+
+    def __init__(self, colunas: Sequence[str], largura_maxima: int = 50, margem: int = 2):
+        self.largura_maxima = largura_maxima
+        self.margem = margem
+        self.maximos = [len(str(coluna)) for coluna in colunas]
+
+    def observar(self, linha: Sequence[Any]):
+        maximos = self.maximos
+        teto = self.largura_maxima - self.margem
+        for indice, valor in enumerate(linha):
+            if valor is None:
+                continue
+            if indice >= len(maximos):
+                maximos.extend([0] * (indice + 1 - len(maximos)))
+            if maximos[indice] >= teto:
+                continue
+            tamanho = len(str(valor))
+            if tamanho > maximos[indice]:
+                maximos[indice] = tamanho
+
+    def larguras(self) -> List[int]:
+        return [min(maximo + self.margem, self.largura_maxima) for maximo in self.maximos]
+
+    def aplicar(self, worksheet):
+        for indice, largura in enumerate(self.larguras(), 1):
+            worksheet.column_dimensions[get_column_letter(indice)].width = largura
+
+
+class XlsxStreamWriter:
+    """
+    Escreve XLSX com worksheets write-only (linhas vão para disco assim que escritas).
+
+    Em modo write-only as larguras das colunas precisam ser definidas antes da
+    primeira linha; por isso as primeiras `linhas_amostra` linhas de cada aba
+    ficam em memória enquanto LarguraColunas acompanha o máximo de cada coluna,
+    e as larguras são aplicadas uma única vez antes de descarregá-las.
+
+    O estado de formatação é compartilhado entre as abas do arquivo: a fonte do
+    cabeçalho é criada uma única vez e abas com as mesmas colunas (ex.: um
+    resumo por mês) continuam a partir das larguras das abas anteriores.
+    """
+    extensao = "xlsx"
+
+    def __init__(self, destino, linhas_amostra: int = LINHAS_AMOSTRA_LARGURA):
+        # destino: caminho do arquivo ou objeto file-like binário
+        self.destino = destino
+        self.linhas_amostra = linhas_amostra
+        self.workbook = Workbook(write_only=True)
+        self._aba = None
+        self._colunas = None
+        self._larguras = None
+        self._pendentes = None
+        self._fonte_cabecalho = Font(bold=True)
+        self._larguras_por_colunas = {}
+
+    def nova_aba(self, titulo: str, colunas: List[str], largura_maxima: int = 50,
+                 tipos: Optional[Dict[str, type]] = None):
+        self._descarregar()
+        self._aba = self.workbook.create_sheet(title=titulo_aba_valido(titulo))
+        self._colunas = colunas
+        chave = (tuple(colunas), largura_maxima)
+        if chave not in self._larguras_por_colunas:
+            self._larguras_por_colunas[chave] = LarguraColunas(colunas, largura_maxima)
+        self._larguras = self._larguras_por_colunas[chave]
+        self._pendentes = []
+
+    def escrever(self, linha: Sequence[Any]):
+        if self._pendentes is None:
+            self._aba.append(list(linha))
+            return
+
+        self._larguras.observar(linha)
+        self._pendentes.append(list(linha))
+        if len(self._pendentes) >= self.linhas_amostra:
+            self._descarregar()
+
+    def _descarregar(self):
+        """Aplica as larguras, escreve o cabeçalho e as linhas retidas da aba atual"""
+        if self._pendentes is None:
+            return
+
+        self._larguras.aplicar(self._aba)
+
+        cabecalho = []
+        for coluna in self._colunas:
+            celula = WriteOnlyCell(self._aba, value=coluna)
+            celula.font = self._fonte_cabecalho
+            cabecalho.append(celula)
+        self._aba.append(cabecalho)
+
+        for linha in self._pendentes:
+            self._aba.append(linha)
+        self._pendentes = None
+
+    def fechar(self):
+        self._descarregar()
+        self.workbook.save(self.destino)
+
+
+class _WriterArquivoUnico:
+    """Base dos formatos sem abas: destino é um caminho ou objeto file-like binário"""
+    extensao = None
+
+    def __init__(self, destino):
+        if isinstance(destino, (str, bytes)) or hasattr(destino, "__fspath__"):
+            self._arquivo = open(destino, "wb")
+            self._fechar_arquivo = True
+        else:
+            self._arquivo = destino
+            self._fechar_arquivo = False
+        self._colunas = None
+
+    def nova_aba(self, titulo: str, colunas: List[str], largura_maxima: int = 50,
+                 tipos: Optional[Dict[str, type]] = None):
+        if self._colunas is not None:
+            raise ValueError(f"O formato {self.extensao} suporta uma única aba por arquivo")
+        self._colunas = list(colunas)
+        self._tipos = dict(tipos or {})
+
+    def fechar(self):
+        if self._fechar_arquivo:
+            self._arquivo.close()
+
+
+class CsvStreamWriter(_WriterArquivoUnico):
+    """CSV em UTF-8, uma linha escrita por vez"""
+    extensao = "csv"
+
+    def nova_aba(self, titulo: str, colunas: List[str], largura_maxima: int = 50,
+                 tipos: Optional[Dict[str, type]] = None):
+        super().nova_aba(titulo, colunas, largura_maxima, tipos)
+        self._texto = io.TextIOWrapper(self._arquivo, encoding="utf-8", newline="", write_through=False)
+        self._csv = csv.writer(self._texto)
+        self._csv.writerow(self._colunas)
+
+    def escrever(self, linha: Sequence[Any]):
+        self._csv.writerow(linha)
+
+    def fechar(self):
+        if self._colunas is not None:
+            self._texto.flush()
+            self._texto.detach()
+        super().fechar()
+
+
+class JsonlStreamWriter(_WriterArquivoUnico):
+    """JSON Lines: um objeto por linha, com as colunas como chaves"""
+    extensao = "jsonl"
+
+    def escrever(self, linha: Sequence[Any]):
+        self._arquivo.write(dumps(dict(zip(self._colunas, linha))))
+        self._arquivo.write(b"\n")
+
+
+class ParquetStreamWriter(_WriterArquivoUnico):
+    """
+    Parquet (requer pyarrow), escrito em row groups de LINHAS_POR_GRUPO_PARQUET
+    linhas. O schema é fixado no primeiro grupo, então os tipos vêm da definição
+    da aba (Aba.tipos: int ou float) e não dos valores: colunas sem tipo declarado
+    são texto, e um valor diferente num grupo posterior não invalida o arquivo.
+    """
+    extensao = "parquet"
+
+    def __init__(self, destino, linhas_por_grupo: int = LINHAS_POR_GRUPO_PARQUET):
+        if pyarrow is None:
+            raise RuntimeError("Exportação Parquet requer o pacote pyarrow")
+        super().__init__(destino)
+        self.linhas_por_grupo = linhas_por_grupo
+        self._grupo = []
+        self._writer = None
+        self._schema = None
+
+    def escrever(self, linha: Sequence[Any]):
+        self._grupo.append(linha)
+        if len(self._grupo) >= self.linhas_por_grupo:
+            self._gravar_grupo()
+
+    @staticmethod
+    def _tipo_arrow(tipo):
+        if tipo is int:
+            return pyarrow.int64()
+        if tipo is float:
+            return pyarrow.float64()
+        return pyarrow.string()
+
+    def _gravar_grupo(self):
+        colunas = list(zip(*self._grupo)) if self._grupo else [() for _ in self._colunas]
+        if self._schema is None:
+            self._schema = pyarrow.schema([
+                (nome, self._tipo_arrow(self._tipos.get(nome))) for nome in self._colunas
+            ])
+            self._writer = pyarrow.parquet.ParquetWriter(self._arquivo, self._schema)
+
+        arrays = []
+        for campo, valores in zip(self._schema, colunas):
+            if campo.type == pyarrow.string():
+                valores = [None if valor is None else str(valor) for valor in valores]
+            arrays.append(pyarrow.array(valores, type=campo.type))
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+        self._grupo = []
+
+    def fechar(self):
+        if self._colunas is not None and (self._grupo or self._writer is None):
+            self._gravar_grupo()
+        if self._writer is not None:
+            self._writer.close()
+        super().fechar()
+
+
+class ZipPorAbaWriter:
+    """Para formatos sem abas: cada aba vira um arquivo dentro de um ZIP, escrito em streaming"""
+    extensao = "zip"
+
+    def __init__(self, destino, writer_cls):
+        self.zip = zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED)
+        self.writer_cls = writer_cls
+        self._entrada = None
+        self._writer = None
+
+    def nova_aba(self, titulo: str, colunas: List[str], largura_maxima: int = 50,
+                 tipos: Optional[Dict[str, type]] = None):
+        self._fechar_aba()
+        nome = re.sub(r"[^\w\-]+", "_", titulo).strip("_") or "planilha"
+        self._entrada = self.zip.open(f"{nome}.{self.writer_cls.extensao}", "w")
+        self._writer = self.writer_cls(self._entrada)
+        self._writer.nova_aba(titulo, colunas, largura_maxima, tipos)
+
+    def escrever(self, linha: Sequence[Any]):
+        self._writer.escrever(linha)
+
+    def _fechar_aba(self):
+        if self._writer is not None:
+            self._writer.fechar()
+            self._entrada.close()
+            self._writer = None
+
+    def fechar(self):
+        self._fechar_aba()
+        self.zip.close()
+
+
+WRITERS = {
+    "xlsx": XlsxStreamWriter,
+    "csv": CsvStreamWriter,
+    "jsonl": JsonlStreamWriter,
+    "parquet": ParquetStreamWriter,
+}
+
+
+def formatos_disponiveis() -> List[str]:
+    """Formatos de exportação suportados no ambiente atual"""
+    return [formato for formato in WRITERS if formato != "parquet" or pyarrow is not None]
+
+
+def criar_writer(formato: str, destino, multiplas_abas: bool = False):
+    """Instancia o writer do formato; formatos sem abas com várias abas geram um ZIP"""
+    if formato not in formatos_disponiveis():
+        raise ValueError(f"Formato de exportação não suportado: {formato}")
+    writer_cls = WRITERS[formato]
+    if multiplas_abas and writer_cls is not XlsxStreamWriter:
+        return ZipPorAbaWriter(destino, writer_cls)
+    return writer_cls(destino)
+
+
+def extensao_arquivo(formato: str, multiplas_abas: bool = False) -> str:
+    """Extensão do arquivo gerado por criar_writer com os mesmos argumentos"""
+    if multiplas_abas and formato != "xlsx":
+        return ZipPorAbaWriter.extensao
+    return WRITERS[formato].extensao
+
+
+class ParteExportacao:
+    """Item do manifesto de uma exportação: aba escrita em uma parte (arquivo) e quantas linhas contém"""
+
+    def __init__(self, parte: int, aba: str, linhas: int = 0, arquivo: Optional[str] = None):
+        self.parte = parte
+        self.aba = aba
+        self.linhas = linhas
+        self.arquivo = arquivo
+
+    def como_dict(self) -> dict:
+        return {"parte": self.parte, "arquivo": self.arquivo, "aba": self.aba, "linhas": self.linhas}
+
+
+def titulo_parte(titulo: str, parte: int) -> str:
+    """Título da parte N de uma aba dividida: 'Título (N)', cortando o título para caber em 31 caracteres"""
+    titulo = titulo_aba_valido(titulo)
+    if parte == 1:
+        return titulo
+    sufixo = f" ({parte})"
+    return titulo[:31 - len(sufixo)] + sufixo
+
+
+def dividir_abas(abas: Iterable[Aba], max_linhas: int) -> Iterator[Aba]:
+    """
+    Divide abas com mais de max_linhas linhas em abas consecutivas 'Título (2)',
+    'Título (3)'... sem ler as linhas antecipadamente: cada parte deve ser
+    consumida por completo antes de pedir a próxima (como faz exportar).
+    """
+    for aba in abas:
+        linhas = iter(aba.linhas)
+        for parte in itertools.count(1):
+            bloco = itertools.islice(linhas, max_linhas)
+            try:
+                primeira = next(bloco)
+            except StopIteration:
+                if parte == 1:  # aba vazia continua presente (só o cabeçalho)
+                    yield aba
+                break
+            yield Aba(titulo_parte(aba.titulo, parte), aba.colunas, itertools.chain([primeira], bloco),
+                      aba.largura_maxima, aba.tipos)
+
+
+def exportar(writer, abas: Iterable[Aba], progresso: Optional[Callable[[int], None]] = None,
+             intervalo_progresso: int = 1000, manifesto: Optional[List[ParteExportacao]] = None) -> int:
+    """
+    Escreve todas as abas no writer e o fecha. Retorna o total de linhas de dados escritas.
+    progresso(total) é chamado a cada `intervalo_progresso` linhas e ao final.
+    manifesto: opcional, lista que recebe um ParteExportacao (parte 1) por aba escrita.
+    """
+    total = 0
+    for aba in abas:
+        writer.nova_aba(aba.titulo, aba.colunas, aba.largura_maxima, aba.tipos)
+        registro = ParteExportacao(1, aba.titulo)
+        if manifesto is not None:
+            manifesto.append(registro)
+        for linha in aba.linhas:
+            writer.escrever(linha)
+            registro.linhas += 1
+            total += 1
+            if progresso is not None and total % intervalo_progresso == 0:
+                progresso(total)
+    writer.fechar()
+    if progresso is not None:
+        progresso(total)
+    return total
+
+
+def exportar_em_arquivos(abrir_writer: Callable[[int], Any], abas: Iterable[Aba], max_linhas: int,
+                         progresso: Optional[Callable[[int], None]] = None, intervalo_progresso: int = 1000,
+                         manifesto: Optional[List[ParteExportacao]] = None) -> int:
+    """
+    Como exportar, mas com no máximo max_linhas linhas de dados por arquivo:
+    abrir_writer(parte) é chamado para a parte 1 e sempre que o arquivo atual
+    enche e ainda há linhas; a aba em andamento continua no arquivo seguinte
+    (mesmo título, novo cabeçalho). Só um arquivo fica aberto por vez.
+    """
+    parte = 1
+    writer = abrir_writer(parte)
+    linhas_no_arquivo = 0
+    total = 0
+    for aba in abas:
+        if linhas_no_arquivo >= max_linhas:
+            writer.fechar()
+            parte += 1
+            writer = abrir_writer(parte)
+            linhas_no_arquivo = 0
+        writer.nova_aba(aba.titulo, aba.colunas, aba.largura_maxima, aba.tipos)
+        registro = ParteExportacao(parte, aba.titulo)
+        if manifesto is not None:
+            manifesto.append(registro)
+
+        for linha in aba.linhas:
+            if linhas_no_arquivo >= max_linhas:
+                writer.fechar()
+                parte += 1
+                writer = abrir_writer(parte)
+                linhas_no_arquivo = 0
+                writer.nova_aba(aba.titulo, aba.colunas, aba.largura_maxima, aba.tipos)
+                registro = ParteExportacao(parte, aba.titulo)
+                if manifesto is not None:
+                    manifesto.append(registro)
+            writer.escrever(linha)
+            registro.linhas += 1
+            linhas_no_arquivo += 1
+            total += 1
+            if progresso is not None and total % intervalo_progresso == 0:
+                progresso(total)
+    writer.fechar()
+    if progresso is not None:
+        progresso(total)
+    return total
@@ -0,0 +1,329 @@
+"""
+Exportações em segundo plano
+
+A geração das planilhas é CPU-bound (openpyxl) e bloquearia a API se feita na
+requisição. Cada pedido vira um job executado em um ProcessPoolExecutor com
+no máximo EXPORT_MAX_JOBS processos; o progresso volta ao processo da API por
+uma fila do multiprocessing. O arquivo gerado fica em EXPORTS_DIR/jobs/<id>/
+e é removido após EXPORT_JOB_TTL_HORAS. Com um cache de exportações
+(services.export_cache), pedidos já em cache concluem na hora e arquivos
+novos são movidos para o cache ao final; a entrada do cache usada por um job
+fica fixada (fora da remoção LRU) até o fim do TTL do job.
+"""
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+# Relatórios disponíveis e parâmetros obrigatórios de cada um
+RELATORIOS = {
+    "completo": ["data_inicio", "data_fim"],
+    "resumo_mensal": ["ano", "mes"],
+    "resumos_mensais": ["data_inicio", "data_fim"],
+    "policial": ["policial_id", "data_inicio", "data_fim"],
+    "estatisticas": ["data_inicio", "data_fim"],
+}
+
+PASTA_JOBS = "jobs"
+
+
+def validar_parametros(relatorio: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Parâmetros usados pelo relatório; levanta ValueError se o relatório ou algum parâmetro faltar"""
+    if relatorio not in RELATORIOS:
+        raise ValueError(f"Relatório desconhecido: {relatorio}")
+    faltando = [nome for nome in RELATORIOS[relatorio] if parametros.get(nome) is None]
+    if faltando:
+        raise ValueError(f"Parâmetros obrigatórios ausentes: {', '.join(faltando)}")
+    return {nome: parametros[nome] for nome in RELATORIOS[relatorio]}
+
+
+class LimiteJobsExcedido(Exception):
+    """Fila de exportações cheia: o cliente deve tentar novamente mais tarde"""
+
+
+# === PROCESSO DE TRABALHO ===
+_fila_progresso = None
+_SessionJob = None
+
+
+def _inicializar_processo(fila_progresso, database_url: str, sqlite_config: Dict[str, Any]):
+    """Executado uma vez em cada processo do pool: engine e sessão próprios"""
+    global _fila_progresso, _SessionJob
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    _fila_progresso = fila_progresso
+    _SessionJob = sessionmaker(bind=create_engine(database_url, **sqlite_config))
+
+
+class _ProgressoJob:
+    """Repassa o progresso do ExcelExportService ao processo da API"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def iniciar(self, nome_arquivo: str, linhas_estimadas: Optional[int] = None):
+        _fila_progresso.put((self.job_id, "arquivo", (nome_arquivo, linhas_estimadas)))
+
+    def registrar_progresso(self, linhas: int):
+        _fila_progresso.put((self.job_id, "progresso", linhas))
+
+
+def _executar_job(job_id: str, relatorio: str, parametros: Dict[str, Any], formato: str,
+                  pasta: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Gera o relatório no processo de trabalho e retorna o caminho do arquivo e o manifesto das partes"""
+    from services.excel_export import ExcelExportService
+
+    _fila_progresso.put((job_id, "executando", None))
+    db = _SessionJob()
+    try:
+        servico = ExcelExportService(db, export_dir=pasta, progresso=_ProgressoJob(job_id))
+        arquivo = servico.exportar_relatorio(relatorio, parametros, formato)
+        return arquivo, [parte.como_dict() for parte in servico.manifesto]
+    finally:
+        db.close()
+
+
+# === PROCESSO DA API ===
+class JobExportacao:
+    """Estado de um job de exportação"""
+
+    def __init__(self, relatorio: str, parametros: Dict[str, Any], formato: str, pasta: str):
+        self.id = uuid.uuid4().hex
+        self.relatorio = relatorio
+        self.parametros = parametros
+        self.formato = formato
+        self.pasta = pasta
+        self.status = "na_fila"
+        self.erro = None
+        self.arquivo = None
+        self.nome_arquivo = None
+        self.linhas_escritas = 0
+        self.linhas_estimadas = None
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.future = None
+        self.chave_cache = None
+        self.em_cache = False
+        self.partes = None
+
+    @property
+    def finalizado(self) -> bool:
+        return self.status in ("concluido", "erro", "cancelado")
+
+    def como_dict(self) -> Dict[str, Any]:
+        parametros = {
+            chave: valor.isoformat() if isinstance(valor, date) else valor
+            for chave, valor in self.parametros.items()
+        }
+        return {
+            "id": self.id,
+            "relatorio": self.relatorio,
+            "parametros": parametros,
+            "formato": self.formato,
+            "status": self.status,
+            "erro": self.erro,
+            "arquivo": self.nome_arquivo,
+            "linhas_escritas": self.linhas_escritas,
+            "linhas_estimadas": self.linhas_estimadas,
+            "criado_em": self.criado_em,
+            "iniciado_em": self.iniciado_em,
+            "concluido_em": self.concluido_em,
+            "em_cache": self.em_cache,
+            "partes": self.partes,
+        }
+
+
+class GerenciadorExportacoes:
+    """Fila de jobs de exportação executados em processos separados"""
+
+    def __init__(self, export_dir: Optional[str] = None, database_url: Optional[str] = None,
+                 max_processos: Optional[int] = None, max_pendentes: Optional[int] = None,
+                 ttl_horas: Optional[float] = None, cache=None):
+        self.pasta_jobs = os.path.join(str(export_dir or config.EXPORTS_DIR), PASTA_JOBS)
+        self.database_url = database_url or config.DATABASE_URL
+        self.sqlite_config = config.SQLITE_CONFIG if database_url is None else {}
+        self.max_processos = max_processos or config.EXPORT_MAX_JOBS
+        self.max_pendentes = config.EXPORT_MAX_JOBS_PENDENTES if max_pendentes is None else max_pendentes
+        self.ttl_segundos = (config.EXPORT_JOB_TTL_HORAS if ttl_horas is None else ttl_horas) * 3600
+        self.cache = cache
+
+        self.jobs: Dict[str, JobExportacao] = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._fila_progresso = None
+        self._leitor = None
+        self._encerrado = False
+
+    def _iniciar_pool(self):
+        if self._executor is None:
+            self._fila_progresso = multiprocessing.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_processos,
+                initializer=_inicializar_processo,
+                initargs=(self._fila_progresso, self.database_url, self.sqlite_config),
+            )
+            self._leitor = threading.Thread(target=self._ler_progresso, name="exportacoes-progresso", daemon=True)
+            self._leitor.start()
+
+    def _ler_progresso(self):
+        """Aplica as mensagens de progresso enviadas pelos processos de trabalho"""
+        while not self._encerrado:
+            try:
+                job_id, tipo, valor = self._fila_progresso.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            # A última mensagem de progresso pode chegar depois do fim do job
+            if tipo == "executando" and not job.finalizado:
+                job.status = "executando"
+                job.iniciado_em = time.time()
+            elif tipo == "arquivo":
+                job.nome_arquivo, job.linhas_estimadas = valor
+            elif tipo == "progresso":
+                job.linhas_escritas = valor
+
+    def _finalizar(self, job: JobExportacao, future):
+        job.concluido_em = time.time()
+        if future.cancelled():
+            job.status = "cancelado"
+            return
+        erro = future.exception()
+        if erro is not None:
+            job.status = "erro"
+            job.erro = str(erro)
+            return
+        job.arquivo, job.partes = future.result()
+        job.nome_arquivo = os.path.basename(job.arquivo)
+        if self.cache is not None and job.chave_cache:
+            try:
+                job.arquivo = self.cache.adicionar(job.chave_cache, job.arquivo)
+            except OSError:
+                pass
+            self._fixar_no_cache(job)
+        job.status = "concluido"
+
+    def _fixar_no_cache(self, job: JobExportacao):
+        """Arquivo do job no cache não sai pelo LRU enquanto o job pode ser baixado"""
+        if job.arquivo and job.arquivo.startswith(self.cache.pasta):
+            self.cache.fixar(job.arquivo, job.concluido_em + self.ttl_segundos)
+
+    def submeter(self, relatorio: str, parametros: Dict[str, Any], formato: str = "xlsx",
+                 chave_cache: Optional[str] = None) -> JobExportacao:
+        """
+        Enfileira um relatório; levanta ValueError se inválido e LimiteJobsExcedido se a fila estiver cheia.
+        chave_cache: chave do relatório no cache (CacheExportacoes.chave); com acerto o job já nasce concluído.
+        """
+        parametros = validar_parametros(relatorio, parametros)
+
+        self.limpar_expirados()
+        em_cache = self.cache.obter(chave_cache) if self.cache is not None and chave_cache else None
+        if em_cache is not None:
+            job = JobExportacao(relatorio, parametros, formato, pasta=os.path.join(self.pasta_jobs, uuid.uuid4().hex))
+            job.chave_cache = chave_cache
+            job.em_cache = True
+            job.arquivo = em_cache
+            job.nome_arquivo = os.path.basename(em_cache)
+            job.status = "concluido"
+            job.iniciado_em = job.concluido_em = time.time()
+            self._fixar_no_cache(job)
+            with self._lock:
+                self.jobs[job.id] = job
+            return job
+
+        with self._lock:
+            pendentes = sum(1 for job in self.jobs.values() if not job.finalizado)
+            if pendentes >= self.max_processos + self.max_pendentes:
+                raise LimiteJobsExcedido(f"Limite de {pendentes} exportações em andamento atingido")
+
+            self._iniciar_pool()
+            pasta = os.path.join(self.pasta_jobs, uuid.uuid4().hex)
+            job = JobExportacao(relatorio, parametros, formato, pasta)
+            job.chave_cache = chave_cache
+            os.makedirs(pasta, exist_ok=True)
+            self.jobs[job.id] = job
+            job.future = self._executor.submit(_executar_job, job.id, relatorio, parametros, formato, pasta)
+            job.future.add_done_callback(lambda future: self._finalizar(job, future))
+        return job
+
+    def obter(self, job_id: str) -> Optional[JobExportacao]:
+        return self.jobs.get(job_id)
+
+    def listar(self) -> List[JobExportacao]:
+        self.limpar_expirados()
+        return sorted(self.jobs.values(), key=lambda job: job.criado_em, reverse=True)
+
+    def cancelar(self, job_id: str) -> bool:
+        """Cancela um job ainda na fila ou remove um finalizado (arquivos em cache são mantidos)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        if not job.finalizado and not job.future.cancel():
+            return False
+        self._remover(job)
+        return True
+
+    def _remover(self, job: JobExportacao):
+        self.jobs.pop(job.id, None)
+        shutil.rmtree(job.pasta, ignore_errors=True)
+
+    def limpar_expirados(self) -> int:
+        """Remove jobs finalizados há mais de TTL e pastas órfãs (de execuções anteriores)"""
+        limite = time.time() - self.ttl_segundos
+        removidos = 0
+        with self._lock:
+            for job in list(self.jobs.values()):
+                if job.finalizado and job.concluido_em is not None and job.concluido_em < limite:
+                    self._remover(job)
+                    removidos += 1
+
+            pastas_ativas = {job.pasta for job in self.jobs.values()}
+            if os.path.isdir(self.pasta_jobs):
+                for nome in os.listdir(self.pasta_jobs):
+                    pasta = os.path.join(self.pasta_jobs, nome)
+                    if pasta not in pastas_ativas and os.path.getmtime(pasta) < limite:
+                        shutil.rmtree(pasta, ignore_errors=True)
+                        removidos += 1
+        return removidos
+
+    def encerrar(self):
+        """Cancela jobs na fila e aguarda os que estão executando"""
+        self._encerrado = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_gerenciador = None
+_gerenciador_lock = threading.Lock()
+
+
+def obter_gerenciador() -> GerenciadorExportacoes:
+    """Gerenciador de exportações do processo da API, criado no primeiro uso"""
+    global _gerenciador
+    if _gerenciador is None:
+        with _gerenciador_lock:
+            if _gerenciador is None:
+                from services.export_cache import obter_cache
+                _gerenciador = GerenciadorExportacoes(cache=obter_cache())
+    return _gerenciador
+
+
+def encerrar_gerenciador():
+    global _gerenciador
+    if _gerenciador is not None:
+        _gerenciador.encerrar()
+        _gerenciador = None
@@ -0,0 +1,183 @@
+"""
+Exportação em streaming para respostas HTTP
+
+O relatório é gerado em uma thread própria (com sessão própria do banco) e
+escrito em um CanalExportacao: um arquivo somente-escrita, não pesquisável,
+que agrupa os bytes em blocos e os entrega por uma fila limitada ao gerador
+usado pelo StreamingResponse. Nenhum arquivo é gravado em EXPORTS_DIR; a fila
+limitada faz a geração acompanhar o ritmo do cliente. Opcionalmente os bytes
+também são copiados para uma gravação do cache de exportações.
+"""
+import io
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+# Tamanho dos blocos enviados ao cliente
+TAMANHO_BLOCO = 64 * 1024
+
+# Blocos aguardando envio antes de a geração esperar pelo cliente
+BLOCOS_EM_FILA = 16
+
+# Tipos MIME por extensão do arquivo gerado
+TIPOS_MIME = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "zip": "application/zip",
+}
+
+_FIM = object()
+
+
+class ExportacaoCancelada(Exception):
+    """O cliente desconectou antes do fim da exportação"""
+
+
+class CanalExportacao(io.RawIOBase):
+    """Destino de escrita dos writers de exportação, lido em blocos pela resposta HTTP"""
+
+    def __init__(self, tamanho_bloco: int = TAMANHO_BLOCO, blocos_em_fila: int = BLOCOS_EM_FILA, copia=None):
+        super().__init__()
+        self.copia = copia  # GravacaoCache (services.export_cache) ou None
+        self.id = uuid.uuid4().hex
+        self.tamanho_bloco = tamanho_bloco
+        self._fila = queue.Queue(maxsize=blocos_em_fila)
+        self._buffer = bytearray()
+        self._iniciado = threading.Event()
+        self._cancelado = False
+        self.erro = None
+
+        # Progresso
+        self.nome_arquivo = None
+        self.linhas_estimadas = None
+        self.linhas_escritas = 0
+        self.bytes_enviados = 0
+        self.concluido = False
+        self.inicio = time.time()
+
+    # --- lado da geração (thread produtora) ---
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        if self._cancelado:
+            raise ExportacaoCancelada()
+        self._buffer += dados
+        if self.copia is not None:
+            try:
+                self.copia.write(dados)
+            except OSError:
+                self.descartar_copia()
+        if len(self._buffer) >= self.tamanho_bloco:
+            self._enviar(bytes(self._buffer))
+            self._buffer.clear()
+        return len(dados)
+
+    def _enviar(self, item):
+        while True:
+            if self._cancelado:
+                raise ExportacaoCancelada()
+            try:
+                self._fila.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def iniciar(self, nome_arquivo: str, linhas_estimadas: Optional[int] = None):
+        """Chamado antes do primeiro byte: libera o envio dos cabeçalhos da resposta"""
+        self.nome_arquivo = nome_arquivo
+        self.linhas_estimadas = linhas_estimadas
+        self._iniciado.set()
+
+    def registrar_progresso(self, linhas: int):
+        self.linhas_escritas = linhas
+
+    def concluir(self):
+        if self._buffer:
+            self._enviar(bytes(self._buffer))
+            self._buffer.clear()
+        self.concluido = True
+        if self.copia is not None:
+            try:
+                self.copia.concluir(self.nome_arquivo)
+            except OSError:
+                self.descartar_copia()
+        self._enviar(_FIM)
+
+    def descartar_copia(self):
+        if self.copia is not None:
+            self.copia.descartar()
+            self.copia = None
+
+    def falhar(self, erro: Exception):
+        self.erro = erro
+        self.descartar_copia()
+        self._iniciado.set()
+        self._buffer.clear()
+        try:
+            self._enviar(_FIM)
+        except ExportacaoCancelada:
+            pass
+
+    # --- lado da resposta HTTP ---
+
+    def aguardar_inicio(self) -> str:
+        """Bloqueia até a geração começar; repassa o erro se ela falhou antes disso"""
+        self._iniciado.wait()
+        if self.nome_arquivo is None:
+            raise self.erro
+        return self.nome_arquivo
+
+    def blocos(self):
+        """Gerador de blocos para o StreamingResponse; desconexão cancela a geração"""
+        try:
+            while True:
+                bloco = self._fila.get()
+                if bloco is _FIM:
+                    if self.erro is not None:
+                        raise self.erro
+                    return
+                self.bytes_enviados += len(bloco)
+                yield bloco
+        finally:
+            self._cancelado = not self.concluido
+
+    def progresso(self) -> Dict:
+        return {
+            "id": self.id,
+            "arquivo": self.nome_arquivo,
+            "linhas_escritas": self.linhas_escritas,
+            "linhas_estimadas": self.linhas_estimadas,
+            "bytes_enviados": self.bytes_enviados,
+            "concluido": self.concluido,
+            "duracao_segundos": round(time.time() - self.inicio, 2),
+        }
+
+
+def iniciar_exportacao(fabrica_sessao: Callable, gerar: Callable, copia=None) -> CanalExportacao:
+    """
+    Executa gerar(db, canal) em uma thread com sessão própria e retorna o canal.
+    gerar deve chamar canal.iniciar(...) antes de escrever (o ExcelExportService
+    com destino=canal faz isso). copia: gravação do cache que recebe os mesmos bytes.
+    """
+    canal = CanalExportacao(copia=copia)
+
+    def produzir():
+        db = fabrica_sessao()
+        try:
+            gerar(db, canal)
+            canal.concluir()
+        except ExportacaoCancelada:
+            canal.descartar_copia()
+        except Exception as e:
+            canal.falhar(e)
+        finally:
+            db.close()
+
+    threading.Thread(target=produzir, name=f"exportacao-{canal.id[:8]}", daemon=True).start()
+    return canal
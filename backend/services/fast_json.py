@@ -0,0 +1,47 @@
+"""
+Caminho rápido de serialização JSON para as listagens da API
+
+Linhas vindas de SELECTs do SQLAlchemy Core são convertidas direto em JSON,
+sem instanciar objetos ORM nem validar com os modelos Pydantic de resposta.
+Usa orjson quando instalado e a biblioteca padrão como alternativa.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+
+def _converter_padrao(valor: Any) -> str:
+    """Conversão de tipos não suportados pelo json da biblioteca padrão"""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(conteudo: Any) -> bytes:
+    """Serializa para JSON (bytes UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(
+        conteudo, ensure_ascii=False, separators=(",", ":"), default=_converter_padrao
+    ).encode("utf-8")
+
+
+def linhas_como_dicts(resultado) -> List[Dict[str, Any]]:
+    """Converte o resultado de um SELECT do Core em lista de dicts (uma cópia por linha)"""
+    chaves = list(resultado.keys())
+    return [dict(zip(chaves, linha)) for linha in resultado]
+
+
+class FastJSONResponse(Response):
+    """Resposta JSON serializada com orjson (ou json padrão)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,269 @@
+"""
+Manutenção do banco SQLite em segundo plano
+
+O checkpoint automático do SQLite acontece dentro do commit de quem escreve
+e atrasa a requisição do usuário; ANALYZE/optimize e incremental vacuum
+nunca eram executados. O AgendadorManutencao roda em uma thread da API e,
+apenas quando a API está ociosa (nenhuma requisição em andamento há
+MANUTENCAO_OCIOSO_SEGUNDOS), executa:
+
+- wal_checkpoint(PASSIVE) quando o WAL passa de MANUTENCAO_WAL_PASSIVO_MB e
+  wal_checkpoint(TRUNCATE) acima de MANUTENCAO_WAL_TRUNCATE_MB;
+- PRAGMA optimize a cada MANUTENCAO_OPTIMIZE_HORAS;
+- incremental_vacuum quando há mais de MANUTENCAO_VACUUM_PAGINAS_LIVRES
+  páginas livres (bancos com auto_vacuum=INCREMENTAL).
+
+Com o agendador ativo o checkpoint automático das conexões da API é
+espaçado (SQLITE_WAL_AUTOCHECKPOINT páginas), ficando só como limite de
+segurança. Tamanho do WAL, duração dos checkpoints e contadores ficam em
+metricas().
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+import config
+
+MODOS_CHECKPOINT = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+def configurar_autocheckpoint(engine, paginas: int):
+    """Define PRAGMA wal_autocheckpoint em cada nova conexão do engine"""
+    @event.listens_for(engine, "connect")
+    def _autocheckpoint(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f"PRAGMA wal_autocheckpoint = {int(paginas)}")
+        cursor.close()
+
+
+class AgendadorManutencao:
+    """Executa a manutenção do banco nas janelas ociosas da API"""
+
+    def __init__(self, engine, intervalo: Optional[float] = None, ocioso: Optional[float] = None,
+                 wal_passivo_mb: Optional[float] = None, wal_truncate_mb: Optional[float] = None,
+                 optimize_horas: Optional[float] = None, vacuum_paginas_livres: Optional[int] = None,
+                 vacuum_paginas_por_ciclo: Optional[int] = None, monitor=None):
+        self.engine = engine
+        # MonitorConectividade da pasta compartilhada: sem manutenção fora do modo normal
+        self.monitor = monitor
+        self.intervalo = config.MANUTENCAO_INTERVALO_SEGUNDOS if intervalo is None else intervalo
+        self.ocioso = config.MANUTENCAO_OCIOSO_SEGUNDOS if ocioso is None else ocioso
+        self.wal_passivo_bytes = (config.MANUTENCAO_WAL_PASSIVO_MB if wal_passivo_mb is None
+                                  else wal_passivo_mb) * 1024 * 1024
+        self.wal_truncate_bytes = (config.MANUTENCAO_WAL_TRUNCATE_MB if wal_truncate_mb is None
+                                   else wal_truncate_mb) * 1024 * 1024
+        self.optimize_segundos = (config.MANUTENCAO_OPTIMIZE_HORAS if optimize_horas is None
+                                  else optimize_horas) * 3600
+        self.vacuum_paginas_livres = (config.MANUTENCAO_VACUUM_PAGINAS_LIVRES if vacuum_paginas_livres is None
+                                      else vacuum_paginas_livres)
+        self.vacuum_paginas_por_ciclo = (config.MANUTENCAO_VACUUM_PAGINAS_POR_CICLO if vacuum_paginas_por_ciclo is None
+                                         else vacuum_paginas_por_ciclo)
+
+        banco = engine.url.database
+        self.caminho_wal = f"{banco}-wal" if banco and banco != ":memory:" else None
+
+        self._lock = threading.Lock()
+        self._requisicoes_ativas = 0
+        self._ultima_atividade = time.monotonic()
+        self._ultimo_optimize = time.monotonic()
+        self._parar = threading.Event()
+        self._thread = None
+        self._metricas = {
+            "ciclos": 0,
+            "ciclos_adiados": 0,
+            "checkpoints": 0,
+            "checkpoints_ocupados": 0,
+            "optimize": 0,
+            "vacuum_paginas": 0,
+            "erros": 0,
+            "ultimo_erro": None,
+            "ultimo_checkpoint": None,
+            "maior_duracao_checkpoint_ms": 0.0,
+            "maior_wal_bytes": 0,
+            "ultimo_optimize": None,
+            "ultima_execucao": None,
+        }
+
+    # === ATIVIDADE DA API ===
+    def inicio_requisicao(self):
+        with self._lock:
+            self._requisicoes_ativas += 1
+
+    def fim_requisicao(self):
+        with self._lock:
+            self._requisicoes_ativas -= 1
+            self._ultima_atividade = time.monotonic()
+
+    def ocioso_agora(self) -> bool:
+        with self._lock:
+            return (self._requisicoes_ativas == 0
+                    and time.monotonic() - self._ultima_atividade >= self.ocioso)
+
+    # === TAREFAS ===
+    def tamanho_wal(self) -> int:
+        if self.caminho_wal is None:
+            return 0
+        try:
+            return os.path.getsize(self.caminho_wal)
+        except OSError:
+            return 0
+
+    def _conectar(self):
+        # Fora de transação: checkpoint e vacuum não podem rodar dentro de uma
+        return self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def checkpoint(self, modo: str = "PASSIVE") -> Dict[str, Any]:
+        """Executa PRAGMA wal_checkpoint(modo) e registra duração e tamanho do WAL antes/depois"""
+        modo = modo.upper()
+        if modo not in MODOS_CHECKPOINT:
+            raise ValueError(f"Modo de checkpoint inválido: {modo}")
+        wal_antes = self.tamanho_wal()
+        inicio = time.perf_counter()
+        with self._conectar() as conn:
+            ocupado, paginas_log, paginas_copiadas = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({modo})").fetchone()
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        resultado = {
+            "modo": modo,
+            "ocupado": bool(ocupado),
+            "paginas_wal": paginas_log,
+            "paginas_copiadas": paginas_copiadas,
+            "wal_antes_bytes": wal_antes,
+            "wal_depois_bytes": self.tamanho_wal(),
+            "duracao_ms": round(duracao_ms, 2),
+            "em": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            metricas = self._metricas
+            metricas["checkpoints"] += 1
+            metricas["checkpoints_ocupados"] += int(bool(ocupado))
+            metricas["ultimo_checkpoint"] = resultado
+            metricas["maior_duracao_checkpoint_ms"] = max(metricas["maior_duracao_checkpoint_ms"], resultado["duracao_ms"])
+        return resultado
+
+    def otimizar(self):
+        """PRAGMA optimize (ANALYZE só das tabelas que precisam), com limite de linhas analisadas"""
+        with self._conectar() as conn:
+            conn.exec_driver_sql("PRAGMA analysis_limit = 400")
+            conn.exec_driver_sql("PRAGMA optimize")
+        self._ultimo_optimize = time.monotonic()
+        with self._lock:
+            self._metricas["optimize"] += 1
+            self._metricas["ultimo_optimize"] = datetime.now().isoformat(timespec="seconds")
+
+    def vacuum_incremental(self) -> int:
+        """Libera até vacuum_paginas_por_ciclo páginas livres (só em bancos com auto_vacuum=INCREMENTAL)"""
+        with self._conectar() as conn:
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                return 0
+            livres = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if livres < self.vacuum_paginas_livres:
+                return 0
+            # Cada passo do statement libera uma página e execute() dá um único passo;
+            # executescript executa o statement até o fim
+            conn.connection.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_paginas_por_ciclo)});")
+            liberadas = livres - conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        with self._lock:
+            self._metricas["vacuum_paginas"] += liberadas
+        return liberadas
+
+    def executar_ciclo(self, forcar: bool = False) -> Dict[str, Any]:
+        """
+        Um ciclo de manutenção: só roda com a API ociosa (ou forcar=True) e
+        apenas as tarefas cujo limite foi atingido. Retorna o que foi executado.
+        """
+        if not forcar and not self.ocioso_agora():
+            with self._lock:
+                self._metricas["ciclos_adiados"] += 1
+            return {"executado": False, "motivo": "API em uso"}
+        if not forcar and self.monitor is not None and not self.monitor.conectado:
+            with self._lock:
+                self._metricas["ciclos_adiados"] += 1
+            return {"executado": False, "motivo": f"Armazenamento {self.monitor.modo}"}
+
+        executado = {"executado": True}
+        try:
+            wal = self.tamanho_wal()
+            with self._lock:
+                self._metricas["maior_wal_bytes"] = max(self._metricas["maior_wal_bytes"], wal)
+            if wal >= self.wal_truncate_bytes:
+                executado["checkpoint"] = self.checkpoint("TRUNCATE")
+            elif wal >= self.wal_passivo_bytes:
+                executado["checkpoint"] = self.checkpoint("PASSIVE")
+
+            if time.monotonic() - self._ultimo_optimize >= self.optimize_segundos:
+                self.otimizar()
+                executado["optimize"] = True
+
+            liberadas = self.vacuum_incremental()
+            if liberadas:
+                executado["vacuum_paginas"] = liberadas
+        except Exception as e:
+            # Banco ocupado ou pasta compartilhada indisponível: tenta no próximo ciclo
+            with self._lock:
+                self._metricas["erros"] += 1
+                self._metricas["ultimo_erro"] = str(e)
+            executado["erro"] = str(e)
+
+        with self._lock:
+            self._metricas["ciclos"] += 1
+            self._metricas["ultima_execucao"] = datetime.now().isoformat(timespec="seconds")
+        return executado
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["requisicoes_ativas"] = self._requisicoes_ativas
+        metricas["wal_bytes"] = self.tamanho_wal()
+        metricas["limites"] = {
+            "wal_passivo_bytes": int(self.wal_passivo_bytes),
+            "wal_truncate_bytes": int(self.wal_truncate_bytes),
+            "optimize_segundos": int(self.optimize_segundos),
+            "vacuum_paginas_livres": self.vacuum_paginas_livres,
+            "ocioso_segundos": self.ocioso,
+        }
+        return metricas
+
+    # === THREAD ===
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.executar_ciclo()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="manutencao-banco", daemon=True)
+            self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_agendador = None
+
+
+def iniciar_manutencao(engine, monitor=None) -> AgendadorManutencao:
+    """Cria e inicia o agendador de manutenção do processo da API"""
+    global _agendador
+    if _agendador is None:
+        configurar_autocheckpoint(engine, config.SQLITE_WAL_AUTOCHECKPOINT)
+        _agendador = AgendadorManutencao(engine, monitor=monitor)
+        _agendador.iniciar()
+    return _agendador
+
+
+def obter_agendador() -> Optional[AgendadorManutencao]:
+    return _agendador
+
+
+def encerrar_manutencao():
+    global _agendador
+    if _agendador is not None:
+        _agendador.encerrar()
+        _agendador = None
@@ -0,0 +1,282 @@
+"""
+Réplica local de leitura do banco compartilhado
+
+Em modo compartilhado toda leitura de toda estação passava pelo SMB. Cada
+API mantém aqui uma cópia local do banco (REPLICA_CAMINHO) e serve as
+leituras dela; as escritas continuam indo para o banco compartilhado.
+
+- Semente: cópia inicial página a página com a API de backup online (só na
+  primeira vez ou quando o schema do banco compartilhado muda).
+- Atualização incremental: o banco compartilhado é anexado (ATTACH) à
+  réplica e, em uma única transação (um snapshot consistente do WAL), cada
+  tabela com chave inteira recebe só as linhas com id acima da sua marca
+  d'água, o MAX(id) local. As tabelas de domínio são só de inserção (a API
+  não altera nem remove registros) e o SQLite tem um único escritor por vez,
+  então os ids são confirmados em ordem e a marca não pula linhas. Tabelas
+  sem chave inteira (tabela_versao, periodo_versao) são pequenas e copiadas
+  inteiras.
+- Atraso máximo: uma thread atualiza a cada REPLICA_INTERVALO_SEGUNDOS; a
+  leitura que encontrar a réplica com mais de REPLICA_MAX_ATRASO_SEGUNDOS
+  (ou marcada como desatualizada por uma escrita desta API) atualiza antes
+  de ler. Com o armazenamento fora do modo normal a réplica é servida como
+  está, já que o banco compartilhado também não responderia.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import config
+from services.backup import backup_online
+
+
+class ReplicaLocal:
+    """Cópia local do banco compartilhado, atualizada por marca d'água de cada tabela"""
+
+    def __init__(self, primario, caminho=None, intervalo: Optional[float] = None,
+                 max_atraso: Optional[float] = None, monitor=None):
+        self.primario = str(primario)
+        self.caminho = str(caminho or config.REPLICA_CAMINHO)
+        self.intervalo = config.REPLICA_INTERVALO_SEGUNDOS if intervalo is None else intervalo
+        self.max_atraso = config.REPLICA_MAX_ATRASO_SEGUNDOS if max_atraso is None else max_atraso
+        # MonitorConectividade: fora do modo normal a réplica não tenta atualizar na leitura
+        self.monitor = monitor
+
+        self._lock = threading.RLock()
+        self._conn = None
+        self._tabelas = None
+        self._atualizada_em = None
+        self._desatualizada = False
+        self._parar = threading.Event()
+        self._thread = None
+        # Cópia de uma execução anterior já serve leituras (inclusive com a pasta fora do ar)
+        self.pronta = os.path.exists(self.caminho)
+        self.marcas = {}
+        self._metricas = {
+            "atualizacoes": 0,
+            "linhas_copiadas": 0,
+            "sementes": 0,
+            "erros": 0,
+            "ultimo_erro": None,
+            "ultima_duracao_ms": None,
+            "ultima_atualizacao": None,
+        }
+
+        Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{self.caminho}", connect_args={"check_same_thread": False})
+        self.fabrica_sessao = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        @event.listens_for(self.engine, "connect")
+        def _somente_leitura(conexao_dbapi, registro):
+            cursor = conexao_dbapi.cursor()
+            cursor.execute("PRAGMA query_only = ON")
+            cursor.close()
+
+    # === CONEXÃO DE ATUALIZAÇÃO ===
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("ATTACH DATABASE ? AS primario", (self.primario,))
+            self._conn = conn
+        return self._conn
+
+    def _fechar_conexao(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _assinatura(conn: sqlite3.Connection, esquema: str) -> List[Tuple]:
+        return conn.execute(
+            f"SELECT type, name, sql FROM {esquema}.sqlite_master "
+            f"WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+        ).fetchall()
+
+    @staticmethod
+    def _tabelas_da_replica(conn: sqlite3.Connection) -> List[Tuple[str, List[str], Optional[str]]]:
+        """(tabela, colunas, coluna da chave inteira ou None para cópia completa)"""
+        tabelas = []
+        nomes = [linha[0] for linha in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        for nome in nomes:
+            colunas = conn.execute(f'PRAGMA main.table_info("{nome}")').fetchall()
+            chaves = [coluna for coluna in colunas if coluna[5]]
+            chave = chaves[0][1] if len(chaves) == 1 and chaves[0][2].upper() == "INTEGER" else None
+            tabelas.append((nome, [coluna[1] for coluna in colunas], chave))
+        return tabelas
+
+    def _semear(self):
+        """Cópia completa do banco compartilhado (backup online), substituindo a réplica"""
+        self.pronta = False
+        self._fechar_conexao()
+        self.engine.dispose()
+        backup_online(self.primario, self.caminho, pausa=0)
+        for sufixo in ("-wal", "-shm"):
+            try:
+                os.remove(self.caminho + sufixo)
+            except OSError:
+                pass
+        self._tabelas = None
+        with self._lock:
+            self._metricas["sementes"] += 1
+
+    # === ATUALIZAÇÃO ===
+    def atualizar(self) -> Dict[str, int]:
+        """
+        Traz para a réplica as linhas novas de cada tabela. Semeia a réplica se
+        ela não existir ou se o schema do banco compartilhado mudou. Retorna as
+        linhas copiadas por tabela.
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            try:
+                if not os.path.exists(self.caminho):
+                    self._semear()
+                conn = self._conexao()
+                if self._assinatura(conn, "main") != self._assinatura(conn, "primario"):
+                    self._semear()
+                    conn = self._conexao()
+                if self._tabelas is None:
+                    self._tabelas = self._tabelas_da_replica(conn)
+                copiadas = self._copiar_novas(conn)
+            except Exception as e:
+                self._fechar_conexao()
+                self._metricas["erros"] += 1
+                self._metricas["ultimo_erro"] = str(e)
+                raise
+
+            self._atualizada_em = time.monotonic()
+            self._desatualizada = False
+            self.pronta = True
+            self._metricas["atualizacoes"] += 1
+            self._metricas["linhas_copiadas"] += sum(copiadas.values())
+            self._metricas["ultima_duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+            self._metricas["ultima_atualizacao"] = datetime.now().isoformat(timespec="seconds")
+            return copiadas
+
+    def _copiar_novas(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        copiadas = {}
+        conn.execute("BEGIN")
+        try:
+            for tabela, colunas, chave in self._tabelas:
+                lista = ", ".join(f'"{coluna}"' for coluna in colunas)
+                if chave is None:
+                    conn.execute(f'DELETE FROM main."{tabela}"')
+                    cursor = conn.execute(f'INSERT INTO main."{tabela}" ({lista}) SELECT {lista} FROM primario."{tabela}"')
+                    copiadas[tabela] = cursor.rowcount
+                    continue
+
+                marca = conn.execute(f'SELECT COALESCE(MAX("{chave}"), 0) FROM main."{tabela}"').fetchone()[0]
+                maximo = conn.execute(f'SELECT COALESCE(MAX("{chave}"), 0) FROM primario."{tabela}"').fetchone()[0]
+                if maximo < marca:
+                    # Banco compartilhado restaurado de um backup: recomeça a tabela
+                    conn.execute(f'DELETE FROM main."{tabela}"')
+                    marca = 0
+                cursor = conn.execute(
+                    f'INSERT INTO main."{tabela}" ({lista}) SELECT {lista} FROM primario."{tabela}" WHERE "{chave}" > ?',
+                    (marca,)
+                )
+                copiadas[tabela] = cursor.rowcount
+                self.marcas[tabela] = max(marca, maximo)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {tabela: linhas for tabela, linhas in copiadas.items() if linhas}
+
+    def marcar_desatualizada(self):
+        """Escrita feita por esta API: a próxima leitura atualiza antes (lê o que acabou de escrever)"""
+        self._desatualizada = True
+
+    def atraso_segundos(self) -> Optional[float]:
+        if self._atualizada_em is None:
+            return None
+        return time.monotonic() - self._atualizada_em
+
+    def garantir_atualizada(self) -> bool:
+        """
+        True quando a leitura pode ser servida pela réplica, atualizando-a antes
+        se estiver além do atraso máximo. False enquanto a réplica não estiver pronta.
+        """
+        if not self.pronta:
+            return False
+        atraso = self.atraso_segundos()
+        if not self._desatualizada and atraso is not None and atraso <= self.max_atraso:
+            return True
+        if self.monitor is not None and not self.monitor.conectado:
+            return True
+        try:
+            self.atualizar()
+        except Exception as e:
+            print(f"[WARNING] Réplica local não atualizada (servindo a última cópia): {e}")
+        return self.pronta
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            estado = dict(self._metricas)
+            estado["marcas"] = dict(self.marcas)
+        atraso = self.atraso_segundos()
+        estado.update({
+            "pronta": self.pronta,
+            "caminho": self.caminho,
+            "atraso_segundos": None if atraso is None else round(atraso, 2),
+            "max_atraso_segundos": self.max_atraso,
+        })
+        return estado
+
+    # === THREAD ===
+    def _executar(self):
+        while True:
+            if self.monitor is None or self.monitor.conectado:
+                try:
+                    self.atualizar()
+                except Exception as e:
+                    print(f"[WARNING] Erro ao atualizar a réplica local: {e}")
+            if self._parar.wait(self.intervalo):
+                break
+
+    def iniciar(self):
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="replica-local", daemon=True)
+            self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        with self._lock:
+            self._fechar_conexao()
+        self.engine.dispose()
+
+
+_replica = None
+
+
+def iniciar_replica(primario, monitor=None) -> ReplicaLocal:
+    """Cria e inicia a réplica local do processo da API"""
+    global _replica
+    if _replica is None:
+        _replica = ReplicaLocal(primario, monitor=monitor)
+        _replica.iniciar()
+    return _replica
+
+
+def obter_replica() -> Optional[ReplicaLocal]:
+    return _replica
+
+
+def encerrar_replica():
+    global _replica
+    if _replica is not None:
+        _replica.encerrar()
+        _replica = None
@@ -4,41 +4,131 @@ SECRIMPO - Sistema de Armazenamento Compartilhado
 Configuração para pasta compartilhada em rede local
 """
 import os
+import queue
 import sqlite3
-import shutil
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 import json
 
+import config
+from services.backup import (
+    EXTENSAO_COMPLETO, EXTENSAO_INCREMENTAL, CatalogoBackups, aplicar_retencao, backup_completo,
+    backup_incremental, backup_online, extensao_compressao, formatar_progresso, restaurar
+)
+from services.conectividade import MonitorConectividade
+
+# Pastas candidatas à detecção automática
+CAMINHOS_CANDIDATOS = [
+    r"\\servidor\SecrimpoData",  # Windows SMB
+    r"Z:\SecrimpoData",          # Unidade mapeada
+    "/mnt/secrimpo",             # Linux mount
+    "/media/secrimpo",           # Linux media
+    "C:\\SecrimpoShared",        # Local compartilhado
+]
+
+def sondar_caminho(caminho):
+    """Pasta existe e é diretório (pode travar dezenas de segundos em host SMB inacessível)"""
+    return os.path.isdir(caminho)
+
+def detectar_pasta_compartilhada(candidatos, timeout, sondar=sondar_caminho):
+    """
+    Sonda os candidatos em paralelo e retorna o primeiro que responder como
+    acessível, ou None se nenhum responder em até `timeout` segundos.
+    
+    Cada sondagem roda em uma thread daemon própria: uma que travar (host
+    SMB fora do ar) é abandonada no prazo e não segura o encerramento do
+    processo.
+    """
+    respostas = queue.Queue()
+
+    def executar(caminho):
+        try:
+            respostas.put((caminho, sondar(caminho)))
+        except OSError:
+            respostas.put((caminho, False))
+
+    for caminho in candidatos:
+        threading.Thread(target=executar, args=(caminho,), name=f"sondagem {caminho}", daemon=True).start()
+
+    prazo = time.monotonic() + timeout
+    for _ in candidatos:
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            break
+        try:
+            caminho, acessivel = respostas.get(timeout=restante)
+        except queue.Empty:
+            break
+        if acessivel:
+            return caminho
+    return None
+
+def ler_cache_deteccao(arquivo, ttl_segundos):
+    """Pasta detectada anteriormente, se o cache existir e estiver dentro do TTL"""
+    try:
+        with open(arquivo, "r") as f:
+            cache = json.load(f)
+        if time.time() - cache["detectado_em"] <= ttl_segundos:
+            return cache["caminho"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def gravar_cache_deteccao(arquivo, caminho):
+    try:
+        with open(arquivo, "w") as f:
+            json.dump({"caminho": str(caminho), "detectado_em": time.time()}, f, indent=2)
+    except OSError as e:
+        print(f"[WARNING] Não foi possível gravar o cache da detecção: {e}")
+
+def invalidar_cache_deteccao(arquivo=None):
+    """Descarta a pasta em cache (ex.: deixou de responder); a próxima detecção sonda de novo"""
+    try:
+        os.remove(arquivo or config.STORAGE_DETECCAO_CACHE_ARQUIVO)
+    except OSError:
+        pass
+
 class SharedStorageManager:
     """Gerenciador de armazenamento compartilhado"""
     
-    def __init__(self, shared_path=None):
+    def __init__(self, shared_path=None, setup_dirs=True):
         # Configurações padrão
+        self.detectado = not shared_path
         if shared_path:
             self.shared_path = Path(shared_path)
         else:
             self.shared_path = self._detect_shared_path()
         self.local_backup_path = Path("backup")
         self.config_file = "shared_config.json"
+        self.ultimo_backup = None
+        self.monitor = None
         
-        # Criar diretórios necessários
-        self._setup_directories()
+        # Criar diretórios necessários (a API adia isso para a primeira sondagem do monitor)
+        if setup_dirs:
+            self._setup_directories()
     
     def _detect_shared_path(self):
-        """Detecta automaticamente pasta compartilhada"""
-        possible_paths = [
-            r"\\servidor\SecrimpoData",  # Windows SMB
-            r"Z:\SecrimpoData",          # Unidade mapeada
-            "/mnt/secrimpo",             # Linux mount
-            "/media/secrimpo",           # Linux media
-            "C:\\SecrimpoShared",        # Local compartilhado
-        ]
+        """
+        Detecta automaticamente pasta compartilhada
         
-        for path in possible_paths:
-            if os.path.exists(path):
-                print(f"[CHECK] Pasta compartilhada encontrada: {path}")
-                return Path(path)
+        Os candidatos são sondados em paralelo (STORAGE_SONDAGEM_TIMEOUT_SEGUNDOS
+        no total) e a pasta encontrada fica em cache por STORAGE_DETECCAO_CACHE_HORAS,
+        para que reinícios não sondem de novo. A pasta local de fallback não
+        entra no cache: uma pasta de rede que voltar é encontrada no próximo início.
+        """
+        arquivo_cache = config.STORAGE_DETECCAO_CACHE_ARQUIVO
+        caminho = ler_cache_deteccao(arquivo_cache, config.STORAGE_DETECCAO_CACHE_HORAS * 3600)
+        if caminho:
+            print(f"[CHECK] Pasta compartilhada (cache): {caminho}")
+            return Path(caminho)
+        
+        caminho = detectar_pasta_compartilhada(CAMINHOS_CANDIDATOS, config.STORAGE_SONDAGEM_TIMEOUT_SEGUNDOS)
+        if caminho:
+            print(f"[CHECK] Pasta compartilhada encontrada: {caminho}")
+            gravar_cache_deteccao(arquivo_cache, caminho)
+            return Path(caminho)
         
         # Se não encontrar, usar pasta local
         local_shared = Path("shared_data")
@@ -84,8 +174,8 @@ class SharedStorageManager:
             # Se banco local existe e compartilhado não, migrar
             if local_db.exists() and not shared_db.exists():
                 print("[INFO] Migrando banco local para compartilhado...")
-                shutil.copy2(local_db, shared_db)
-                print(f"[CHECK] Banco migrado para: {shared_db}")
+                resultado = backup_online(local_db, shared_db, progresso=formatar_progresso("Migração"))
+                print(f"[CHECK] Banco migrado para: {shared_db} ({resultado['duracao_segundos']}s)")
             
             # Se banco compartilhado não existe, criar novo
             elif not shared_db.exists():
@@ -98,7 +188,7 @@ class SharedStorageManager:
             # Criar backup do banco local
             if local_db.exists():
                 backup_name = f"secrimpo_local_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                shutil.copy2(local_db, self.local_backup_path / backup_name)
+                backup_online(local_db, self.local_backup_path / backup_name)
                 print(f"[CHECK] Backup local criado: {backup_name}")
             
             return str(shared_db)
@@ -111,6 +201,8 @@ class SharedStorageManager:
         """Cria banco de dados vazio com estrutura"""
         conn = sqlite3.connect(str(db_path))
         cursor = conn.cursor()
+        # Antes da primeira tabela: permite liberar páginas livres com incremental_vacuum
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
         
         # Criar tabelas (estrutura do SECRIMPO)
         tables_sql = [
@@ -196,32 +288,107 @@ class SharedStorageManager:
         except Exception as e:
             print(f"[WARNING] Erro ao configurar WAL: {e}")
     
-    def create_backup(self):
-        """Cria backup do banco compartilhado"""
+    def get_backups_path(self):
+        """Retorna caminho da pasta de backups"""
+        return self.shared_path / "backups"
+    
+    def _nome_backup(self, prefixo, extensao):
+        """Nome único na pasta de backups: <prefixo>_<timestamp><extensao>"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_path = self.get_backups_path() / f"{prefixo}_{timestamp}{extensao}"
+        contador = 2
+        while backup_path.exists():
+            backup_path = self.get_backups_path() / f"{prefixo}_{timestamp}_{contador}{extensao}"
+            contador += 1
+        return backup_path
+    
+    def get_backup_catalog(self):
+        """Catálogo dos backups (catalogo.json na pasta de backups)"""
+        return CatalogoBackups(self.get_backups_path())
+    
+    def list_backups(self):
+        """Backups registrados no catálogo, do mais antigo ao mais recente"""
+        return self.get_backup_catalog().entradas()
+    
+    def prune_backups(self):
+        """Remove os backups fora da política de retenção BACKUP_RETENCAO"""
+        removidos = aplicar_retencao(self.get_backup_catalog())
+        if removidos:
+            print(f"[INFO] Retenção: {len(removidos)} backup(s) antigo(s) removido(s)")
+        return removidos
+    
+    def create_backup(self, progresso=None, incremental=False):
+        """
+        Cria backup do banco compartilhado com a API de backup online do SQLite
+        (inclui o conteúdo do WAL e não bloqueia os outros clientes), verificado
+        com quick_check. progresso(paginas_copiadas, total) é opcional; por
+        padrão o percentual é impresso. O resumo da cópia fica em self.ultimo_backup.
+        
+        Com incremental=True grava só as páginas alteradas desde o último backup;
+        sem backup anterior, ou com a cadeia já com BACKUP_MAX_INCREMENTAIS
+        incrementais, faz um backup completo.
+        
+        O arquivo é comprimido conforme BACKUP_COMPRESSAO, registrado no
+        catálogo, e os backups fora da retenção (BACKUP_RETENCAO) são removidos.
+        """
         try:
             shared_db = self.get_database_path()
             if not shared_db.exists():
                 print("[WARNING] Banco compartilhado não existe")
                 return None
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_name = f"secrimpo_backup_{timestamp}.db"
-            backup_path = self.shared_path / "backups" / backup_name
+            progresso = progresso or formatar_progresso("Backup")
+            compressao = extensao_compressao()
+            catalogo = self.get_backup_catalog()
+            anterior = catalogo.ultimo() if incremental else None
+            if anterior is not None and anterior["sequencia"] >= config.BACKUP_MAX_INCREMENTAIS:
+                print("[INFO] Cadeia de incrementais completa, iniciando novo backup completo")
+                anterior = None
             
-            shutil.copy2(shared_db, backup_path)
+            if anterior is not None:
+                backup_path = self._nome_backup("secrimpo_incremental", EXTENSAO_INCREMENTAL + compressao)
+                self.ultimo_backup = backup_incremental(
+                    shared_db, self.get_backups_path() / anterior["arquivo"], backup_path, progresso=progresso
+                )
+                print(f"[CHECK] Backup incremental criado: {backup_path.name} "
+                      f"({self.ultimo_backup['paginas_alteradas']}/{self.ultimo_backup['paginas']} páginas alteradas, "
+                      f"{self.ultimo_backup['paginas_lidas']} lidas no modo {self.ultimo_backup['modo']}, "
+                      f"{self.ultimo_backup['tamanho_bytes'] / 1024:.1f} KB em {self.ultimo_backup['duracao_segundos']}s)")
+            else:
+                backup_path = self._nome_backup("secrimpo_backup", EXTENSAO_COMPLETO + compressao)
+                self.ultimo_backup = backup_completo(shared_db, backup_path, progresso=progresso)
+                print(f"[CHECK] Backup criado: {backup_path.name} "
+                      f"({self.ultimo_backup['tamanho_banco_bytes'] / 1024 / 1024:.1f} MB -> "
+                      f"{self.ultimo_backup['tamanho_bytes'] / 1024 / 1024:.1f} MB em "
+                      f"{self.ultimo_backup['duracao_segundos']}s, quick_check: {self.ultimo_backup['verificacao']})")
             
-            print(f"[CHECK] Backup criado: {backup_name}")
+            catalogo.registrar(self.ultimo_backup)
+            self.prune_backups()
             return str(backup_path)
             
         except Exception as e:
             print(f"[ERROR] Erro ao criar backup: {e}")
             return None
     
+    def restore_backup(self, backup_path, destino):
+        """
+        Restaura um backup (completo ou incremental, reaplicando a cadeia) em
+        `destino`. Não sobrescreve o banco compartilhado em uso: restaure em outro
+        arquivo e substitua o banco com a API parada.
+        """
+        if Path(destino).resolve() == self.get_database_path().resolve():
+            raise ValueError("Restaure em outro arquivo e substitua o banco com a API parada")
+        resultado = restaurar(backup_path, destino)
+        print(f"[CHECK] Backup restaurado em {destino} (cadeia: {' -> '.join(resultado['cadeia'])})")
+        return resultado
+    
     def test_connectivity(self):
         """Testa conectividade com pasta compartilhada"""
         try:
             # Teste 1: Verificar se pasta existe
             if not self.shared_path.exists():
+                if self.detectado:
+                    invalidar_cache_deteccao()
                 return False, "Pasta compartilhada não acessível"
             
             # Teste 2: Verificar permissões de escrita
@@ -243,6 +410,72 @@ class SharedStorageManager:
         except Exception as e:
             return False, f"Erro de conectividade: {e}"
     
+    def verificar_acesso(self, timeout=None):
+        """
+        Verificação só de leitura da pasta compartilhada (stat), com prazo de
+        STORAGE_VERIFICACAO_TIMEOUT_SEGUNDOS: decide o modo na inicialização
+        sem criar arquivos nem abrir o SQLite. Um stat travado (host SMB fora
+        do ar) é abandonado no prazo. Retorna (acessível, mensagem).
+        """
+        timeout = config.STORAGE_VERIFICACAO_TIMEOUT_SEGUNDOS if timeout is None else timeout
+        resultado = {}
+        
+        def verificar():
+            try:
+                resultado["acessivel"] = self.shared_path.is_dir()
+            except OSError as e:
+                resultado["erro"] = str(e)
+        
+        thread = threading.Thread(target=verificar, name="verificacao-armazenamento", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            return False, f"Sem resposta em {timeout}s"
+        if "erro" in resultado:
+            return False, f"Erro de conectividade: {resultado['erro']}"
+        if not resultado["acessivel"]:
+            return False, "Pasta compartilhada não acessível"
+        return True, "Conectividade OK"
+    
+    def medir_latencia(self):
+        """
+        Uma sondagem de conectividade: leitura (abre o banco, ou lista a pasta
+        se ele ainda não existe) e escrita (cria, sincroniza e apaga um arquivo
+        deste processo). Retorna (leitura_ms, escrita_ms); erros propagam.
+        """
+        database_dir = self.shared_path / "database"
+        if not database_dir.exists():
+            self._setup_directories()
+        
+        inicio = time.perf_counter()
+        shared_db = self.get_database_path()
+        if shared_db.exists():
+            conn = sqlite3.connect(str(shared_db), timeout=10)
+            try:
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            finally:
+                conn.close()
+        else:
+            os.listdir(database_dir)
+        leitura_ms = (time.perf_counter() - inicio) * 1000
+        
+        inicio = time.perf_counter()
+        test_file = database_dir / f"sondagem_{os.getpid()}.tmp"
+        with open(test_file, "w") as f:
+            f.write("teste")
+            f.flush()
+            os.fsync(f.fileno())
+        test_file.unlink()
+        escrita_ms = (time.perf_counter() - inicio) * 1000
+        return leitura_ms, escrita_ms
+    
+    def obter_monitor(self):
+        """Monitor de conectividade desta pasta, iniciado no primeiro uso"""
+        if self.monitor is None:
+            self.monitor = MonitorConectividade(self.medir_latencia)
+        self.monitor.iniciar()
+        return self.monitor
+    
     def save_config(self, config_data):
         """Salva configuração do armazenamento compartilhado"""
         config = {
@@ -266,14 +499,21 @@ class SharedStorageManager:
             return {}
     
     def get_status(self):
-        """Retorna status do armazenamento compartilhado"""
+        """
+        Retorna status do armazenamento compartilhado
+        
+        Vem do estado em cache do monitor de conectividade, sem tocar na pasta
+        (que pode estar travada); só a primeira chamada aguarda a primeira sondagem.
+        """
+        estado = self.obter_monitor().aguardar_primeira_sondagem()
         status = {
             "shared_path": str(self.shared_path),
-            "shared_path_exists": self.shared_path.exists(),
             "database_path": str(self.get_database_path()),
-            "database_exists": self.get_database_path().exists(),
             "exports_path": str(self.get_exports_path()),
-            "connectivity": self.test_connectivity(),
+            "connectivity": (estado["conectado"], estado["mensagem"]),
+            "modo": estado["modo"],
+            "latencia": {"leitura": estado["leitura"], "escrita": estado["escrita"]},
+            "ultima_sondagem": estado["ultima_sondagem"],
             "timestamp": datetime.now().isoformat()
         }
         
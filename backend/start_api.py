@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 Script para inicializar a API SECRIMPO
+
+Uso:
+  python start_api.py              # desenvolvimento (127.0.0.1, reload)
+  python start_api.py --servidor   # PC servidor: aceita conexões das estações da rede
 """
+import argparse
 import uvicorn
 import sys
 import os
@@ -9,23 +14,36 @@ import os
 # Adiciona o diretório raiz ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import config
+
 def main():
     """Inicia o servidor FastAPI"""
+    parser = argparse.ArgumentParser(description="Inicia a API SECRIMPO")
+    parser.add_argument("--servidor", action="store_true",
+                        help="Modo servidor: escuta em todas as interfaces, sem reload")
+    args = parser.parse_args()
+
+    host = "0.0.0.0" if args.servidor and config.API_HOST == "127.0.0.1" else config.API_HOST
+    endereco = "IP desta máquina" if host == "0.0.0.0" else host
+
     print("[ROCKET] Iniciando SECRIMPO API...")
-    print("[MAP-MARKER] Servidor rodando em: http://127.0.0.1:8000")
-    print("[BOOK] Documentação em: http://127.0.0.1:8000/docs")
-    print("[WRENCH] Redoc em: http://127.0.0.1:8000/redoc")
+    print(f"[MAP-MARKER] Servidor rodando em: http://{endereco}:{config.API_PORT}")
+    print(f"[BOOK] Documentação em: http://{endereco}:{config.API_PORT}/docs")
+    print(f"[WRENCH] Redoc em: http://{endereco}:{config.API_PORT}/redoc")
     print("\n[BOLT] Pressione Ctrl+C para parar o servidor\n")
     
     try:
-        uvicorn.run(
-            "app:app",
-            host="127.0.0.1",
-            port=8000,
-            reload=True,
-            reload_dirs=["backend", "models", "database"],
-            log_level="info"
-        )
+        if args.servidor:
+            uvicorn.run("app:app", host=host, port=config.API_PORT, log_level="info")
+        else:
+            uvicorn.run(
+                "app:app",
+                host=host,
+                port=config.API_PORT,
+                reload=config.API_RELOAD,
+                reload_dirs=["backend", "models", "database"],
+                log_level="info"
+            )
     except KeyboardInterrupt:
         print("\n[STOP] Servidor parado pelo usuário")
     except Exception as e:
@@ -33,4 +51,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Teste dos backups online (API de backup do SQLite)
+Conteúdo do WAL incluído, escritas concorrentes durante a cópia e quick_check;
+incrementais com só as páginas alteradas (lidas do WAL ou, se ele foi
+reiniciado, de uma leitura do banco) e restauração da cadeia;
+compressão, catálogo e retenção avô-pai-filho
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from services.backup import (
+    CatalogoBackups, backup_completo, backup_incremental, backup_online, cadeia_de, restaurar,
+    selecionar_retencao
+)
+from shared_storage import SharedStorageManager
+
+def criar_banco_wal(caminho, linhas=2000):
+    """Banco em modo WAL com checkpoint automático desligado: os dados ficam no WAL"""
+    conn = sqlite3.connect(str(caminho))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE registro (id INTEGER PRIMARY KEY, texto TEXT)")
+    conn.executemany("INSERT INTO registro (texto) VALUES (?)", [(f"registro {i} " * 10,) for i in range(linhas)])
+    conn.commit()
+    return conn
+
+def contar(caminho):
+    conn = sqlite3.connect(str(caminho))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM registro").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_backup_inclui_wal_e_reporta_progresso():
+    """Linhas ainda no WAL vão para o backup; progresso chega ao total; quick_check ok"""
+    with tempfile.TemporaryDirectory() as pasta:
+        conn = criar_banco_wal(f"{pasta}/origem.db")
+        progresso = []
+        resultado = backup_online(f"{pasta}/origem.db", f"{pasta}/copia.db", paginas_por_passo=10, pausa=0,
+                                  progresso=lambda copiadas, total: progresso.append((copiadas, total)))
+        conn.close()
+        assert contar(f"{pasta}/copia.db") == 2000
+        assert resultado["verificacao"] == "ok" and resultado["passos"] > 1, resultado
+        assert progresso[-1][0] == progresso[-1][1] == resultado["paginas"], progresso[-1]
+        assert not Path(f"{pasta}/copia.db.parcial").exists()
+
+def test_backup_com_escritas_concorrentes():
+    """Outro cliente escrevendo durante a cópia: as escritas seguem e o backup conclui consistente"""
+    with tempfile.TemporaryDirectory() as pasta:
+        criar_banco_wal(f"{pasta}/origem.db").close()
+        parar = threading.Event()
+        escritas = []
+
+        def escrever():
+            conn = sqlite3.connect(f"{pasta}/origem.db", timeout=5)
+            while not parar.is_set():
+                conn.execute("INSERT INTO registro (texto) VALUES ('concorrente')")
+                conn.commit()
+                escritas.append(1)
+            conn.close()
+
+        escritor = threading.Thread(target=escrever)
+        escritor.start()
+        try:
+            resultado = backup_online(f"{pasta}/origem.db", f"{pasta}/copia.db", paginas_por_passo=5,
+                                      pausa=0.005, max_reinicios=2)
+        finally:
+            parar.set()
+            escritor.join()
+        assert escritas, "escritor bloqueado durante o backup"
+        assert resultado["verificacao"] == "ok", resultado
+        assert 2000 <= contar(f"{pasta}/copia.db") <= 2000 + len(escritas)
+
+def test_create_backup_do_gerenciador():
+    """SharedStorageManager.create_backup: backup comprimido, registrado no catálogo e restaurável"""
+    with tempfile.TemporaryDirectory() as pasta:
+        storage = SharedStorageManager(pasta)
+        criar_banco_wal(storage.get_database_path(), linhas=2000).close()
+        caminho = storage.create_backup(progresso=lambda copiadas, total: None)
+        assert caminho is not None and caminho.endswith((".db.gz", ".db.zst")), caminho
+        assert storage.ultimo_backup["tamanho_bytes"] < storage.ultimo_backup["tamanho_banco_bytes"] / 2
+        assert [entrada["arquivo"] for entrada in storage.list_backups()] == [Path(caminho).name]
+        storage.restore_backup(caminho, f"{pasta}/restaurado.db")
+        assert contar(f"{pasta}/restaurado.db") == 2000
+
+def conteudo(caminho):
+    conn = sqlite3.connect(str(caminho))
+    try:
+        return conn.execute("SELECT id, texto FROM registro ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def test_incrementais_e_restauracao_da_cadeia():
+    """Incrementais gravam só as páginas alteradas; restaurar reconstrói cada ponto da cadeia"""
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = f"{pasta}/origem.db"
+        conn = criar_banco_wal(origem, linhas=5000)
+        completo = backup_completo(origem, f"{pasta}/base.db", pausa=0)
+
+        conn.execute("UPDATE registro SET texto = 'alterado' WHERE id = 10")
+        conn.commit()
+        estado_1 = conteudo(origem)
+        inc_1 = backup_incremental(origem, f"{pasta}/base.db", f"{pasta}/inc1.inc", pausa=0)
+
+        conn.executemany("INSERT INTO registro (texto) VALUES (?)", [("novo",)] * 50)
+        conn.execute("DELETE FROM registro WHERE id <= 100")
+        conn.commit()
+        estado_2 = conteudo(origem)
+        inc_2 = backup_incremental(origem, f"{pasta}/inc1.inc", f"{pasta}/inc2.inc", pausa=0)
+        conn.close()
+
+        assert inc_1["paginas_alteradas"] <= 3, inc_1
+        # Só os frames novos do WAL são lidos, não o banco inteiro
+        assert inc_1["modo"] == "wal" and inc_1["paginas_lidas"] <= 3, inc_1
+        assert inc_2["modo"] == "wal" and inc_2["paginas_lidas"] < inc_2["paginas"] / 4, inc_2
+        assert inc_1["tamanho_bytes"] < completo["tamanho_bytes"] / 20, (inc_1["tamanho_bytes"], completo["tamanho_bytes"])
+        assert (inc_2["base"], inc_2["anterior"], inc_2["sequencia"]) == ("base.db", "inc1.inc", 2)
+        assert [Path(c).name for c in cadeia_de(f"{pasta}/inc2.inc")] == ["base.db", "inc1.inc", "inc2.inc"]
+
+        assert restaurar(f"{pasta}/inc1.inc", f"{pasta}/r1.db")["verificacao"] == "ok"
+        assert conteudo(f"{pasta}/r1.db") == estado_1
+        restaurar(f"{pasta}/inc2.inc", f"{pasta}/r2.db")
+        assert conteudo(f"{pasta}/r2.db") == estado_2
+
+def test_incremental_apos_reinicio_do_wal():
+    """WAL reiniciado por checkpoint: varredura do banco; WAL reiniciado a cada tentativa: cópia"""
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = f"{pasta}/origem.db"
+        conn = criar_banco_wal(origem, linhas=3000)
+        backup_completo(origem, f"{pasta}/base.db", pausa=0)
+
+        conn.execute("UPDATE registro SET texto = 'antes do checkpoint' WHERE id = 5")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("UPDATE registro SET texto = 'depois do checkpoint' WHERE id = 2500")
+        conn.commit()
+        estado_1 = conteudo(origem)
+        inc_1 = backup_incremental(origem, f"{pasta}/base.db", f"{pasta}/inc1.inc", pausa=0)
+        assert inc_1["modo"] == "varredura" and inc_1["paginas_lidas"] == inc_1["paginas"], inc_1
+        assert 2 <= inc_1["paginas_alteradas"] <= 4, inc_1
+
+        conn.execute("INSERT INTO registro (texto) VALUES ('novo')")
+        conn.commit()
+        estado_2 = conteudo(origem)
+        inc_2 = backup_incremental(origem, f"{pasta}/inc1.inc", f"{pasta}/inc2.inc", tentativas=0, pausa=0)
+        conn.close()
+        assert inc_2["modo"] == "copia" and 1 <= inc_2["paginas_alteradas"] <= 3, inc_2
+
+        restaurar(f"{pasta}/inc1.inc", f"{pasta}/r1.db")
+        assert conteudo(f"{pasta}/r1.db") == estado_1
+        restaurar(f"{pasta}/inc2.inc", f"{pasta}/r2.db")
+        assert conteudo(f"{pasta}/r2.db") == estado_2
+
+def test_create_backup_incremental_do_gerenciador():
+    """create_backup(incremental=True): completo na primeira vez, depois incremental sobre ele"""
+    with tempfile.TemporaryDirectory() as pasta:
+        storage = SharedStorageManager(pasta)
+        criar_banco_wal(storage.get_database_path(), linhas=100).close()
+        silencioso = lambda copiadas, total: None
+        primeiro = storage.create_backup(progresso=silencioso, incremental=True)
+        segundo = storage.create_backup(progresso=silencioso, incremental=True)
+        assert ".db." in Path(primeiro).name and ".inc." in Path(segundo).name, (primeiro, segundo)
+        storage.restore_backup(segundo, f"{pasta}/restaurado.db")
+        assert contar(f"{pasta}/restaurado.db") == 100
+
+def test_incremental_comprimido():
+    """Cadeia com completo e incremental em gzip restaura o mesmo conteúdo"""
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = f"{pasta}/origem.db"
+        conn = criar_banco_wal(origem)
+        backup_completo(origem, f"{pasta}/base.db.gz", pausa=0)
+        conn.execute("UPDATE registro SET texto = 'alterado' WHERE id < 50")
+        conn.commit()
+        backup_incremental(origem, f"{pasta}/base.db.gz", f"{pasta}/inc1.inc.gz", pausa=0)
+        esperado = conteudo(origem)
+        conn.close()
+        restaurar(f"{pasta}/inc1.inc.gz", f"{pasta}/restaurado.db")
+        assert conteudo(f"{pasta}/restaurado.db") == esperado
+
+def entradas_diarias(dias, agora=datetime(2025, 6, 30, 2, 0)):
+    """Um backup completo por dia (do mais antigo ao mais recente), sem incrementais"""
+    return [
+        {"arquivo": f"b{i:03d}.db.gz", "anterior": None,
+         "criado_em": (agora - timedelta(days=dias - 1 - i)).isoformat()}
+        for i in range(dias)
+    ]
+
+def test_retencao_avo_pai_filho():
+    """7 diários + 4 semanais + 3 mensais de 180 dias de backups; incremental mantém sua cadeia"""
+    entradas = entradas_diarias(180)
+    manter = selecionar_retencao(entradas, diarios=7, semanais=4, mensais=3)
+    datas = sorted(datetime.fromisoformat(e["criado_em"]).date() for e in entradas if e["arquivo"] in manter)
+    assert datas[-7:] == [datetime(2025, 6, d).date() for d in range(24, 31)], datas
+    assert datetime(2025, 5, 31).date() in datas and datetime(2025, 4, 30).date() in datas
+    assert len(manter) <= 7 + 4 + 3, len(manter)
+
+    cadeia = [
+        {"arquivo": "base.db.gz", "anterior": None, "criado_em": "2025-06-01T02:00:00"},
+        {"arquivo": "inc1.inc.gz", "anterior": "base.db.gz", "criado_em": "2025-06-02T02:00:00"},
+        {"arquivo": "inc2.inc.gz", "anterior": "inc1.inc.gz", "criado_em": "2025-06-03T02:00:00"},
+    ]
+    assert selecionar_retencao(cadeia, diarios=1, semanais=0, mensais=0) == {"base.db.gz", "inc1.inc.gz", "inc2.inc.gz"}
+
+def test_catalogo_e_poda():
+    """Catálogo reconstruído a partir da pasta; poda remove arquivos e .paginas"""
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = f"{pasta}/origem.db"
+        criar_banco_wal(origem, linhas=10).close()
+        os.makedirs(f"{pasta}/backups")
+        for nome in ("antigo.db.gz", "novo.db.gz"):
+            backup_completo(origem, f"{pasta}/backups/{nome}", pausa=0)
+        os.utime(f"{pasta}/backups/antigo.db.gz", (0, 0))
+
+        catalogo = CatalogoBackups(f"{pasta}/backups")
+        assert [e["arquivo"] for e in catalogo.entradas()] == ["antigo.db.gz", "novo.db.gz"]
+        assert os.path.exists(catalogo.caminho)
+        catalogo.remover(["antigo.db.gz"])
+        assert sorted(os.listdir(f"{pasta}/backups")) == ["catalogo.json", "novo.db.gz", "novo.db.gz.paginas"]
+        assert catalogo.ultimo()["arquivo"] == "novo.db.gz"
+
+if __name__ == "__main__":
+    print("🔍 Verificando backups online...")
+    testes = [
+        test_backup_inclui_wal_e_reporta_progresso,
+        test_backup_com_escritas_concorrentes,
+        test_create_backup_do_gerenciador,
+        test_incrementais_e_restauracao_da_cadeia,
+        test_incremental_apos_reinicio_do_wal,
+        test_create_backup_incremental_do_gerenciador,
+        test_incremental_comprimido,
+        test_retencao_avo_pai_filho,
+        test_catalogo_e_poda,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
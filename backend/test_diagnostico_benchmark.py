@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Teste do benchmark de concorrência do diagnóstico
+Mistura de leituras, inserções e lotes de sincronização em threads, sobre uma
+cópia do banco (o banco medido não é alterado)
+"""
+
+import json
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine
+
+import app as api
+from diagnostico_compartilhado import benchmark_concorrencia, parse_mistura
+
+def criar_banco(pasta):
+    caminho = f"{pasta}/secrimpo.db"
+    engine = create_engine(f"sqlite:///{caminho}")
+    api.preparar_schema(engine)
+    engine.dispose()
+    return caminho
+
+def contar(caminho, tabela):
+    conn = sqlite3.connect(caminho)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_benchmark_mistura_em_threads():
+    """Todas as operações concluídas, percentis por operação, WAL medido e JSON serializável"""
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = criar_banco(pasta)
+        resultado = benchmark_concorrencia(caminho, clientes=3, operacoes=40, lote=5, timeout=30,
+                                           mistura={"leitura": 0.5, "insercao": 0.3, "sincronizacao": 0.2})
+        operacoes = resultado["operacoes"]
+        assert resultado["operacoes_concluidas"] == 120 and resultado["taxa_busy"] == 0.0, resultado
+        assert sum(operacao["amostras"] for operacao in operacoes.values()) == 120
+        assert operacoes["leitura"]["p50_ms"] <= operacoes["leitura"]["p99_ms"]
+        assert resultado["linhas_inseridas"] == operacoes["insercao"]["amostras"] * 2 + \
+            operacoes["sincronizacao"]["amostras"] * 10
+        assert resultado["wal"]["maximo_bytes"] > 0
+        json.dumps(resultado)
+
+        assert contar(caminho, "ocorrencia") == 0 and contar(caminho, "policial") == 0
+
+def test_mistura():
+    """Mistura lida da linha de comando; operação desconhecida é recusada"""
+    assert parse_mistura("leitura=0.8, insercao=0.2") == {"leitura": 0.8, "insercao": 0.2}
+    with tempfile.TemporaryDirectory() as pasta:
+        try:
+            benchmark_concorrencia(criar_banco(pasta), mistura={"exclusao": 1.0})
+            assert False, "operação desconhecida deveria ser recusada"
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    print("🔍 Verificando benchmark de concorrência do diagnóstico...")
+    testes = [
+        test_benchmark_mistura_em_threads,
+        test_mistura,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Teste do diário local de escritas (pasta compartilhada fora do ar)
+Ids provisórios remapeados na reprodução em lotes, deduplicação ao reproduzir
+de novo e escrita inválida isolada sem bloquear as demais
+"""
+
+import tempfile
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app as api
+from services.diario_escritas import DiarioEscritas
+
+def criar_central(pasta):
+    engine = create_engine(f"sqlite:///{pasta}/central.db")
+    api.preparar_schema(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def policial(matricula):
+    return {"nome": f"Policial {matricula}", "matricula": matricula, "graduacao": "Soldado", "unidade": "1º BPM"}
+
+def ocorrencia(numero, policial_id, data_apreensao=date(2025, 3, 10)):
+    return {"numero_genesis": numero, "unidade_fato": "1º BPM", "data_apreensao": data_apreensao,
+            "lei_infringida": "11.343/06", "artigo": "33", "policial_condutor_id": policial_id}
+
+def item(ocorrencia_id, proprietario_id, policial_id):
+    return {"especie": "Entorpecente", "item": "Maconha", "quantidade": 1, "descricao_detalhada": "Porção",
+            "ocorrencia_id": ocorrencia_id, "proprietario_id": proprietario_id, "policial_id": policial_id}
+
+def test_reproducao_remapeia_ids_provisorios():
+    """Item de ocorrência criada offline: ids provisórios trocados pelos definitivos entre lotes"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine, fabrica = criar_central(pasta)
+        diario = DiarioEscritas(f"{pasta}/diario.db", tamanho_lote=2)
+        id_policial = diario.registrar("policial", policial("1001"))
+        id_proprietario = diario.registrar("proprietario", {"nome": "Fulano", "documento": "123"})
+        id_ocorrencia = diario.registrar("ocorrencia", ocorrencia("G-1", id_policial))
+        id_item = diario.registrar("item_apreendido", item(id_ocorrencia, id_proprietario, id_policial))
+        assert [id_policial, id_proprietario, id_ocorrencia, id_item] == [-1, -2, -3, -4]
+
+        assert diario.reproduzir(fabrica, api.aplicar_escrita_diario) == {"reproduzidas": 4, "lotes": 2, "erros": 0}
+        assert not diario.tem_pendentes()
+        with fabrica() as db:
+            registro = db.query(api.ItemApreendido).one()
+            assert registro.id == diario.id_central(id_item)
+            assert registro.ocorrencia_id == diario.id_central(id_ocorrencia)
+            assert registro.proprietario_id == diario.id_central(id_proprietario)
+            assert db.get(api.Ocorrencia, registro.ocorrencia_id).policial_condutor_id == diario.id_central(id_policial)
+        assert diario.resolver("ocorrencia", ocorrencia("G-2", id_policial))["policial_condutor_id"] > 0
+        diario.fechar()
+        engine.dispose()
+
+def test_reproduzir_de_novo_nao_duplica():
+    """Lote confirmado mas não marcado no diário é reproduzido sem duplicar; matrícula existente é reaproveitada"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine, fabrica = criar_central(pasta)
+        with fabrica() as db:
+            db.add(api.Policial(**policial("2002")))
+            db.commit()
+        diario = DiarioEscritas(f"{pasta}/diario.db")
+        id_policial = diario.registrar("policial", policial("2002"))
+        diario.registrar("ocorrencia", ocorrencia("G-3", id_policial))
+        diario.reproduzir(fabrica, api.aplicar_escrita_diario)
+        assert diario.id_central(id_policial) == 1
+
+        # Queda entre o commit no banco compartilhado e a marcação no diário
+        diario._conn.execute("UPDATE escrita SET id_central = NULL, reproduzido_em = NULL")
+        assert diario.reproduzir(fabrica, api.aplicar_escrita_diario)["reproduzidas"] == 2
+        with fabrica() as db:
+            assert db.query(api.Policial).count() == 1 and db.query(api.Ocorrencia).count() == 1
+        diario.fechar()
+        engine.dispose()
+
+def test_escrita_invalida_isolada():
+    """Escrita inválida fica com erro, as que dependem dela também; as demais são reproduzidas"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine, fabrica = criar_central(pasta)
+        diario = DiarioEscritas(f"{pasta}/diario.db")
+        id_policial = diario.registrar("policial", policial("3003"))
+        id_ocorrencia = diario.registrar("ocorrencia", ocorrencia("G-4", id_policial, "data inválida"))
+        id_proprietario = diario.registrar("proprietario", {"nome": "Beltrano", "documento": "456"})
+        diario.registrar("item_apreendido", item(id_ocorrencia, id_proprietario, id_policial))
+
+        assert diario.reproduzir(fabrica, api.aplicar_escrita_diario) == {"reproduzidas": 2, "lotes": 1, "erros": 2}
+        estado = diario.estado()
+        assert estado["pendentes"] == 0 and estado["reproduzidas"] == 2 and estado["com_erro"] == 2, estado
+        assert [erro["id_provisorio"] for erro in estado["erros"]] == [-4, id_ocorrencia]
+        assert "não foi reproduzido" in estado["erros"][0]["erro"]
+        with fabrica() as db:
+            assert db.query(api.Policial).count() == 1 and db.query(api.Ocorrencia).count() == 0
+        diario.fechar()
+        engine.dispose()
+
+def test_referencia_inexistente_nao_gera_orfao():
+    """Referência a registro que não existe no banco compartilhado fica com erro, como no POST online"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine, fabrica = criar_central(pasta)
+        diario = DiarioEscritas(f"{pasta}/diario.db")
+        id_ocorrencia = diario.registrar("ocorrencia", ocorrencia("G-5", 12345))
+        id_proprietario = diario.registrar("proprietario", {"nome": "Ciclano", "documento": "789"})
+        diario.registrar("item_apreendido", item(id_ocorrencia, id_proprietario, 12345))
+
+        assert diario.reproduzir(fabrica, api.aplicar_escrita_diario) == {"reproduzidas": 1, "lotes": 1, "erros": 2}
+        erros = diario.estado()["erros"]
+        assert "Policial condutor não encontrado: policial_condutor_id=12345" in erros[1]["erro"], erros
+        with fabrica() as db:
+            assert db.query(api.Ocorrencia).count() == 0 and db.query(api.ItemApreendido).count() == 0
+            assert db.query(api.Proprietario).count() == 1
+        diario.fechar()
+        engine.dispose()
+
+def test_leitura_offline_sem_replica_retorna_503():
+    """Pasta fora do ar sem réplica pronta: leitura falha com 503 em vez de abrir outro banco"""
+    originais = api.obter_engine, api.armazenamento_disponivel, api.obter_replica
+    api.obter_engine, api.armazenamento_disponivel, api.obter_replica = (lambda: None), (lambda: False), (lambda: None)
+    try:
+        api.get_fabrica_sessao()
+        assert False, "leitura offline sem réplica deveria falhar"
+    except HTTPException as e:
+        assert e.status_code == 503
+    finally:
+        api.obter_engine, api.armazenamento_disponivel, api.obter_replica = originais
+
+if __name__ == "__main__":
+    print("🔍 Verificando diário local de escritas...")
+    testes = [
+        test_reproducao_remapeia_ids_provisorios,
+        test_reproduzir_de_novo_nao_duplica,
+        test_escrita_invalida_isolada,
+        test_referencia_inexistente_nao_gera_orfao,
+        test_leitura_offline_sem_replica_retorna_503,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Teste do cache de exportações
+Acerto quando os dados do período não mudaram, nova geração após edição no
+período (ou em cadastros), e remoção LRU ao exceder o limite de arquivos
+"""
+
+import os
+import tempfile
+import time
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app as api
+from services.export_cache import CacheExportacoes
+from services.export_jobs import GerenciadorExportacoes
+from test_export_queries import com_api, criar_banco
+
+def resumo(client, mes):
+    resposta = client.get("/exportar/resumo-mensal", params={"ano": 2025, "mes": mes})
+    assert resposta.status_code == 200, resposta.text
+    return resposta.headers["x-export-cache"], resposta.content
+
+def test_acerto_no_segundo_pedido():
+    """Mesmo relatório duas vezes: MISS e depois HIT com o mesmo conteúdo"""
+    def verificar(client, fabrica, cache):
+        primeiro = resumo(client, 1)
+        segundo = resumo(client, 1)
+        assert (primeiro[0], segundo[0]) == ("MISS", "HIT")
+        assert primeiro[1] == segundo[1]
+    com_api(verificar, total_ocorrencias=90)
+
+def test_edicao_invalida_apenas_o_periodo():
+    """Nova ocorrência em fevereiro invalida fevereiro, não janeiro; edição de policial invalida tudo"""
+    def verificar(client, fabrica, cache):
+        resumo(client, 1)
+        resumo(client, 2)
+        with fabrica() as db:
+            db.add(api.Ocorrencia(numero_genesis="NOVA", unidade_fato="8ª CPR", data_apreensao=date(2025, 2, 10),
+                                  lei_infringida="Lei 11.343/06", artigo="Art. 33", policial_condutor_id=1))
+            db.commit()
+        assert resumo(client, 1)[0] == "HIT"
+        assert resumo(client, 2)[0] == "MISS"
+
+        with fabrica() as db:
+            db.scalar(select(api.Policial).where(api.Policial.id == 1)).nome = "Policial Renomeado"
+            db.commit()
+        assert resumo(client, 1)[0] == "MISS"
+    com_api(verificar, total_ocorrencias=90)
+
+def test_remocao_lru():
+    """Limite de 1 arquivo: o menos usado sai do cache"""
+    def verificar(client, fabrica, cache):
+        resumo(client, 1)
+        resumo(client, 2)
+        assert cache.estatisticas()["arquivos"] == 1
+        assert resumo(client, 2)[0] == "HIT"
+        assert resumo(client, 1)[0] == "MISS"
+    com_api(verificar, total_ocorrencias=90, max_arquivos=1)
+
+def test_copia_maior_que_o_cache_nao_entra():
+    """Cópia em streaming acima de max_bytes: interrompida, não publicada e sem remover as entradas existentes"""
+    with tempfile.TemporaryDirectory() as pasta:
+        cache = CacheExportacoes(pasta=f"{pasta}/cache", max_mb=1 / 1024)
+        for i in range(3):
+            with open(f"{pasta}/pequeno{i}.csv", "wb") as arquivo:
+                arquivo.write(b"x" * 100)
+            cache.adicionar(f"pequeno{i}", f"{pasta}/pequeno{i}.csv")
+
+        gravacao = cache.gravar("grande")
+        for _ in range(3):
+            gravacao.write(b"y" * 600)
+        assert gravacao.concluir("grande.csv") is None
+        assert cache.obter("grande") is None
+        assert cache.estatisticas()["arquivos"] == 3
+        assert not [nome for nome in os.listdir(cache.pasta) if nome.startswith(".tmp-")]
+
+def test_job_em_cache_conclui_na_hora():
+    """Jobs: arquivo vai para o cache ao final; o mesmo pedido depois já nasce concluído"""
+    with tempfile.TemporaryDirectory() as pasta:
+        criar_banco(pasta, total_ocorrencias=40).dispose()
+        cache = CacheExportacoes(pasta=f"{pasta}/cache")
+        gerenciador = GerenciadorExportacoes(export_dir=pasta, database_url=f"sqlite:///{pasta}/export.db",
+                                             max_processos=1, cache=cache)
+        try:
+            parametros = {"data_inicio": date(2025, 1, 1), "data_fim": date(2025, 1, 31)}
+            chave = cache.chave("estatisticas", parametros, "xlsx", "v1")
+            job = gerenciador.submeter("estatisticas", parametros, chave_cache=chave)
+            fim = time.time() + 30
+            while not job.finalizado and time.time() < fim:
+                time.sleep(0.05)
+            assert job.arquivo.startswith(cache.pasta), job.arquivo
+
+            repetido = gerenciador.submeter("estatisticas", parametros, chave_cache=chave)
+            assert repetido.status == "concluido" and repetido.em_cache and repetido.arquivo == job.arquivo
+        finally:
+            gerenciador.encerrar()
+
+def test_job_fixa_arquivo_no_cache():
+    """Arquivo de job concluído não sai pelo LRU; com o cache limpo o download responde 410"""
+    with tempfile.TemporaryDirectory() as pasta:
+        criar_banco(pasta, total_ocorrencias=40).dispose()
+        cache = CacheExportacoes(pasta=f"{pasta}/cache", max_arquivos=1)
+        gerenciador = GerenciadorExportacoes(export_dir=pasta, database_url=f"sqlite:///{pasta}/export.db",
+                                             max_processos=1, cache=cache)
+        api.app.dependency_overrides[api.get_gerenciador_exportacoes] = lambda: gerenciador
+        try:
+            parametros = {"data_inicio": date(2025, 1, 1), "data_fim": date(2025, 1, 31)}
+            job = gerenciador.submeter("estatisticas", parametros, chave_cache=cache.chave("estatisticas", parametros,
+                                                                                           "xlsx", "v1"))
+            fim = time.time() + 30
+            while not job.finalizado and time.time() < fim:
+                time.sleep(0.05)
+            assert job.status == "concluido", job.erro
+
+            with open(f"{pasta}/outro.csv", "w") as arquivo:
+                arquivo.write("outro relatório")
+            cache.adicionar("outra-chave", f"{pasta}/outro.csv")
+            client = TestClient(api.app)
+            resposta = client.get(f"/exportar/jobs/{job.id}/arquivo")
+            assert resposta.status_code == 200 and resposta.content[:2] == b"PK", resposta.status_code
+
+            cache.limpar()
+            resposta = client.get(f"/exportar/jobs/{job.id}/arquivo")
+            assert resposta.status_code == 410, resposta.text
+            assert "solicite a exportação novamente" in resposta.json()["detail"]
+        finally:
+            api.app.dependency_overrides.clear()
+            gerenciador.encerrar()
+
+if __name__ == "__main__":
+    print("🔍 Verificando cache de exportações...")
+    testes = [
+        test_acerto_no_segundo_pedido,
+        test_edicao_invalida_apenas_o_periodo,
+        test_remocao_lru,
+        test_copia_maior_que_o_cache_nao_entra,
+        test_job_em_cache_conclui_na_hora,
+        test_job_fixa_arquivo_no_cache,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
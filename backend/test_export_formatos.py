@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Teste dos formatos de exportação (XLSX, CSV, JSONL e ZIP por aba)
+Todos os formatos devem conter as mesmas linhas geradas pelo mesmo produtor
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy.orm import Session
+
+from services.excel_export import ExcelExportService
+from services.export_engine import (
+    LINHAS_AMOSTRA_LARGURA, Aba, LarguraColunas, XlsxStreamWriter, criar_writer, exportar, formatos_disponiveis
+)
+from test_export_queries import criar_banco
+
+COLUNAS = ["Nome", "Quantidade"]
+LINHAS = [("Pistola", 1), ("Maconha, porção", 3), ("Sem quantidade", None)]
+
+def test_csv_mesmas_linhas():
+    """CSV: cabeçalho + linhas, com aspas quando necessário"""
+    destino = io.BytesIO()
+    exportar(criar_writer("csv", destino), [Aba("Itens", COLUNAS, LINHAS)])
+    linhas = list(csv.reader(io.StringIO(destino.getvalue().decode("utf-8"))))
+    assert linhas == [COLUNAS, ["Pistola", "1"], ["Maconha, porção", "3"], ["Sem quantidade", ""]], linhas
+
+def test_jsonl_mesmas_linhas():
+    """JSONL: um objeto por linha com as colunas como chaves"""
+    destino = io.BytesIO()
+    exportar(criar_writer("jsonl", destino), [Aba("Itens", COLUNAS, LINHAS)])
+    objetos = [json.loads(linha) for linha in destino.getvalue().splitlines()]
+    assert objetos == [dict(zip(COLUNAS, linha)) for linha in LINHAS], objetos
+
+def test_varias_abas_geram_zip():
+    """Formatos sem abas: relatório com várias abas vira um ZIP com um arquivo por aba"""
+    destino = io.BytesIO()
+    exportar(criar_writer("csv", destino, multiplas_abas=True), [
+        Aba("Por Lei", COLUNAS, LINHAS),
+        Aba("Por Unidade", COLUNAS, LINHAS[:1]),
+    ])
+    with zipfile.ZipFile(destino) as arquivo:
+        assert arquivo.namelist() == ["Por_Lei.csv", "Por_Unidade.csv"], arquivo.namelist()
+        assert arquivo.read("Por_Unidade.csv").decode("utf-8").splitlines() == ["Nome,Quantidade", "Pistola,1"]
+
+def test_largura_colunas():
+    """Larguras: maior valor + margem, no mínimo o cabeçalho, limitadas a largura_maxima; None ignorado"""
+    larguras = LarguraColunas(["Nome", "Quantidade", "Obs"], largura_maxima=20)
+    larguras.observar(("Pistola", 1, None))
+    larguras.observar(("Maconha", None, None))
+    assert larguras.larguras() == [9, 12, 5], larguras.larguras()
+    larguras.observar(("X" * 100, 12345678901234567890, "curta"))
+    assert larguras.larguras() == [20, 20, 7], larguras.larguras()
+
+def test_larguras_so_da_amostra():
+    """XLSX: larguras calculadas só com as primeiras LINHAS_AMOSTRA_LARGURA linhas da aba"""
+    linhas = [("Pistola", i) for i in range(LINHAS_AMOSTRA_LARGURA)] + [("X" * 40, 1)]
+    destino = io.BytesIO()
+    exportar(XlsxStreamWriter(destino), [Aba("Itens", COLUNAS, linhas)])
+    aba = load_workbook(destino).active
+    assert aba.max_row == LINHAS_AMOSTRA_LARGURA + 2
+    assert aba.cell(aba.max_row, 1).value == "X" * 40
+    assert (aba.column_dimensions["A"].width, aba.column_dimensions["B"].width) == (9, 12)
+
+def test_parquet_tipos_declarados():
+    """Parquet: tipos da definição da aba; valor diferente num grupo posterior não interrompe a exportação"""
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    from services.export_engine import ParquetStreamWriter
+
+    # Primeiro grupo só com números em "Nome": antes o schema inferia int64 e o
+    # texto do segundo grupo quebrava a escrita no meio do arquivo
+    linhas = [(1, 1), (2, 2), ("Pistola", 3), ("Maconha", None)]
+    destino = io.BytesIO()
+    exportar(ParquetStreamWriter(destino, linhas_por_grupo=2),
+             [Aba("Itens", COLUNAS, linhas, tipos={"Quantidade": int})])
+
+    tabela = pyarrow_parquet.read_table(io.BytesIO(destino.getvalue()))
+    assert [str(campo.type) for campo in tabela.schema] == ["string", "int64"], tabela.schema
+    assert tabela.column("Nome").to_pylist() == ["1", "2", "Pistola", "Maconha"]
+    assert tabela.column("Quantidade").to_pylist() == [1, 2, 3, None]
+
+def test_relatorio_em_todos_os_formatos():
+    """Relatório completo: mesmo número de linhas em todos os formatos disponíveis"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_banco(pasta, total_ocorrencias=30)
+        with Session(engine) as db:
+            servico = ExcelExportService(db, export_dir=pasta)
+            caminhos = {
+                formato: servico.export_ocorrencias_completo(date(2025, 1, 1), date(2025, 1, 31), formato)
+                for formato in formatos_disponiveis()
+            }
+            estatisticas = servico.export_estatisticas(date(2025, 1, 1), date(2025, 1, 31), "jsonl")
+        engine.dispose()
+
+        assert load_workbook(caminhos["xlsx"]).active.max_row == 61
+        with open(caminhos["csv"], encoding="utf-8", newline="") as arquivo:
+            assert len(list(csv.reader(arquivo))) == 61
+        with open(caminhos["jsonl"], "rb") as arquivo:
+            assert len(arquivo.read().splitlines()) == 60
+        assert os.path.splitext(estatisticas)[1] == ".zip"
+
+if __name__ == "__main__":
+    print("🔍 Verificando formatos de exportação...")
+    testes = [
+        test_csv_mesmas_linhas,
+        test_jsonl_mesmas_linhas,
+        test_varias_abas_geram_zip,
+        test_largura_colunas,
+        test_larguras_so_da_amostra,
+        test_parquet_tipos_declarados,
+        test_relatorio_em_todos_os_formatos,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Teste das exportações em segundo plano (ProcessPoolExecutor)
+Jobs executados em processos separados: status, progresso, download e limpeza por TTL
+"""
+
+import os
+import tempfile
+import time
+from datetime import date
+
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app as api
+from services.export_jobs import GerenciadorExportacoes, LimiteJobsExcedido
+from test_export_queries import criar_banco
+
+def criar_gerenciador(pasta, **opcoes):
+    engine = criar_banco(pasta, total_ocorrencias=40)
+    engine.dispose()
+    return GerenciadorExportacoes(export_dir=pasta, database_url=f"sqlite:///{pasta}/export.db", **opcoes)
+
+def aguardar(job, limite=30):
+    fim = time.time() + limite
+    while not job.finalizado and time.time() < fim:
+        time.sleep(0.05)
+    return job
+
+def test_job_concluido_com_progresso():
+    """Job concluído: arquivo gerado na pasta do job, manifesto, progresso e estimativa preenchidos"""
+    with tempfile.TemporaryDirectory() as pasta:
+        gerenciador = criar_gerenciador(pasta, max_processos=1)
+        try:
+            job = aguardar(gerenciador.submeter(
+                "completo", {"data_inicio": date(2025, 1, 1), "data_fim": date(2025, 1, 31)}
+            ))
+            assert job.status == "concluido", (job.status, job.erro)
+            assert os.path.dirname(job.arquivo).startswith(os.path.join(pasta, "jobs"))
+            assert load_workbook(job.arquivo).active.max_row == 63
+            assert job.partes == [{"parte": 1, "arquivo": "relatorio_completo_20250101_20250131.xlsx",
+                                   "aba": "Relatório Completo", "linhas": 62}], job.partes
+            fim = time.time() + 5  # a última mensagem de progresso pode chegar após o fim
+            while job.linhas_escritas < 62 and time.time() < fim:
+                time.sleep(0.05)
+            assert job.linhas_estimadas == 62 and job.linhas_escritas == 62, job.como_dict()
+        finally:
+            gerenciador.encerrar()
+
+def test_job_com_erro_e_parametros_invalidos():
+    """Período sem dados → status erro; relatório desconhecido → ValueError"""
+    with tempfile.TemporaryDirectory() as pasta:
+        gerenciador = criar_gerenciador(pasta, max_processos=1)
+        try:
+            job = aguardar(gerenciador.submeter("resumo_mensal", {"ano": 2030, "mes": 1}))
+            assert job.status == "erro" and "Nenhuma ocorrência" in job.erro, job.como_dict()
+            try:
+                gerenciador.submeter("inexistente", {})
+                assert False, "relatório desconhecido aceito"
+            except ValueError:
+                pass
+        finally:
+            gerenciador.encerrar()
+
+def test_limite_e_ttl():
+    """Fila cheia → LimiteJobsExcedido; jobs finalizados expiram com TTL zero"""
+    with tempfile.TemporaryDirectory() as pasta:
+        gerenciador = criar_gerenciador(pasta, max_processos=1, max_pendentes=0, ttl_horas=0)
+        try:
+            job = gerenciador.submeter("estatisticas", {"data_inicio": date(2025, 1, 1), "data_fim": date(2025, 2, 1)})
+            try:
+                gerenciador.submeter("estatisticas", {"data_inicio": date(2025, 1, 1), "data_fim": date(2025, 2, 1)})
+                assert False, "limite de jobs não aplicado"
+            except LimiteJobsExcedido:
+                pass
+            aguardar(job)
+            assert gerenciador.limpar_expirados() == 1
+            assert gerenciador.obter(job.id) is None and not os.path.exists(job.pasta)
+        finally:
+            gerenciador.encerrar()
+
+def test_endpoints_jobs():
+    """API: POST cria o job (202), GET acompanha, /arquivo baixa quando concluído"""
+    with tempfile.TemporaryDirectory() as pasta:
+        gerenciador = criar_gerenciador(pasta, max_processos=1)
+        engine = create_engine(gerenciador.database_url)
+        api.app.dependency_overrides[api.get_gerenciador_exportacoes] = lambda: gerenciador
+        api.app.dependency_overrides[api.get_fabrica_sessao] = lambda: sessionmaker(bind=engine)
+        try:
+            client = TestClient(api.app)
+            resposta = client.post("/exportar/jobs", json={
+                "relatorio": "policial", "policial_id": 2, "data_inicio": "2025-01-01",
+                "data_fim": "2025-01-31", "formato": "csv"
+            })
+            assert resposta.status_code == 202, resposta.text
+            job_id = resposta.json()["id"]
+            aguardar(gerenciador.obter(job_id))
+            assert client.get(f"/exportar/jobs/{job_id}").json()["status"] == "concluido"
+            arquivo = client.get(f"/exportar/jobs/{job_id}/arquivo")
+            assert arquivo.status_code == 200 and arquivo.text.startswith("Data,Genesis")
+            assert client.post("/exportar/jobs", json={"relatorio": "completo"}).status_code == 400
+        finally:
+            api.app.dependency_overrides.clear()
+            gerenciador.encerrar()
+            engine.dispose()
+
+if __name__ == "__main__":
+    print("🔍 Verificando exportações em segundo plano...")
+    testes = [
+        test_job_concluido_com_progresso,
+        test_job_com_erro_e_parametros_invalidos,
+        test_limite_e_ttl,
+        test_endpoints_jobs,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
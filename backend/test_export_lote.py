@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Teste das exportações em lote
+Relatório por policial de todos os condutores e resumos de todos os meses,
+cada um em uma única leitura do período
+"""
+
+import os
+from datetime import date
+
+from openpyxl import load_workbook
+
+from services.excel_export import ExcelExportService
+from test_export_queries import com_banco, contar_selects
+
+INICIO, FIM = date(2025, 1, 1), date(2025, 3, 31)
+
+def test_lote_policiais_uma_consulta():
+    """Lote em abas: um único SELECT e uma aba por condutor com as linhas de cada um"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        caminhos = []
+        consultas = contar_selects(engine, lambda: caminhos.append(servico.export_lote_policiais(INICIO, FIM)))
+        assert consultas == 1, consultas
+        workbook = load_workbook(caminhos[0])
+        assert workbook.sheetnames == ["Policial 1 M1", "Policial 2 M2", "Policial 3 M3"], workbook.sheetnames
+        # 90 ocorrências com 2 itens, divididas igualmente entre 3 condutores: 60 linhas + cabeçalho
+        assert [aba.max_row for aba in workbook.worksheets] == [61, 61, 61]
+    com_banco(verificar, total_ocorrencias=90)
+
+def test_lote_policiais_arquivos_e_paralelo():
+    """Um arquivo por policial, sequencial e com 2 processos: mesmos arquivos e conteúdo"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        sequencial = servico.export_lote_policiais(INICIO, FIM, modo="arquivos", formato="csv")
+        conteudo = {os.path.basename(c): open(c, "rb").read() for c in sequencial}
+        for caminho in sequencial:
+            os.remove(caminho)
+
+        paralelo = servico.export_lote_policiais(INICIO, FIM, modo="arquivos", formato="csv", processos=2)
+        assert [os.path.basename(c) for c in paralelo] == sorted(conteudo), paralelo
+        assert all(open(c, "rb").read() == conteudo[os.path.basename(c)] for c in paralelo)
+    com_banco(verificar, total_ocorrencias=90)
+
+def test_lote_policiais_unidade_sem_dados():
+    """Unidade sem condutores no período → ValueError"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        try:
+            servico.export_lote_policiais(INICIO, FIM, unidade="16ª CPR")
+            assert False, "lote vazio aceito"
+        except ValueError:
+            pass
+    com_banco(verificar, total_ocorrencias=90)
+
+def test_resumos_mensais_uma_consulta():
+    """Resumos em abas: um único SELECT, uma aba por mês com total e larguras compartilhadas"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        caminhos = []
+        consultas = contar_selects(engine, lambda: caminhos.append(servico.export_resumos_mensais(INICIO, FIM)))
+        assert consultas == 1, consultas
+        workbook = load_workbook(caminhos[0])
+        assert workbook.sheetnames == ["Resumo 01-2025", "Resumo 02-2025", "Resumo 03-2025"], workbook.sheetnames
+        # Uma linha por ocorrência (uma por dia) + cabeçalho + total
+        assert [aba.max_row for aba in workbook.worksheets] == [33, 30, 33]
+        assert workbook.worksheets[1]["A30"].value == "TOTAL"
+        larguras = [[aba.column_dimensions[c].width for c in "ABCDEFG"] for aba in workbook.worksheets]
+        assert larguras[0] == larguras[1] == larguras[2], larguras
+    com_banco(verificar, total_ocorrencias=90)
+
+def test_resumos_mensais_arquivos_iguais_ao_resumo_do_mes():
+    """Um arquivo por mês, com o mesmo conteúdo de export_resumo_mensal"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        arquivos = servico.export_resumos_mensais(INICIO, FIM, modo="arquivos", formato="csv")
+        assert [os.path.basename(c) for c in arquivos] == [
+            "resumo_mensal_2025_01.csv", "resumo_mensal_2025_02.csv", "resumo_mensal_2025_03.csv"
+        ], arquivos
+        for mes, caminho in enumerate(arquivos, 1):
+            individual = servico.export_resumo_mensal(2025, mes, formato="csv")
+            assert open(caminho, "rb").read() == open(individual, "rb").read(), caminho
+    com_banco(verificar, total_ocorrencias=90)
+
+if __name__ == "__main__":
+    print("🔍 Verificando exportações em lote...")
+    testes = [
+        test_lote_policiais_uma_consulta,
+        test_lote_policiais_arquivos_e_paralelo,
+        test_lote_policiais_unidade_sem_dados,
+        test_resumos_mensais_uma_consulta,
+        test_resumos_mensais_arquivos_iguais_ao_resumo_do_mes,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Teste da memória das exportações XLSX
+O pico de memória do XlsxStreamWriter deve ficar abaixo de um limite fixo,
+independente do número de linhas exportadas (linhas vão para disco em
+streaming; só a amostra de larguras fica em memória)
+"""
+
+import tempfile
+import tracemalloc
+from datetime import date
+
+from services.export_engine import Aba, XlsxStreamWriter, exportar
+
+COLUNAS = ["Data", "Genesis", "Unidade", "Lei", "Artigo", "Policial", "Item", "Quantidade"]
+LINHAS_CURTO = 1200  # acima da amostra de larguras (LINHAS_AMOSTRA_LARGURA)
+LIMITE_PICO_BYTES = 2 * 1024 * 1024
+
+def gerar_linhas(total):
+    for i in range(total):
+        yield (date(2025, 1, 1), f"G{i}", "8ª CPR", "Lei 11.343/06", "Art. 28", f"Policial {i % 3}",
+               "Pistola .40 com carregador", i)
+
+def pico_memoria(funcao):
+    """Executa a função e retorna o pico de memória alocada (tracemalloc), em bytes"""
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+def comparar_volumes():
+    """Pico de memória exportando N e 10×N linhas para um arquivo"""
+    with tempfile.TemporaryDirectory() as pasta:
+        def exportar_linhas(total):
+            exportar(XlsxStreamWriter(f"{pasta}/{total}.xlsx"), [Aba("Ocorrências", COLUNAS, gerar_linhas(total))])
+        curto = pico_memoria(lambda: exportar_linhas(LINHAS_CURTO))
+        longo = pico_memoria(lambda: exportar_linhas(LINHAS_CURTO * 10))
+    return curto, longo
+
+def test_xlsx_memoria_constante():
+    """XLSX: pico de memória abaixo do limite e sem crescer com 10× mais linhas"""
+    curto, longo = comparar_volumes()
+    assert curto < LIMITE_PICO_BYTES and longo < LIMITE_PICO_BYTES, (curto, longo)
+    assert longo < curto * 1.5, (curto, longo)
+
+if __name__ == "__main__":
+    print("🔍 Verificando memória das exportações XLSX...")
+    testes = [
+        test_xlsx_memoria_constante,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Teste da divisão de exportações grandes em partes (EXPORT_MAX_RECORDS)
+Abas 'Título (2)', 'Título (3)'... ou um arquivo por parte, sempre com manifesto
+"""
+
+import csv
+import json
+import os
+from datetime import date
+
+from openpyxl import load_workbook
+
+from services.excel_export import ExcelExportService
+from services.export_engine import Aba, dividir_abas, titulo_parte
+from test_export_queries import com_banco
+
+INICIO, FIM = date(2025, 1, 1), date(2025, 1, 31)
+
+def test_dividir_abas_sem_ler_antecipadamente():
+    """Partes de no máximo N linhas; limite exato não gera aba vazia; título cabe em 31 caracteres"""
+    partes = [(aba.titulo, list(aba.linhas)) for aba in dividir_abas([Aba("Itens", ["N"], ((i,) for i in range(6)))], 3)]
+    assert partes == [("Itens", [(0,), (1,), (2,)]), ("Itens (2)", [(3,), (4,), (5,)])], partes
+    assert titulo_parte("R" * 40, 12) == "R" * 26 + " (12)"
+
+def test_xlsx_dividido_em_abas():
+    """31 dias com 2 itens = 62 linhas; limite 25 → 3 abas e manifesto com as linhas de cada uma"""
+    def verificar(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta, max_linhas=25)
+        caminho = servico.export_ocorrencias_completo(INICIO, FIM)
+        workbook = load_workbook(caminho)
+        assert workbook.sheetnames == ["Relatório Completo", "Relatório Completo (2)", "Relatório Completo (3)"]
+        assert [aba.max_row for aba in workbook.worksheets] == [26, 26, 13]
+        assert [(parte.aba, parte.linhas) for parte in servico.manifesto] == [
+            ("Relatório Completo", 25), ("Relatório Completo (2)", 25), ("Relatório Completo (3)", 12)
+        ]
+    com_banco(verificar, total_ocorrencias=40)
+
+def test_csv_dividido_em_arquivos():
+    """Um arquivo por parte + manifesto JSON; as partes juntas têm todas as linhas, na ordem"""
+    def verificar(db, engine, pasta):
+        completo = ExcelExportService(db, export_dir=pasta).export_ocorrencias_completo(INICIO, FIM, formato="csv")
+        linhas_completo = list(csv.reader(open(completo, encoding="utf-8")))
+
+        servico = ExcelExportService(db, export_dir=f"{pasta}/partes", max_linhas=25, dividir_em_arquivos=True)
+        manifesto = json.load(open(servico.export_ocorrencias_completo(INICIO, FIM, formato="csv"), encoding="utf-8"))
+        assert manifesto["arquivos"] == 3 and manifesto["linhas"] == 62, manifesto
+
+        linhas = []
+        for parte in manifesto["partes"]:
+            conteudo = list(csv.reader(open(os.path.join(pasta, "partes", parte["arquivo"]), encoding="utf-8")))
+            assert conteudo[0] == linhas_completo[0] and len(conteudo) - 1 == parte["linhas"]
+            linhas.extend(conteudo[1:])
+        assert linhas == linhas_completo[1:]
+
+        # Dentro do limite: um único arquivo com o nome normal
+        unico = ExcelExportService(db, export_dir=f"{pasta}/partes", dividir_em_arquivos=True)
+        assert os.path.basename(unico.export_resumo_mensal(2025, 1, formato="csv")) == "resumo_mensal_2025_01.csv"
+    com_banco(verificar, total_ocorrencias=40)
+
+if __name__ == "__main__":
+    print("🔍 Verificando divisão de exportações em partes...")
+    testes = [
+        test_dividir_abas_sem_ler_antecipadamente,
+        test_xlsx_dividido_em_abas,
+        test_csv_dividido_em_arquivos,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Teste do número de consultas das exportações
+Cada relatório deve emitir um número fixo de SELECTs, independente do
+tamanho do período exportado (sem carregamento lazy por ocorrência/item)
+"""
+
+import tempfile
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+import app as api
+from app import Base, Policial, Proprietario, Ocorrencia, ItemApreendido
+from services.excel_export import ExcelExportService
+
+def criar_banco(pasta, total_ocorrencias=120):
+    """Banco SQLite com uma ocorrência por dia a partir de 01/01/2025, cada uma com 2 itens"""
+    engine = create_engine(f"sqlite:///{pasta}/export.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Policial), [
+            {"id": i, "nome": f"Policial {i}", "matricula": f"M{i}", "graduacao": "Cabo", "unidade": "8ª CPR"}
+            for i in range(1, 4)
+        ])
+        conn.execute(insert(Proprietario), [{"id": 1, "nome": "Proprietário", "documento": "12345678900"}])
+        conn.execute(insert(Ocorrencia), [
+            {"id": i, "numero_genesis": f"G{i}", "unidade_fato": "8ª CPR",
+             "data_apreensao": date(2025, 1, 1) + timedelta(days=i - 1), "lei_infringida": "Lei 11.343/06",
+             "artigo": "Art. 28", "policial_condutor_id": i % 3 + 1}
+            for i in range(1, total_ocorrencias + 1)
+        ])
+        conn.execute(insert(ItemApreendido), [
+            {"especie": "Arma", "item": "Pistola", "quantidade": 1, "descricao_detalhada": "Pistola .40",
+             "ocorrencia_id": i, "proprietario_id": 1, "policial_id": i % 3 + 1}
+            for i in range(1, total_ocorrencias + 1)
+            for _ in range(2)
+        ])
+    return engine
+
+def com_banco(funcao, total_ocorrencias=120):
+    """Executa funcao(db, engine, pasta) com uma sessão no banco de criar_banco, em uma pasta temporária"""
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_banco(pasta, total_ocorrencias)
+        try:
+            with Session(engine) as db:
+                funcao(db, engine, pasta)
+        finally:
+            engine.dispose()
+
+def com_api(funcao, total_ocorrencias=120, **opcoes_cache):
+    """
+    Executa funcao(client, fabrica, cache) com as leituras, as exportações e o
+    cache da API apontando para o banco de criar_banco (requer httpx)
+    """
+    from fastapi.testclient import TestClient
+    from services.export_cache import CacheExportacoes
+
+    def executar(db, engine, pasta):
+        fabrica = lambda: api.SessionLocal(bind=engine)  # sessões da API (registram as versões das tabelas)
+        cache = CacheExportacoes(pasta=f"{pasta}/cache", **opcoes_cache)
+
+        def sessao_leitura():
+            with fabrica() as sessao:
+                yield sessao
+
+        api.app.dependency_overrides[api.get_db_leitura] = sessao_leitura
+        api.app.dependency_overrides[api.get_fabrica_sessao] = lambda: fabrica
+        api.app.dependency_overrides[api.get_cache_exportacoes] = lambda: cache
+        try:
+            funcao(TestClient(api.app), fabrica, cache)
+        finally:
+            api.app.dependency_overrides.clear()
+
+    com_banco(executar, total_ocorrencias)
+
+def contar_selects(engine, funcao):
+    """Executa a função e retorna quantos SELECTs foram enviados ao banco"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            consultas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        funcao()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    return len(consultas)
+
+def comparar_periodos(exportacao):
+    """Número de SELECTs para um período de 10 dias e para um de 4 meses"""
+    contagens = []
+
+    def medir(db, engine, pasta):
+        servico = ExcelExportService(db, export_dir=pasta)
+        contagens.append(contar_selects(engine, lambda: exportacao(servico, date(2025, 1, 1), date(2025, 1, 10))))
+        contagens.append(contar_selects(engine, lambda: exportacao(servico, date(2025, 1, 1), date(2025, 4, 30))))
+
+    com_banco(medir)
+    curto, longo = contagens
+    return curto, longo
+
+def test_relatorio_completo_consultas_constantes():
+    """Relatório completo: número de consultas não depende do período"""
+    curto, longo = comparar_periodos(lambda s, inicio, fim: s.export_ocorrencias_completo(inicio, fim))
+    assert curto == longo == 1, (curto, longo)
+
+def test_resumo_mensal_consultas_constantes():
+    """Resumo mensal: número de consultas não depende do mês"""
+    curto, longo = comparar_periodos(lambda s, inicio, fim: s.export_resumo_mensal(fim.year, fim.month))
+    assert curto == longo == 1, (curto, longo)
+
+def test_por_policial_consultas_constantes():
+    """Relatório por policial: busca do policial + um SELECT com joins"""
+    curto, longo = comparar_periodos(lambda s, inicio, fim: s.export_por_policial(2, inicio, fim))
+    assert curto == longo == 2, (curto, longo)
+
+def test_estatisticas_consultas_constantes():
+    """Estatísticas: um único SELECT agregado"""
+    curto, longo = comparar_periodos(lambda s, inicio, fim: s.export_estatisticas(inicio, fim))
+    assert curto == longo == 1, (curto, longo)
+
+if __name__ == "__main__":
+    print("🔍 Verificando número de consultas das exportações...")
+    testes = [
+        test_relatorio_completo_consultas_constantes,
+        test_resumo_mensal_consultas_constantes,
+        test_por_policial_consultas_constantes,
+        test_estatisticas_consultas_constantes,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
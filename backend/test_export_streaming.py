@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Teste dos endpoints /exportar/... (arquivo transmitido em streaming)
+Requer httpx (usado pelo TestClient do FastAPI)
+"""
+
+import csv
+import io
+
+from openpyxl import load_workbook
+
+from test_export_queries import com_api
+
+def test_xlsx_transmitido():
+    """XLSX completo: arquivo válido com cabeçalhos de download e progresso"""
+    def verificar(client, fabrica, cache):
+        resposta = client.get("/exportar/completo", params={"data_inicio": "2025-01-01", "data_fim": "2025-01-31"})
+        assert resposta.status_code == 200, resposta.text
+        assert resposta.headers["content-type"].startswith("application/vnd.openxmlformats")
+        assert 'filename="relatorio_completo_20250101_20250131.xlsx"' in resposta.headers["content-disposition"]
+        assert resposta.headers["x-export-linhas-estimadas"] == "62"
+        assert load_workbook(io.BytesIO(resposta.content)).active.max_row == 63
+    com_api(verificar, total_ocorrencias=40)
+
+def test_csv_transmitido():
+    """CSV do resumo mensal: uma linha por ocorrência + total"""
+    def verificar(client, fabrica, cache):
+        resposta = client.get("/exportar/resumo-mensal", params={"ano": 2025, "mes": 1, "formato": "csv"})
+        assert resposta.status_code == 200, resposta.text
+        linhas = list(csv.reader(io.StringIO(resposta.text)))
+        assert len(linhas) == 1 + 31 + 1, len(linhas)
+        assert linhas[-1][0] == "TOTAL"
+    com_api(verificar, total_ocorrencias=40)
+
+def test_erros_antes_do_streaming():
+    """Sem dados → 404; formato inválido → 400; policial inexistente → 404"""
+    def verificar(client, fabrica, cache):
+        sem_dados = client.get("/exportar/estatisticas", params={"data_inicio": "2030-01-01", "data_fim": "2030-01-31"})
+        assert sem_dados.status_code == 404, sem_dados.status_code
+        formato = client.get("/exportar/completo", params={"data_inicio": "2025-01-01", "data_fim": "2025-01-31",
+                                                           "formato": "pdf"})
+        assert formato.status_code == 400, formato.status_code
+        policial = client.get("/exportar/policial/999", params={"data_inicio": "2025-01-01", "data_fim": "2025-01-31"})
+        assert policial.status_code == 404, policial.status_code
+    com_api(verificar, total_ocorrencias=40)
+
+if __name__ == "__main__":
+    print("🔍 Verificando exportações em streaming...")
+    testes = [test_xlsx_transmitido, test_csv_transmitido, test_erros_antes_do_streaming]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
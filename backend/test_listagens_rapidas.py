@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Teste das listagens rápidas (?rapido=true)
+O caminho pelo Core deve devolver o mesmo conteúdo e os mesmos headers
+(ETag, X-Next-Cursor) que o caminho pelo ORM, nas quatro listagens
+"""
+
+from test_export_queries import com_api
+
+# Consultas de cada listagem (com uma página cheia, para que o cursor seja enviado)
+CONSULTAS = [
+    ("/policiais/", {}),
+    ("/proprietarios/", {}),
+    ("/itens/", {"skip": 5, "limit": 10}),
+    ("/ocorrencias/", {"limit": 10}),
+    ("/ocorrencias/", {"limit": 10, "cursor": "2025-01-20:20"}),
+    ("/ocorrencias/", {"data_inicio": "2025-01-05", "policial_condutor_id": 2, "especie": "Arma"}),
+]
+HEADERS_COMPARADOS = ["etag", "cache-control", "last-modified", "x-next-cursor"]
+
+def test_rapido_igual_ao_orm():
+    """rapido=true: mesmo JSON, ETag e X-Next-Cursor que o caminho pelo ORM"""
+    def verificar(client, fabrica, cache):
+        for caminho, parametros in CONSULTAS:
+            orm = client.get(caminho, params=parametros)
+            rapido = client.get(caminho, params={**parametros, "rapido": "true"})
+            assert orm.status_code == rapido.status_code == 200, (caminho, orm.status_code, rapido.status_code)
+            assert orm.json(), caminho
+            assert rapido.json() == orm.json(), caminho
+            for header in HEADERS_COMPARADOS:
+                assert rapido.headers.get(header) == orm.headers.get(header), (caminho, header)
+        assert client.get("/ocorrencias/", params={"limit": 10}).headers["x-next-cursor"] == "2025-01-21:21"
+    com_api(verificar, total_ocorrencias=30)
+
+if __name__ == "__main__":
+    print("🔍 Verificando listagens rápidas...")
+    testes = [
+        test_rapido_igual_ao_orm,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
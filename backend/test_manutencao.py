@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Teste da manutenção do banco em segundo plano
+Checkpoint do WAL por limite de tamanho, adiamento com a API em uso,
+optimize e incremental vacuum
+"""
+
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine
+
+from services.manutencao import AgendadorManutencao
+
+def criar_banco(caminho, linhas=3000):
+    """Banco WAL (auto_vacuum=INCREMENTAL) com checkpoint automático desligado: os dados ficam no WAL"""
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE registro (id INTEGER PRIMARY KEY, texto TEXT)")
+    conn.executemany("INSERT INTO registro (texto) VALUES (?)", [("x" * 200,) for _ in range(linhas)])
+    conn.commit()
+    return conn
+
+def agendador(caminho, **opcoes):
+    engine = create_engine(f"sqlite:///{caminho}")
+    parametros = dict(ocioso=0, wal_passivo_mb=0.1, wal_truncate_mb=100, optimize_horas=1000,
+                      vacuum_paginas_livres=10)
+    parametros.update(opcoes)
+    return AgendadorManutencao(engine, **parametros)
+
+def test_checkpoint_por_tamanho_do_wal():
+    """WAL acima do limite: PASSIVE copia as páginas; TRUNCATE zera o arquivo; métricas registradas"""
+    with tempfile.TemporaryDirectory() as pasta:
+        conn = criar_banco(f"{pasta}/banco.db")
+        manutencao = agendador(f"{pasta}/banco.db")
+        assert manutencao.tamanho_wal() > 0.1 * 1024 * 1024
+
+        resultado = manutencao.executar_ciclo()
+        checkpoint = resultado["checkpoint"]
+        assert checkpoint["modo"] == "PASSIVE" and not checkpoint["ocupado"], checkpoint
+        assert checkpoint["paginas_copiadas"] == checkpoint["paginas_wal"] > 0, checkpoint
+
+        manutencao.wal_truncate_bytes = 0
+        assert manutencao.executar_ciclo()["checkpoint"]["modo"] == "TRUNCATE"
+        assert manutencao.tamanho_wal() == 0
+
+        metricas = manutencao.metricas()
+        assert metricas["checkpoints"] == 2 and metricas["ciclos"] == 2, metricas
+        assert metricas["maior_wal_bytes"] == checkpoint["wal_antes_bytes"]
+        assert metricas["ultimo_checkpoint"]["duracao_ms"] >= 0
+        conn.close()
+        manutencao.engine.dispose()
+
+def test_adiado_com_requisicao_em_andamento():
+    """Com requisição em andamento o ciclo é adiado; forcar=True executa mesmo assim"""
+    with tempfile.TemporaryDirectory() as pasta:
+        conn = criar_banco(f"{pasta}/banco.db")
+        manutencao = agendador(f"{pasta}/banco.db")
+        manutencao.inicio_requisicao()
+        assert manutencao.executar_ciclo() == {"executado": False, "motivo": "API em uso"}
+        assert "checkpoint" in manutencao.executar_ciclo(forcar=True)
+        manutencao.fim_requisicao()
+        assert manutencao.metricas()["ciclos_adiados"] == 1
+        conn.close()
+        manutencao.engine.dispose()
+
+def test_optimize_e_vacuum_incremental():
+    """optimize no intervalo configurado; páginas livres acima do limite são devolvidas ao sistema"""
+    with tempfile.TemporaryDirectory() as pasta:
+        conn = criar_banco(f"{pasta}/banco.db")
+        conn.execute("DELETE FROM registro")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        livres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        assert livres > 10, livres
+
+        manutencao = agendador(f"{pasta}/banco.db", optimize_horas=0)
+        resultado = manutencao.executar_ciclo()
+        assert resultado["optimize"] is True and resultado["vacuum_paginas"] == livres, resultado
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        conn.close()
+        manutencao.engine.dispose()
+
+if __name__ == "__main__":
+    print("🔍 Verificando manutenção do banco...")
+    testes = [
+        test_checkpoint_por_tamanho_do_wal,
+        test_adiado_com_requisicao_em_andamento,
+        test_optimize_e_vacuum_incremental,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Teste da migração do modo compartilhado para o modo servidor
+Cópia verificada do banco, marcador na pasta compartilhada e banco local
+explícito (SECRIMPO_DATABASE) no PC servidor
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import config
+from migrar_para_servidor import migrar
+
+def criar_banco_compartilhado(pasta, ocorrencias=30):
+    os.makedirs(f"{pasta}/compartilhada/database")
+    caminho = f"{pasta}/compartilhada/database/secrimpo.db"
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE ocorrencia (id INTEGER PRIMARY KEY, numero_genesis TEXT)")
+    conn.execute("CREATE TABLE policial (id INTEGER PRIMARY KEY, matricula TEXT)")
+    conn.executemany("INSERT INTO ocorrencia (numero_genesis) VALUES (?)", [(f"G{i}",) for i in range(ocorrencias)])
+    conn.commit()
+    conn.close()
+    return caminho
+
+def test_migracao_copia_e_marca_pasta():
+    """Banco copiado e conferido; marcador aponta para a API do servidor; destino existente é recusado"""
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = criar_banco_compartilhado(pasta)
+        destino = f"{pasta}/servidor/secrimpo.db"
+        resultado = migrar(origem, destino, "http://10.0.0.5:8000")
+        assert resultado["verificacao"] == "ok" and resultado["divergencias"] == {}
+        assert resultado["registros"] == {"policial": 0, "ocorrencia": 30}, resultado["registros"]
+
+        marcador = config.ler_marcador_servidor(f"{pasta}/compartilhada/database")
+        assert marcador["api_url"] == "http://10.0.0.5:8000" and marcador["banco"] == destino
+
+        try:
+            migrar(origem, destino, "http://10.0.0.5:8000")
+            assert False, "destino existente deveria ser recusado"
+        except FileExistsError:
+            pass
+        assert migrar(origem, destino, "http://10.0.0.5:8000", forcar=True)["registros"]["ocorrencia"] == 30
+
+def test_migracao_sem_banco_nao_marca():
+    """Sem banco compartilhado a migração falha e a pasta não fica marcada"""
+    with tempfile.TemporaryDirectory() as pasta:
+        os.makedirs(f"{pasta}/database")
+        try:
+            migrar(f"{pasta}/database/secrimpo.db", f"{pasta}/servidor.db", "http://10.0.0.5:8000")
+            assert False, "banco inexistente deveria falhar"
+        except FileNotFoundError:
+            pass
+        assert config.ler_marcador_servidor(f"{pasta}/database") is None
+
+def test_banco_local_explicito():
+    """SECRIMPO_DATABASE: modo local com o banco indicado, sem consultar a pasta compartilhada"""
+    with tempfile.TemporaryDirectory() as pasta:
+        os.environ["SECRIMPO_DATABASE"] = f"{pasta}/servidor/secrimpo.db"
+        try:
+            configuracao = config.get_storage_config()
+        finally:
+            del os.environ["SECRIMPO_DATABASE"]
+        assert configuracao["shared_mode"] is False and configuracao["storage_manager"] is None
+        assert configuracao["database_url"] == f"sqlite:///{pasta}/servidor/secrimpo.db"
+        assert os.path.isdir(f"{pasta}/servidor")
+
+if __name__ == "__main__":
+    print("🔍 Verificando migração para o modo servidor...")
+    testes = [
+        test_migracao_copia_e_marca_pasta,
+        test_migracao_sem_banco_nao_marca,
+        test_banco_local_explicito,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
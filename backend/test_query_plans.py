@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Teste dos planos de consulta da listagem de ocorrências
+Verifica que cada combinação de filtros usa um índice composto
+(sem varredura completa da tabela e sem ordenação em B-tree temporária)
+"""
+
+import itertools
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import Base, Ocorrencia, filtrar_ocorrencias
+
+FILTROS = {
+    "data_inicio": date(2025, 9, 1),
+    "data_fim": date(2025, 9, 30),
+    "unidade_fato": "10ª CPR",
+    "lei_infringida": "Lei 11.343/06",
+    "policial_condutor_id": 1,
+    "especie": "Entorpecente",
+}
+
+def criar_banco_memoria():
+    """Cria banco SQLite em memória com o schema da API"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def obter_plano(engine, filtros):
+    """Retorna as linhas do EXPLAIN QUERY PLAN da listagem com os filtros dados"""
+    with Session(engine) as db:
+        query = filtrar_ocorrencias(db.query(Ocorrencia), **filtros)
+        query = query.order_by(
+            Ocorrencia.data_apreensao.desc(), Ocorrencia.id.desc()
+        ).limit(100)
+        sql = str(query.statement.compile(
+            dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+        ))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+def plano_usa_indices(plano):
+    """Verdadeiro se nenhuma tabela é varrida sem índice nem há ordenação temporária"""
+    for linha in plano:
+        if "TEMP B-TREE" in linha:
+            return False
+        if linha.startswith("SCAN") and "INDEX" not in linha:
+            return False
+    return True
+
+def test_todas_combinacoes_usam_indice():
+    """Todas as combinações de filtros devem usar índice"""
+    engine = criar_banco_memoria()
+    falhas = []
+
+    for tamanho in range(len(FILTROS) + 1):
+        for nomes in itertools.combinations(FILTROS, tamanho):
+            filtros = {nome: FILTROS[nome] for nome in nomes}
+            plano = obter_plano(engine, filtros)
+            if not plano_usa_indices(plano):
+                falhas.append((nomes, plano))
+
+    assert not falhas, f"Combinações sem índice: {falhas}"
+
+def test_filtro_unidade_usa_indice_composto():
+    """Filtro por unidade e período deve buscar pelo índice unidade + data"""
+    engine = criar_banco_memoria()
+    plano = obter_plano(engine, {
+        "unidade_fato": FILTROS["unidade_fato"],
+        "data_inicio": FILTROS["data_inicio"],
+        "data_fim": FILTROS["data_fim"],
+    })
+
+    assert any("ix_ocorrencia_unidade" in linha for linha in plano), plano
+
+def test_filtro_especie_usa_indice_de_itens():
+    """Filtro por espécie deve consultar itens pelo índice ocorrencia_id + especie"""
+    engine = criar_banco_memoria()
+    plano = obter_plano(engine, {"especie": FILTROS["especie"]})
+
+    assert any("ix_item_apreendido_ocorrencia_especie" in linha for linha in plano), plano
+
+if __name__ == "__main__":
+    print("🔍 Verificando planos de consulta da listagem de ocorrências...")
+    testes = [
+        test_todas_combinacoes_usam_indice,
+        test_filtro_unidade_usa_indice_composto,
+        test_filtro_especie_usa_indice_de_itens,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Teste da réplica local de leitura
+Semente por backup online, atualização incremental pela marca d'água de cada
+tabela, nova semente quando o schema muda e atraso máximo nas leituras
+"""
+
+import sqlite3
+import tempfile
+import time
+
+from services.replica import ReplicaLocal
+
+def criar_primario(caminho, linhas=100):
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE registro (id INTEGER PRIMARY KEY, texto TEXT)")
+    conn.execute("CREATE TABLE versao (tabela TEXT PRIMARY KEY, versao INTEGER)")
+    conn.executemany("INSERT INTO registro (texto) VALUES (?)", [(f"registro {i}",) for i in range(linhas)])
+    conn.execute("INSERT INTO versao VALUES ('registro', 1)")
+    conn.commit()
+    return conn
+
+def inserir(conn, quantidade, texto="novo"):
+    conn.executemany("INSERT INTO registro (texto) VALUES (?)", [(texto,)] * quantidade)
+    conn.execute("UPDATE versao SET versao = versao + 1")
+    conn.commit()
+
+def linhas(caminho, sql="SELECT * FROM registro ORDER BY id"):
+    conn = sqlite3.connect(caminho)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def test_semente_e_atualizacao_incremental():
+    """Primeira atualização semeia; as seguintes copiam só as linhas acima da marca d'água"""
+    with tempfile.TemporaryDirectory() as pasta:
+        primario = criar_primario(f"{pasta}/primario.db")
+        replica = ReplicaLocal(f"{pasta}/primario.db", f"{pasta}/replica.db")
+        replica.atualizar()
+        assert replica.pronta and len(linhas(f"{pasta}/replica.db")) == 100
+
+        inserir(primario, 5)
+        assert replica.atualizar() == {"registro": 5, "versao": 1}
+        assert replica.marcas == {"registro": 105}
+        assert linhas(f"{pasta}/replica.db") == linhas(f"{pasta}/primario.db")
+        assert linhas(f"{pasta}/replica.db", "SELECT versao FROM versao") == [(2,)]
+        assert replica.atualizar() == {"versao": 1}
+        assert replica.estado()["sementes"] == 1
+        primario.close()
+        replica.encerrar()
+
+def test_nova_semente_e_banco_restaurado():
+    """Schema alterado no banco compartilhado gera nova semente; MAX(id) menor recomeça a tabela"""
+    with tempfile.TemporaryDirectory() as pasta:
+        primario = criar_primario(f"{pasta}/primario.db")
+        replica = ReplicaLocal(f"{pasta}/primario.db", f"{pasta}/replica.db")
+        replica.atualizar()
+
+        primario.execute("CREATE INDEX ix_registro_texto ON registro (texto)")
+        primario.commit()
+        replica.atualizar()
+        assert replica.estado()["sementes"] == 2
+
+        primario.execute("DELETE FROM registro WHERE id > 50")
+        primario.commit()
+        replica.atualizar()
+        assert linhas(f"{pasta}/replica.db") == linhas(f"{pasta}/primario.db")
+        primario.close()
+        replica.encerrar()
+
+def test_atraso_maximo_e_leitura_apos_escrita():
+    """Dentro do atraso máximo a réplica é servida como está; além dele ou após escrita, atualiza antes"""
+    with tempfile.TemporaryDirectory() as pasta:
+        primario = criar_primario(f"{pasta}/primario.db")
+        replica = ReplicaLocal(f"{pasta}/primario.db", f"{pasta}/replica.db", max_atraso=0.3)
+        assert replica.garantir_atualizada() is False
+        replica.atualizar()
+
+        inserir(primario, 1)
+        assert replica.garantir_atualizada() and len(linhas(f"{pasta}/replica.db")) == 100
+        replica.marcar_desatualizada()
+        assert replica.garantir_atualizada() and len(linhas(f"{pasta}/replica.db")) == 101
+
+        inserir(primario, 1)
+        time.sleep(0.35)
+        assert replica.garantir_atualizada() and len(linhas(f"{pasta}/replica.db")) == 102
+
+        with replica.fabrica_sessao() as sessao:
+            assert sessao.connection().exec_driver_sql("PRAGMA query_only").scalar() == 1
+        primario.close()
+        replica.encerrar()
+
+if __name__ == "__main__":
+    print("🔍 Verificando réplica local de leitura...")
+    testes = [
+        test_semente_e_atualizacao_incremental,
+        test_nova_semente_e_banco_restaurado,
+        test_atraso_maximo_e_leitura_apos_escrita,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Teste das respostas condicionais (ETag/Last-Modified)
+If-None-Match tem precedência sobre If-Modified-Since e a resolução de 1
+segundo do Last-Modified não gera 304 falso
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from fastapi import Response
+
+import app as api
+
+ETAG = '"abc123"'
+
+def http_date(momento):
+    return format_datetime(momento.replace(tzinfo=timezone.utc), usegmt=True)
+
+def condicional(ultima_alteracao, if_none_match=None, if_modified_since=None):
+    response = Response()
+    resultado = api.resposta_condicional(response, ETAG, ultima_alteracao, if_none_match, if_modified_since)
+    return response, resultado
+
+def test_if_none_match_ignora_if_modified_since():
+    """ETag diferente com If-Modified-Since válido: 200; ETag igual: 304"""
+    antiga = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=5)
+    _, resultado = condicional(antiga, '"outro"', http_date(antiga))
+    assert resultado is None
+    _, resultado = condicional(antiga, ETAG, http_date(antiga - timedelta(days=1)))
+    assert resultado is not None and resultado.status_code == 304
+
+def test_alteracao_no_segundo_atual_nao_gera_304():
+    """Last-Modified do segundo atual: não é enviado e If-Modified-Since não gera 304"""
+    if datetime.utcnow().microsecond > 800000:
+        time.sleep(0.25)  # longe da virada do segundo durante a chamada
+    agora = datetime.utcnow()
+    response, resultado = condicional(agora.replace(microsecond=0), if_modified_since=http_date(agora))
+    assert resultado is None
+    assert "last-modified" not in response.headers and response.headers["etag"] == ETAG
+
+    antiga = agora.replace(microsecond=0) - timedelta(seconds=2)
+    response, resultado = condicional(antiga, if_modified_since=http_date(antiga))
+    assert response.headers["last-modified"] == http_date(antiga)
+    assert resultado is not None and resultado.status_code == 304
+    _, resultado = condicional(antiga, if_modified_since=http_date(antiga - timedelta(seconds=1)))
+    assert resultado is None
+
+if __name__ == "__main__":
+    print("🔍 Verificando respostas condicionais...")
+    testes = [
+        test_if_none_match_ignora_if_modified_since,
+        test_alteracao_no_segundo_atual_nao_gera_304,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
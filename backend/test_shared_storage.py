@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Teste da detecção e do monitoramento da pasta compartilhada
+Sondagem paralela com prazo (host SMB travado não atrasa o início), cache com
+TTL e monitor de conectividade (percentis de latência, modo degradado/offline)
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from services.conectividade import MODO_DEGRADADO, MODO_NORMAL, MODO_OFFLINE, MonitorConectividade, percentil
+from shared_storage import (
+    SharedStorageManager, detectar_pasta_compartilhada, gravar_cache_deteccao, ler_cache_deteccao
+)
+
+def test_deteccao_paralela_com_prazo():
+    """Candidato que trava não atrasa: vence o primeiro acessível; nenhum acessível → None no prazo"""
+    def sondar(caminho):
+        if caminho == "travado":
+            time.sleep(30)
+        return caminho.startswith("ok")
+
+    inicio = time.monotonic()
+    assert detectar_pasta_compartilhada(["travado", "inexistente", "ok_1"], timeout=2, sondar=sondar) == "ok_1"
+    assert time.monotonic() - inicio < 1
+
+    inicio = time.monotonic()
+    assert detectar_pasta_compartilhada(["travado", "inexistente"], timeout=0.3, sondar=sondar) is None
+    assert time.monotonic() - inicio < 1
+
+def test_deteccao_com_pastas_reais():
+    """Sondagem padrão (os.path.isdir): arquivo e caminho inexistente são ignorados"""
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "arquivo.txt")
+        open(arquivo, "w").close()
+        candidatos = [os.path.join(pasta, "nao_existe"), arquivo, pasta]
+        assert detectar_pasta_compartilhada(candidatos, timeout=2) == pasta
+
+def test_cache_da_deteccao():
+    """Pasta em cache é usada dentro do TTL e ignorada depois dele ou se o arquivo for inválido"""
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "cache.json")
+        assert ler_cache_deteccao(arquivo, 60) is None
+        gravar_cache_deteccao(arquivo, "/mnt/secrimpo")
+        assert ler_cache_deteccao(arquivo, 60) == "/mnt/secrimpo"
+        assert ler_cache_deteccao(arquivo, -1) is None
+        with open(arquivo, "w") as f:
+            f.write("{invalido")
+        assert ler_cache_deteccao(arquivo, 60) is None
+
+def monitor_com_latencias(latencias, **opcoes):
+    """Monitor cuja sondagem devolve as latências da lista, uma por chamada"""
+    sequencia = iter(latencias)
+    parametros = dict(intervalo=60, timeout=0.5, limite_latencia_ms=100, janela=50, amostras_decisao=3)
+    parametros.update(opcoes)
+    return MonitorConectividade(lambda: next(sequencia), **parametros)
+
+def test_percentis_de_latencia():
+    """Percentis pelo posto mais próximo, separados para leitura e escrita"""
+    assert percentil([], 95) is None
+    assert percentil(list(range(1, 101)), 95) == 95 and percentil([7.0], 99) == 7.0
+    monitor = monitor_com_latencias([(float(i), float(i) * 2) for i in range(1, 21)])
+    for _ in range(20):
+        monitor.sondar_agora()
+    estado = monitor.estado()
+    assert estado["leitura"]["p50_ms"] == 10 and estado["leitura"]["p95_ms"] == 19, estado["leitura"]
+    assert estado["escrita"]["p99_ms"] == 40 and estado["escrita"]["amostras"] == 20, estado["escrita"]
+
+def test_modo_degradado_com_histerese():
+    """Degrada com 3 sondagens lentas seguidas; uma sondagem rápida isolada não volta ao normal"""
+    rapido, lento = (10.0, 10.0), (10.0, 500.0)
+    monitor = monitor_com_latencias([rapido, lento, lento, lento, rapido, lento, rapido, rapido, rapido])
+    trocas = []
+    monitor.ao_mudar_modo(lambda anterior, novo: trocas.append((anterior, novo)))
+    modos = [monitor.sondar_agora()["modo"] for _ in range(9)]
+    assert modos == [MODO_NORMAL, MODO_NORMAL, MODO_NORMAL, MODO_DEGRADADO, MODO_DEGRADADO,
+                     MODO_DEGRADADO, MODO_DEGRADADO, MODO_DEGRADADO, MODO_NORMAL], modos
+    assert trocas == [(None, MODO_NORMAL), (MODO_NORMAL, MODO_DEGRADADO), (MODO_DEGRADADO, MODO_NORMAL)]
+
+def test_sondagem_lenta_isolada_nao_degrada():
+    """Início (ou volta de falha) com uma sondagem lenta: continua normal até 3 lentas seguidas"""
+    rapido, lento = (10.0, 10.0), (10.0, 500.0)
+    monitor = monitor_com_latencias([lento, rapido, lento, lento, lento])
+    modos = [monitor.sondar_agora()["modo"] for _ in range(5)]
+    assert modos == [MODO_NORMAL, MODO_NORMAL, MODO_NORMAL, MODO_NORMAL, MODO_DEGRADADO], modos
+
+    monitor = monitor_com_latencias([lento])
+    monitor._registrar_falha("Sem resposta")
+    assert monitor.sondar_agora()["modo"] == MODO_NORMAL
+
+def test_sondagem_travada_fica_offline():
+    """Sondagem sem resposta no prazo: offline sem esperar a sondagem; nenhuma nova começa antes dela"""
+    liberar = threading.Event()
+    chamadas = []
+
+    def sondar():
+        chamadas.append(1)
+        liberar.wait(5)
+        return 1.0, 1.0
+
+    monitor = MonitorConectividade(sondar, intervalo=60, timeout=0.2, limite_latencia_ms=100)
+    inicio = time.monotonic()
+    assert monitor.sondar_agora()["modo"] == MODO_OFFLINE
+    assert monitor.sondar_agora()["mensagem"] == "Sondagem anterior ainda sem resposta"
+    assert time.monotonic() - inicio < 1 and len(chamadas) == 1
+    liberar.set()
+
+def test_status_do_gerenciador_vem_do_monitor():
+    """get_status usa o estado em cache do monitor, com latências de leitura e escrita medidas"""
+    with tempfile.TemporaryDirectory() as pasta:
+        storage = SharedStorageManager(pasta, setup_dirs=False)
+        status = storage.get_status()
+        assert status["connectivity"] == (True, "Conectividade OK") and status["modo"] == MODO_NORMAL, status
+        assert status["latencia"]["escrita"]["amostras"] == 1
+        storage.monitor.encerrar()
+        assert not [nome for nome in os.listdir(f"{pasta}/database") if nome.endswith(".tmp")]
+
+def test_verificacao_inicial_so_de_leitura():
+    """Modo inicial por stat com prazo: nada é criado na pasta; stat travado vira offline até a sondagem"""
+    with tempfile.TemporaryDirectory() as pasta:
+        storage = SharedStorageManager(pasta, setup_dirs=False)
+        assert storage.verificar_acesso() == (True, "Conectividade OK")
+        assert os.listdir(pasta) == []
+
+        class PastaTravada:
+            def is_dir(self):
+                time.sleep(2)
+                return True
+
+        storage.shared_path = PastaTravada()
+        inicio = time.monotonic()
+        acessivel, mensagem = storage.verificar_acesso(timeout=0.2)
+        assert not acessivel and mensagem == "Sem resposta em 0.2s" and time.monotonic() - inicio < 1
+
+    monitor = MonitorConectividade(lambda: (1.0, 1.0), intervalo=60, limite_latencia_ms=100)
+    monitor.definir_estado_inicial(False, "Sem resposta em 0.2s")
+    assert monitor.estado()["modo"] == MODO_OFFLINE and monitor.estado()["sondagens"] == 0
+    assert monitor.sondar_agora()["modo"] == MODO_NORMAL
+    monitor.definir_estado_inicial(False, "ignorado após a sondagem")
+    assert monitor.modo == MODO_NORMAL
+
+if __name__ == "__main__":
+    print("🔍 Verificando detecção e monitoramento da pasta compartilhada...")
+    testes = [
+        test_deteccao_paralela_com_prazo,
+        test_deteccao_com_pastas_reais,
+        test_cache_da_deteccao,
+        test_percentis_de_latencia,
+        test_modo_degradado_com_histerese,
+        test_sondagem_lenta_isolada_nao_degrada,
+        test_sondagem_travada_fica_offline,
+        test_status_do_gerenciador_vem_do_monitor,
+        test_verificacao_inicial_so_de_leitura,
+    ]
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {teste.__doc__}: {e}")
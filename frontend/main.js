@@ -55,20 +55,57 @@ app.on('activate', () => {
   }
 });
 
+// Cache de respostas GET por URL, revalidadas com ETag (If-None-Match)
+const responseCache = new Map();
+
+// URL da API: local, ou a do PC servidor (modo servidor) em server_config.json
+// na pasta do SECRIMPO; SECRIMPO_API_URL tem precedência
+function getApiBaseURL() {
+  if (process.env.SECRIMPO_API_URL) {
+    return process.env.SECRIMPO_API_URL;
+  }
+  try {
+    const fs = require('fs');
+    const serverConfig = JSON.parse(fs.readFileSync(path.join(__dirname, '..', 'server_config.json'), 'utf-8'));
+    if (serverConfig.api_url) {
+      return serverConfig.api_url.replace(/\/$/, '');
+    }
+  } catch (error) {
+    // Sem server_config.json: API local
+  }
+  return 'http://127.0.0.1:8000';
+}
+
+const baseURL = getApiBaseURL();
+
 // IPC handlers para comunicação com o renderer
 ipcMain.handle('api-request', async (event, { method, url, data }) => {
   const axios = require('axios');
-  const baseURL = 'http://127.0.0.1:8000';
+  const headers = {
+    'Content-Type': 'application/json'
+  };
+  const cached = method === 'GET' ? responseCache.get(url) : null;
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
   
   try {
     const response = await axios({
       method,
       url: `${baseURL}${url}`,
       data,
-      headers: {
-        'Content-Type': 'application/json'
-      }
+      headers,
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
     });
+
+    // 304: dados não mudaram no servidor, reutiliza o cache
+    if (response.status === 304 && cached) {
+      return { success: true, data: cached.data };
+    }
+
+    if (method === 'GET' && response.headers.etag) {
+      responseCache.set(url, { etag: response.headers.etag, data: response.data });
+    }
     return { success: true, data: response.data };
   } catch (error) {
     return { 
@@ -30,6 +30,12 @@ contextBridge.exposeInMainWorld('secrimpoAPI', {
   listarItens: () => ipcRenderer.invoke('api-request', { method: 'GET', url: '/itens/' }),
   listarItensPorOcorrencia: (id) => ipcRenderer.invoke('api-request', { method: 'GET', url: `/itens/ocorrencia/${id}` }),
   
+  // Pacote inicial (unidades, catálogo, policiais, proprietários, status de sincronização)
+  bootstrap: (usuario) => ipcRenderer.invoke('api-request', {
+    method: 'GET',
+    url: usuario ? `/bootstrap?usuario=${encodeURIComponent(usuario)}` : '/bootstrap'
+  }),
+  
   // Estatísticas
   obterEstatisticas: () => ipcRenderer.invoke('api-request', { method: 'GET', url: '/estatisticas/' })
 });
\ No newline at end of file
@@ -7,8 +7,8 @@ let appState = {
     itemCount: 1
 };
 
-// Mapeamento de itens por espécie
-const itemsPorEspecie = {
+// Mapeamento de itens por espécie (substituído pelo catálogo do servidor no bootstrap)
+let itemsPorEspecie = {
     'Entorpecente': ['Maconha', 'Cocaína', 'Crack', 'Ecstasy', 'LSD', 'Heroína', 'Outros'],
     'Arma': ['Pistola', 'Revólver', 'Rifle', 'Espingarda', 'Arma Branca', 'Outros'],
     'Munição': ['Cartuchos', 'Balas', 'Projéteis', 'Outros'],
@@ -40,7 +40,22 @@ async function loadInitialData() {
     try {
         showLoading(true);
 
-        // Carrega policiais
+        // Uma única requisição com todos os dados iniciais
+        const usuario = window.syncManager ? window.syncManager.getUsuario() : null;
+        const bootstrapResponse = await window.secrimpoAPI.bootstrap(usuario);
+        if (bootstrapResponse.success) {
+            const bundle = bootstrapResponse.data;
+            appState.policiais = bundle.policiais;
+            appState.proprietarios = bundle.proprietarios;
+            itemsPorEspecie = bundle.itens_por_especie;
+            if (window.syncManager) {
+                window.syncManager.aplicarBootstrap(bundle);
+            }
+            console.log(`[CLIPBOARD-LIST] Bootstrap v${bundle.versao_bootstrap}: ${appState.policiais.length} policiais, ${appState.proprietarios.length} proprietários`);
+            return;
+        }
+
+        // Fallback para servidores sem /bootstrap
         const policiaisResponse = await window.secrimpoAPI.listarPoliciais();
         if (policiaisResponse.success) {
             appState.policiais = policiaisResponse.data;
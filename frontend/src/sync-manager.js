@@ -10,12 +10,23 @@ class SyncManager {
         this.usuario = null;
         this.isOnline = false;
         this.lastSyncTime = null;
+        this.statusInicial = null;
         
-        // Verificar conectividade periodicamente
-        this.checkConnectivity();
+        // Primeira verificação adiada: o bootstrap do app normalmente já informa o status
+        this.verificacaoInicial = setTimeout(() => this.checkConnectivity(), 5000);
         setInterval(() => this.checkConnectivity(), 30000); // A cada 30 segundos
     }
     
+    /**
+     * Aplica os dados do pacote /bootstrap, evitando o ping e a consulta de status iniciais
+     */
+    aplicarBootstrap(bundle) {
+        clearTimeout(this.verificacaoInicial);
+        this.isOnline = true;
+        this.updateConnectionStatus(true);
+        this.statusInicial = bundle.sincronizacao || null;
+    }
+    
     /**
      * Gera ou recupera UUID único do cliente
      */
@@ -308,6 +319,13 @@ class SyncManager {
             return null;
         }
         
+        // Status recebido no bootstrap (usado uma vez, na inicialização)
+        if (this.statusInicial && this.statusInicial.usuario === usuario) {
+            const status = this.statusInicial;
+            this.statusInicial = null;
+            return status;
+        }
+        
         try {
             const response = await fetch(`${this.serverUrl}/sincronizar/status/${encodeURIComponent(usuario)}`);
             if (response.ok) {